@@ -0,0 +1,411 @@
+# type: ignore
+"""
+Admission Control for the API Server
+====================================
+
+Keeps the model endpoints responsive under overload instead of letting every
+request queue up until all clients time out together:
+
+- ``ConcurrencyLimiter``: a per-route cap on requests running at once, with
+  a bounded FIFO wait queue. A request is rejected up front when the queue
+  is full or when its estimated wait already exceeds its deadline, and is
+  rejected later if its deadline passes while it waits.
+- ``TokenBucket`` / ``RateLimiter``: per-client rate limits keyed by the
+  ``X-API-Key`` header when it holds one of the configured ``api_keys``, and
+  by the client address otherwise (an unchecked header would let a client
+  get a fresh bucket per request by sending random keys).
+- ``AdmissionMiddleware``: the ASGI middleware applying both, answering
+  429 (rate limited) or 503 (overloaded) with a ``Retry-After`` header.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import json
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from automation import metrics
+
+# Routes that run model inference and therefore need protecting
+DEFAULT_ROUTES = {
+    "/rag/query": {"max_concurrency": 8, "max_queue": 64, "timeout": 10.0},
+    "/rag/query/batch": {"max_concurrency": 2, "max_queue": 16, "timeout": 30.0},
+    "/rag/documents": {"max_concurrency": 1, "max_queue": 8, "timeout": 60.0},
+    "/rag/documents/stream": {"max_concurrency": 1, "max_queue": 4, "timeout": 60.0},
+    "/rag/reindex": {"max_concurrency": 1, "max_queue": 1, "timeout": 60.0},
+    "/multimodal/analyze": {"max_concurrency": 2, "max_queue": 16, "timeout": 20.0},
+    "/multimodal/search": {"max_concurrency": 4, "max_queue": 32, "timeout": 10.0},
+    # Encodes every new image and chunk; builds are serialized anyway
+    "/multimodal/index": {"max_concurrency": 1, "max_queue": 1, "timeout": 60.0},
+    # Binary front end (automation/binary_api.py)
+    "/bin/rag/search": {"max_concurrency": 8, "max_queue": 64, "timeout": 10.0},
+    "/bin/rag/search/batch": {"max_concurrency": 2, "max_queue": 16, "timeout": 30.0},
+    "/bin/rag/embed": {"max_concurrency": 4, "max_queue": 32, "timeout": 10.0},
+    "/bin/rag/ingest": {"max_concurrency": 1, "max_queue": 8, "timeout": 60.0},
+    "/bin/multimodal/embed_text": {
+        "max_concurrency": 4,
+        "max_queue": 32,
+        "timeout": 10.0,
+    },
+}
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take ``cost`` tokens; return (admitted, seconds until enough tokens)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-client token buckets, keeping at most ``max_clients`` buckets
+
+    Buckets of clients idle long enough to have refilled completely are
+    dropped, since a new bucket would be identical.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10000,
+        api_keys: Iterable[str] = (),
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.api_keys = frozenset(api_keys)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def client_key(self, scope) -> str:
+        """The bucket of a request: its API key if valid, else its address"""
+        return _client_key(scope, self.api_keys)
+
+    def check(self, client: str, cost: float = 1.0):
+        """Raise ``Rejected`` with status 429 if ``client`` is over its limit"""
+        self._expire()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[client] = bucket
+            if len(self._buckets) > self.max_clients:
+                # Least recently seen clients have refilled anyway
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+
+        admitted, retry_after = bucket.try_acquire(cost)
+        if not admitted:
+            raise Rejected(429, "Rate limit exceeded", retry_after)
+
+    def _expire(self):
+        # Least recently seen first, so stop at the first bucket still in use
+        idle = self.burst / self.rate if self.rate > 0 else math.inf
+        now = time.monotonic()
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if now - bucket.updated < idle:
+                break
+            self._buckets.popitem(last=False)
+
+    def reconfigure(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10000,
+        api_keys: Iterable[str] = (),
+    ):
+        """Change the limits, including those of clients already seen"""
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.api_keys = frozenset(api_keys)
+        for bucket in self._buckets.values():
+            bucket.rate = rate
+            bucket.burst = burst
+            bucket.tokens = min(bucket.tokens, burst)
+        while len(self._buckets) > max_clients:
+            self._buckets.popitem(last=False)
+
+
+@dataclass
+class RouteLimits:
+    """Admission limits for one route"""
+
+    max_concurrency: int = 4
+    max_queue: int = 32
+    timeout: float = 10.0
+
+
+class ConcurrencyLimiter:
+    """A concurrency cap with a bounded, deadline-aware FIFO wait queue
+
+    Must be used from a single event loop, which is how uvicorn runs each
+    worker process.
+    """
+
+    def __init__(self, name: str, limits: RouteLimits):
+        self.name = name
+        self.limits = limits
+        self.active = 0
+        self._waiters: deque = deque()
+        # Exponentially weighted mean service time, used to estimate waits
+        self._service_time = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        """Estimated seconds a newly queued request would wait"""
+        slots = max(1, self.limits.max_concurrency)
+        return (len(self._waiters) + 1) / slots * self._service_time
+
+    def record_service_time(self, seconds: float, alpha: float = 0.2):
+        if self._service_time == 0.0:
+            self._service_time = seconds
+        else:
+            self._service_time += alpha * (seconds - self._service_time)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """Wait for a slot, raising ``Rejected`` (503) instead of waiting forever"""
+        timeout = self.limits.timeout if timeout is None else timeout
+
+        if self.active < self.limits.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+
+        if len(self._waiters) >= self.limits.max_queue:
+            raise Rejected(503, "Server overloaded, queue full", self.estimated_wait())
+
+        estimate = self.estimated_wait()
+        if estimate > timeout:
+            raise Rejected(503, "Server overloaded, deadline unreachable", estimate)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        expiry = loop.call_later(timeout, self._expire, waiter)
+        try:
+            # Resolved by release() when a slot is handed over, or by _expire
+            await waiter
+        except asyncio.CancelledError:
+            # The client went away; give back a slot if one was handed over
+            if waiter.done() and not waiter.cancelled() and not waiter.exception():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        finally:
+            expiry.cancel()
+
+    def _expire(self, waiter: asyncio.Future):
+        if not waiter.done():
+            self._discard(waiter)
+            waiter.set_exception(
+                Rejected(503, "Timed out waiting for capacity", self.estimated_wait())
+            )
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def resize(self, limits: RouteLimits):
+        """Apply new limits, admitting waiters if the cap was raised"""
+        self.limits = limits
+        while self._waiters and self.active < limits.max_concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest live waiter"""
+        if self.active > self.limits.max_concurrency:
+            # The cap was lowered while this request ran
+            self.active -= 1
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Route limiters and the per-client rate limiter"""
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, Dict[str, Any]]] = None,
+        rate_limit: Optional[Dict[str, Any]] = None,
+    ):
+        routes = DEFAULT_ROUTES if routes is None else routes
+        self.limiters = {
+            path: ConcurrencyLimiter(path, RouteLimits(**limits))
+            for path, limits in routes.items()
+        }
+        self.rate_limiter = (
+            RateLimiter(**_rate_limit_settings(rate_limit)) if rate_limit else None
+        )
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any]) -> "AdmissionController":
+        admission = config_dict.get("admission", {})
+        return cls(admission.get("routes"), admission.get("rate_limit"))
+
+    def reconfigure(self, config_dict: Dict[str, Any]):
+        """Apply changed limits to a running controller
+
+        Must be called from the event loop the middleware runs on. Requests
+        holding or waiting for a slot of a removed route finish normally.
+        """
+        admission = config_dict.get("admission", {})
+        # Validated first, so an invalid config changes nothing
+        rate_limit = admission.get("rate_limit")
+        settings = _rate_limit_settings(rate_limit) if rate_limit else None
+
+        routes = admission.get("routes")
+        routes = DEFAULT_ROUTES if routes is None else routes
+        limiters = {}
+        for path, limits in routes.items():
+            limiter = self.limiters.get(path)
+            if limiter is None:
+                limiter = ConcurrencyLimiter(path, RouteLimits(**limits))
+            else:
+                limiter.resize(RouteLimits(**limits))
+            limiters[path] = limiter
+        self.limiters = limiters
+
+        if settings is None:
+            self.rate_limiter = None
+        elif self.rate_limiter is None:
+            self.rate_limiter = RateLimiter(**settings)
+        else:
+            self.rate_limiter.reconfigure(**settings)
+
+
+def _rate_limit_settings(rate_limit: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``RateLimiter`` arguments of the ``rate_limit`` config section"""
+    rate = rate_limit.get("rate", 10.0)
+    burst = rate_limit.get("burst", 20.0)
+    if not rate > 0 or not burst > 0:
+        raise ValueError(
+            "admission.rate_limit.rate and burst must be positive; "
+            "remove the rate_limit section to disable rate limiting"
+        )
+    return {
+        "rate": rate,
+        "burst": burst,
+        "max_clients": rate_limit.get("max_clients", 10000),
+        # Keys that get a bucket of their own; others count as their address
+        "api_keys": rate_limit.get("api_keys") or (),
+    }
+
+
+def _client_key(scope, api_keys: frozenset = frozenset()) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-api-key":
+            key = value.decode("latin-1")
+            if key in api_keys:
+                return "key:" + key
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def _request_timeout(scope) -> Optional[float]:
+    """Client-supplied deadline from the ``X-Request-Timeout`` header"""
+    for name, value in scope.get("headers", ()):
+        if name == b"x-request-timeout":
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying rate limits and concurrency limits"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http":
+            limiter = self.controller.limiters.get(scope.get("path"))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        # Rejections below never reach the router; label them by this route
+        scope[metrics.ROUTE_SCOPE_KEY] = limiter.name
+
+        try:
+            if self.controller.rate_limiter is not None:
+                rate_limiter = self.controller.rate_limiter
+                rate_limiter.check(rate_limiter.client_key(scope))
+
+            timeout = _request_timeout(scope)
+            if timeout is not None:
+                timeout = min(timeout, limiter.limits.timeout)
+            await limiter.acquire(timeout)
+        except Rejected as rejection:
+            await self._reject(send, rejection)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.record_service_time(time.perf_counter() - start)
+            limiter.release()
+
+    @staticmethod
+    async def _reject(send, rejection: Rejected):
+        body = json.dumps({"detail": rejection.reason}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": rejection.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(rejection.retry_after).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -6,43 +6,96 @@ FastAPI Server for GenerativeAI Starter Kit
 This module provides a REST API server that exposes the core functionality
 of the GenerativeAI Starter Kit including RAG, multimodal, and fine-tuning capabilities.
 
+``create_app(routers=...)`` builds the application with a chosen set of
+routers (``text``, ``rag``, ``multimodal``, ``binary``), read from the
+``GENAI_ROUTERS`` environment variable or ``serving.routers`` by default.
+The model libraries (torch, sentence-transformers, chromadb, PIL, numpy)
+and msgpack are only imported by the routers that need them, so a text-only
+deployment starts without them; only orjson (the JSON encoder of every
+route, when installed) is imported up front.
+
 Author: GenerativeAI-Starter-Kit
 License: MIT
 """
 
 import os
 import sys
+import zlib
+import hashlib
+import asyncio
 import uvicorn
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from dataclasses import replace
+from fastapi import APIRouter, FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 import yaml
 
 # Add parent directory to path to import examples
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from examples.rag.simple_rag import SimpleRAG, RAGConfig
-from examples.multimodal.image_text_app import MultimodalApp
-from PIL import Image
-import io
+from automation import metrics, tracing
+from automation.admission import AdmissionController, AdmissionMiddleware
+from automation.config_reload import ConfigChanges, ConfigWatcher
+from automation.response_cache import ResponseCache
+from automation.text_api import router as text_router
+from automation.warmup import WarmupConfig, WarmupRunner
+from automation.ingest_stream import NDJSONError, iter_documents
+from automation.serialization import (
+    CompressionMiddleware,
+    FastJSONResponse,
+    parse_fields,
+    project_results,
+)
+from automation.uploads import (
+    BodySizeLimitMiddleware,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_PIXELS,
+    DEFAULT_TARGET_SIDE,
+    UploadTooLarge,
+    decode_image_bounded,
+)
+
+if TYPE_CHECKING:
+    # Imported lazily, only when the RAG or multimodal router is enabled
+    from examples.rag.simple_rag import SimpleRAG, RAGConfig
+    from examples.multimodal.image_text_app import MultimodalApp
+    from automation.tenants import TenantIndexManager
+
+ROUTERS = ("text", "rag", "multimodal", "binary")
+DEFAULT_ROUTERS = ("rag", "multimodal", "binary")
+API_VERSION = "1.0.0"
 
 
 # Pydantic models for API
 class QueryRequest(BaseModel):
     query: str
     top_k: Optional[int] = 5
+    collection: Optional[str] = None
 
 
 class QueryResponse(BaseModel):
     query: str
     results: List[Dict[str, Any]]
-    response: str
+    response: Optional[str] = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+    retrieval_only: bool = False
+    collection: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
 
 
 class DocumentRequest(BaseModel):
     documents: List[str]
     metadata: Optional[List[Dict[str, Any]]] = None
+    collection: Optional[str] = None
 
 
 class ImageAnalysisRequest(BaseModel):
@@ -57,32 +110,30 @@ class ImageAnalysisResponse(BaseModel):
     mode: str
 
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="GenerativeAI Starter Kit API",
-    description="REST API for RAG, multimodal, and fine-tuning capabilities",
-    version="1.0.0",
-)
+class MultimodalSearchRequest(BaseModel):
+    query: str
+    top_k: Optional[int] = 10
+    # "text", "image" or both (the default)
+    modalities: Optional[List[str]] = None
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Global variables for models
-rag_system: Optional[SimpleRAG] = None
-multimodal_app: Optional[MultimodalApp] = None
+class MultimodalSearchResponse(BaseModel):
+    query: str
+    results: List[Dict[str, Any]]
+
+
+class MultimodalIndexRequest(BaseModel):
+    image_paths: Optional[List[str]] = None
+    include_documents: bool = True
+    calibration_queries: Optional[List[str]] = None
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", "config.yaml")
 
 
 def load_config() -> Dict[str, Any]:
     """Load configuration from YAML file"""
-    config_path = os.path.join(
-        os.path.dirname(__file__), "..", "configs", "config.yaml"
-    )
+    config_path = CONFIG_PATH
 
     if os.path.exists(config_path):
         with open(config_path, "r", encoding="utf-8") as f:
@@ -102,81 +153,400 @@ def load_config() -> Dict[str, Any]:
                 "persist_directory": "./api_chroma_db",
             },
             "rag": {"chunk_size": 1000, "chunk_overlap": 200, "top_k": 5},
+            "serving": {
+                "workers": 1,
+                "snapshot_dir": "./api_index_snapshots",
+                "snapshot_check_interval": 1.0,
+                "snapshot_retain_seconds": 60.0,
+            },
+            "admission": {"rate_limit": {"rate": 20.0, "burst": 40.0}},
+            "response_cache": {"max_entries": 1024, "disk_dir": None},
+            "caption_cache": {"max_entries": 4096, "disk_dir": "./api_caption_cache"},
+            "prompt_cache": {"max_entries": 4096, "directory": "./api_prompt_cache"},
+            "image_fetch": {"cache_dir": "./api_image_cache", "max_connections": 16},
+            "image_pipeline": {"cache_dir": "./api_pixel_cache"},
+            "multimodal_index": {"index_dir": "./api_multimodal_index"},
+            "compression": {"minimum_size": 1024},
+            "uploads": {
+                "max_bytes": DEFAULT_MAX_BYTES,
+                "max_pixels": DEFAULT_MAX_PIXELS,
+                "target_side": DEFAULT_TARGET_SIDE,
+            },
+            "tenants": {
+                "root": "./api_tenants",
+                "memory_budget_mb": 512,
+                "max_open": 256,
+            },
+            "warmup": {
+                "enabled": True,
+                "iterations": 3,
+                "canary_queries": [],
+                "results_path": "./api_warmup.jsonl",
+            },
+            "tracing": {
+                "exporter": "json",
+                "path": "./api_traces.jsonl",
+                "sample_rate": 0.01,
+            },
+            "config_reload": {"enabled": True, "interval": 2.0},
         }
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize models on startup"""
-    global rag_system, multimodal_app
+def enabled_routers(
+    config_dict: Dict[str, Any], names: Optional[List[str]] = None
+) -> List[str]:
+    """The routers to serve: ``names``, else ``GENAI_ROUTERS``, else the config"""
+    if names is None and os.environ.get("GENAI_ROUTERS"):
+        names = [n.strip() for n in os.environ["GENAI_ROUTERS"].split(",")]
+        names = [n for n in names if n]
+    if names is None:
+        names = config_dict.get("serving", {}).get("routers", DEFAULT_ROUTERS)
+    unknown = sorted(set(names) - set(ROUTERS))
+    if unknown:
+        raise ValueError(f"Unknown routers {unknown}; choose from {list(ROUTERS)}")
+    return [name for name in ROUTERS if name in names]
 
-    print("🚀 Starting GenerativeAI Starter Kit API...")
 
-    # Load configuration
-    config_dict = load_config()
+# Process-wide server state, set up by create_app()
+app_config: Dict[str, Any] = {}
+routers_enabled: List[str] = []
+admission_controller: Optional[AdmissionController] = None
+response_cache: Optional[ResponseCache] = None
+upload_config: Dict[str, Any] = {}
+upload_limits: Dict[str, int] = {}
+
+# Global variables for models
+rag_system: Optional["SimpleRAG"] = None
+multimodal_app: Optional["MultimodalApp"] = None
+tenant_manager: Optional["TenantIndexManager"] = None
+
+# Readiness is only reported once the startup warmup has run
+warmup_runner: Optional[WarmupRunner] = None
+
+# Watches configs/config.yaml once the server has started
+config_watcher: Optional[ConfigWatcher] = None
+background_tasks: Dict[str, asyncio.Task] = {}
+
+core_router = APIRouter()
+rag_router = APIRouter(tags=["rag"])
+multimodal_router = APIRouter(tags=["multimodal"])
+
+
+def build_rag_config(config_dict: Dict[str, Any]) -> "RAGConfig":
+    """Build the RAG configuration from the loaded config dictionary"""
+    from examples.rag.simple_rag import RAGConfig
+
+    serving = config_dict.get("serving", {})
+    return RAGConfig(
+        embedding_model=config_dict["models"]["embedding"]["name"],
+        chunk_size=config_dict["rag"]["chunk_size"],
+        chunk_overlap=config_dict["rag"]["chunk_overlap"],
+        top_k=config_dict["rag"]["top_k"],
+        collection_name=config_dict["vector_db"]["collection_name"],
+        persist_directory=config_dict["vector_db"]["persist_directory"],
+        snapshot_check_interval=serving.get("snapshot_check_interval", 1.0),
+        snapshot_retain_seconds=serving.get("snapshot_retain_seconds", 60.0),
+    )
+
+
+def build_rag_system(
+    config_dict: Dict[str, Any],
+    snapshot_dir: Optional[str] = None,
+    previous: Optional["SimpleRAG"] = None,
+) -> "SimpleRAG":
+    """Create and initialize a RAG system
+
+    The embedding model of ``previous`` is reused when the configured model
+    did not change, so rebuilding for a new vector store loads no weights.
+    (A changed model needs a restart and a reindex, see config_reload.)
+    """
+    from examples.rag.simple_rag import SimpleRAG
+
+    rag = SimpleRAG(build_rag_config(config_dict))
+    if previous is not None:
+        if previous.config.embedding_model == rag.config.embedding_model:
+            rag.embedding_model = previous.embedding_model
+        if previous.snapshot_store and snapshot_dir is None:
+            snapshot_dir = previous.snapshot_store.root
+    if snapshot_dir:
+        rag.initialize_from_snapshot(snapshot_dir)
+    else:
+        rag.initialize()
+    return rag
+
+
+def initialize_models(
+    config_dict: Dict[str, Any],
+    snapshot_dir: Optional[str] = None,
+    routers: Optional[List[str]] = None,
+):
+    """Load the models needed by the enabled routers into the module globals
+
+    With ``snapshot_dir`` the RAG system is served read-only from a
+    memory-mapped snapshot, which is what the pre-fork mode uses so the
+    models and index are loaded once before the workers are forked.
+    """
+    global rag_system, multimodal_app, tenant_manager
+    routers = enabled_routers(config_dict, routers)
 
     # Initialize RAG system
-    try:
-        print("📊 Initializing RAG system...")
-        rag_config = RAGConfig(
-            embedding_model=config_dict["models"]["embedding"]["name"],
-            chunk_size=config_dict["rag"]["chunk_size"],
-            chunk_overlap=config_dict["rag"]["chunk_overlap"],
-            top_k=config_dict["rag"]["top_k"],
-            collection_name=config_dict["vector_db"]["collection_name"],
-            persist_directory=config_dict["vector_db"]["persist_directory"],
-        )
-        rag_system = SimpleRAG(rag_config)
-        rag_system.initialize()
-        print("✅ RAG system initialized")
-    except Exception as e:
-        print(f"❌ Failed to initialize RAG system: {e}")
+    if "rag" in routers or "binary" in routers:
+        try:
+            print("📊 Initializing RAG system...")
+            from automation.tenants import TenantIndexManager
+
+            rag_system = build_rag_system(config_dict, snapshot_dir)
+            rag_system.stage_observer = metrics.observe_stage
+            # Tenant collections share the embedding model of the default one
+            tenant_manager = TenantIndexManager.from_config(config_dict, rag_system)
+            print("✅ RAG system initialized")
+        except Exception as e:
+            print(f"❌ Failed to initialize RAG system: {e}")
 
     # Initialize multimodal app
-    try:
-        print("🎨 Initializing multimodal app...")
-        multimodal_app = MultimodalApp()
-        multimodal_app.initialize()
-        print("✅ Multimodal app initialized")
-    except Exception as e:
-        print(f"❌ Failed to initialize multimodal app: {e}")
+    if "multimodal" in routers or "binary" in routers:
+        try:
+            print("🎨 Initializing multimodal app...")
+            from examples.multimodal.image_text_app import MultimodalApp
+            from examples.multimodal.image_pipeline import PipelineConfig
+            from examples.multimodal.cpu_inference import InferenceConfig
+            from examples.multimodal.prompt_store import PromptStore
+            from examples.multimodal.image_fetcher import ImageFetcher
+            from examples.multimodal.multimodal_index import MultimodalIndex
+
+            caption_cache = config_dict.get("caption_cache", {})
+            multimodal_app = MultimodalApp(
+                pipeline_config=PipelineConfig.from_config(config_dict),
+                inference_config=InferenceConfig.from_config(config_dict),
+                prompt_store=PromptStore.from_config(config_dict),
+                image_fetcher=ImageFetcher.from_config(config_dict),
+                caption_cache=ResponseCache(
+                    max_entries=caption_cache.get("max_entries", 4096),
+                    max_bytes=caption_cache.get("max_bytes", 4 * 1024 * 1024),
+                    disk_dir=caption_cache.get("disk_dir"),
+                ),
+            )
+            multimodal_app.initialize()
+            multimodal_app.stage_observer = metrics.observe_stage
+            index_config = config_dict.get("multimodal_index", {})
+            multimodal_app.multimodal_index = MultimodalIndex(
+                index_config.get("index_dir", "./api_multimodal_index"),
+                check_interval=index_config.get("check_interval", 1.0),
+                retain_seconds=index_config.get("retain_seconds", 60.0),
+            )
+            cache = multimodal_app.caption_cache
+            metrics.register_cache("caption", lambda: cache.hits, lambda: cache.misses)
+            store = multimodal_app.prompt_store
+            metrics.register_cache("prompt", lambda: store.hits, lambda: store.misses)
+            # Hits include URLs revalidated with a 304 (no body downloaded)
+            fetched = multimodal_app.image_fetcher.stats
+            metrics.register_cache(
+                "image",
+                lambda: fetched["cache_hits"] + fetched["revalidated"],
+                lambda: fetched["requests"] - fetched["revalidated"],
+            )
+            pipeline = multimodal_app.image_pipeline
+            for pool in ("io", "decode"):
+                metrics.register_queue(
+                    f"image_{pool}", lambda pool=pool: pipeline.pending(pool)
+                )
+            pixels = pipeline.cache
+            if pixels is not None:
+                metrics.register_cache(
+                    "pixels", lambda: pixels.hits, lambda: pixels.misses
+                )
+            print("✅ Multimodal app initialized")
+        except Exception as e:
+            print(f"❌ Failed to initialize multimodal app: {e}")
+
+
+def apply_live_settings(config_dict: Dict[str, Any]):
+    """Apply tuning settings to the running server (on the event loop)"""
+    admission_controller.reconfigure(config_dict)
+    for path, limiter in admission_controller.limiters.items():
+        metrics.register_queue(path, lambda limiter=limiter: limiter.queue_depth)
+
+    cache_config = config_dict.get("response_cache", {})
+    response_cache.resize(
+        cache_config.get("max_entries", 1024),
+        cache_config.get("max_bytes", 64 * 1024 * 1024),
+    )
+
+    upload_config.clear()
+    upload_config.update(config_dict.get("uploads", {}))
+    upload_limits["/multimodal/analyze"] = upload_config.get(
+        "max_bytes", DEFAULT_MAX_BYTES
+    )
+
+    tracing.get_tracer().sample_rate = config_dict.get("tracing", {}).get(
+        "sample_rate", 0.01
+    )
+    warmup_runner.config = WarmupConfig.from_config(config_dict)
+    if config_watcher is not None:
+        config_watcher.interval = config_dict.get("config_reload", {}).get(
+            "interval", 2.0
+        )
+
+    if rag_system is not None:
+        rag_system.update_settings(build_rag_config(config_dict))
+    if tenant_manager is not None:
+        tenant_manager.reconfigure(config_dict)
+
+    if multimodal_app is not None:
+        from examples.multimodal.image_pipeline import PipelineConfig
+
+        caption_cache = config_dict.get("caption_cache", {})
+        multimodal_app.caption_cache.resize(
+            caption_cache.get("max_entries", 4096),
+            caption_cache.get("max_bytes", 4 * 1024 * 1024),
+        )
+        multimodal_app.prompt_store.resize(
+            config_dict.get("prompt_cache", {}).get("max_entries", 4096)
+        )
+        multimodal_app.image_fetcher.resize(
+            config_dict.get("image_fetch", {}).get("max_connections", 16)
+        )
+        # New pool sizes take effect from the next load
+        multimodal_app.image_pipeline.reconfigure(
+            PipelineConfig.from_config(config_dict)
+        )
+
+
+def rebuild_rag_system(config_dict: Dict[str, Any]) -> "SimpleRAG":
+    """Build and warm up a replacement RAG system (blocking)"""
+    print("🔁 Rebuilding RAG system for the new configuration...")
+    rag = build_rag_system(config_dict, previous=rag_system)
+    # Only the startup warmup is recorded in the results file
+    warmup = WarmupRunner(
+        replace(WarmupConfig.from_config(config_dict), results_path=None)
+    )
+    warmup.run(rag)
+    if not warmup.ready:
+        raise RuntimeError("warmup of the rebuilt RAG system failed")
+    rag.stage_observer = metrics.observe_stage
+    return rag
+
+
+async def apply_config(config_dict: Dict[str, Any], changes: ConfigChanges):
+    """Apply a changed configuration found by the config watcher"""
+    global rag_system
+
+    apply_live_settings(config_dict)
+
+    if changes.rebuild and rag_system is not None:
+        # The old instance keeps serving until the new one is ready
+        rag = await run_in_threadpool(rebuild_rag_system, config_dict)
+        rag_system = rag
+        if tenant_manager is not None:
+            tenant_manager.rag = rag
+        response_cache.invalidate(cache_version(rag), cache_namespace(rag))
+        print("✅ Swapped in the rebuilt RAG system")
+
+
+async def startup_event():
+    """Initialize models on startup"""
+    global config_watcher
+    print("🚀 Starting GenerativeAI Starter Kit API...")
+
+    # Pre-fork workers inherit the models loaded by the master process
+    if rag_system is None and multimodal_app is None:
+        initialize_models(app_config, routers=routers_enabled)
+
+    # Warm up in the background; /ready answers 503 until it succeeds
+    background_tasks["warmup"] = asyncio.create_task(
+        warmup_runner.run_until_ready(rag_system, multimodal_app)
+    )
+
+    # Apply edits of configs/config.yaml without a restart
+    reload_config = app_config.get("config_reload", {})
+    if reload_config.get("enabled", True):
+        config_watcher = ConfigWatcher(
+            CONFIG_PATH,
+            app_config,
+            apply_config,
+            interval=reload_config.get("interval", 2.0),
+        )
+        background_tasks["config_watch"] = asyncio.create_task(config_watcher.run())
 
     print("✅ API server startup complete!")
 
 
-@app.get("/")
+async def shutdown_event():
+    """Stop the background tasks and export spans still waiting in the queue"""
+    for name in ("config_watch", "warmup"):
+        task = background_tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+    tracing.get_tracer().flush()
+
+
+@core_router.get("/")
 async def root():
     """Root endpoint with API information"""
+    endpoints = {
+        "text": {"process_text": "/process-text", "demo": "/demo", "info": "/info"},
+        "rag": {
+            "add_documents": "/rag/documents",
+            "stream_documents": "/rag/documents/stream",
+            "query": "/rag/query",
+            "batch_query": "/rag/query/batch",
+            "reindex": "/rag/reindex",
+        },
+        "multimodal": {"analyze_image": "/multimodal/analyze"},
+        "binary": "/bin",
+    }
     return {
         "message": "GenerativeAI Starter Kit API",
-        "version": "1.0.0",
+        "version": API_VERSION,
         "endpoints": {
-            "rag": {"add_documents": "/rag/documents", "query": "/rag/query"},
-            "multimodal": {"analyze_image": "/multimodal/analyze"},
+            **{name: endpoints[name] for name in routers_enabled},
             "health": "/health",
+            "ready": "/ready",
+            "metrics": "/metrics",
         },
     }
 
 
-@app.get("/health")
+@core_router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
+        "message": "Service is running normally",
+        "version": API_VERSION,
+        "routers": routers_enabled,
         "rag_available": rag_system is not None,
         "multimodal_available": multimodal_app is not None,
+        "warmup": warmup_runner.state,
+        "config": config_watcher.status() if config_watcher else None,
     }
 
 
+@core_router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 only once the startup warmup has completed"""
+    report = warmup_runner.report()
+    if not warmup_runner.ready:
+        return FastJSONResponse(status_code=503, content=report)
+    return report
+
+
+@core_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # RAG Endpoints
-@app.post("/rag/documents")
+@rag_router.post("/rag/documents")
 async def add_documents(request: DocumentRequest):
     """Add documents to the RAG system"""
-    if not rag_system:
-        raise HTTPException(status_code=503, detail="RAG system not available")
+    rag = resolve_rag(request.collection)
+    require_writable(rag)
 
     try:
-        rag_system.add_documents(request.documents, request.metadata)
+        await run_in_threadpool(rag.add_documents, request.documents, request.metadata)
+        invalidate_responses(rag)
         return {
             "message": f"Successfully added {len(request.documents)} documents",
             "document_count": len(request.documents),
@@ -187,27 +557,362 @@ async def add_documents(request: DocumentRequest):
         )
 
 
-@app.post("/rag/query", response_model=QueryResponse)
-async def query_rag(request: QueryRequest):
-    """Query the RAG system"""
-    if not rag_system:
+def route_rag(collection: Optional[str] = None):
+    """The default RAG system, or the tenant index for ``collection``
+
+    Returns None when the RAG system is not loaded; raises ``ValueError``
+    for invalid collection names.
+    """
+    if rag_system is None or collection is None:
+        return rag_system
+    if tenant_manager is None:
+        return None
+    return tenant_manager.index(collection)
+
+
+def resolve_rag(collection: Optional[str] = None):
+    """Route a request to the default RAG system or a tenant collection"""
+    try:
+        rag = route_rag(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rag is None:
         raise HTTPException(status_code=503, detail="RAG system not available")
+    return rag
+
+
+def require_writable(rag):
+    """Refuse writes to read-only snapshots and during a reindex"""
+    if rag.snapshot_store:
+        raise HTTPException(
+            status_code=409,
+            detail="RAG system is serving a read-only snapshot; "
+            "ingest on the writer and publish a new snapshot",
+        )
+    if getattr(rag, "reindex_in_progress", False):
+        raise HTTPException(
+            status_code=409,
+            detail="A reindex is in progress; documents sent now would be "
+            "lost when it is swapped in",
+        )
+
+
+def invalidate_responses(rag):
+    """Drop cached responses made stale by an ingest into ``rag``"""
+    # Entries of older versions of this index can never be hit again; those
+    # of other tenants and of the multimodal index are left alone
+    response_cache.invalidate(cache_version(rag), cache_namespace(rag))
+
+
+def cache_namespace(rag) -> str:
+    """The prefix of the versions cached responses of ``rag`` are keyed by"""
+    return "rag" if rag is rag_system else f"t.{rag.name}"
+
+
+def cache_version(rag) -> str:
+    """The version cached responses of ``rag`` are keyed by
 
+    Besides the index version it names the embedding model: after a restart
+    with another model, responses cached on disk for the old one (whose
+    index version may be unchanged) must not be served.
+    """
+    model = hashlib.sha256(rag.config.embedding_model.encode("utf-8"))
+    version = f"{rag.index_version}.{model.hexdigest()[:8]}"
+    # Tenant index versions already start with "t.<name>."
+    return f"rag.{version}" if rag is rag_system else version
+
+
+async def current_index_version(rag) -> str:
+    """The cache version of ``rag`` (opening a tenant may read from disk)"""
+    if rag is rag_system:
+        return cache_version(rag_system)
+    return await run_in_threadpool(cache_version, rag)
+
+
+def parse_fields_param(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate the ``fields=`` projection parameter"""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def cached_json_response(
+    route: str,
+    payload: BaseModel,
+    http_request: Request,
+    compute,
+    index_version: str,
+    fields: Optional[List[str]] = None,
+) -> Response:
+    """Serve an idempotent query from the response cache, or compute it
+
+    The cache key covers the route, the request body, the field projection
+    and the index version, and doubles as the ETag, so ``If-None-Match`` is
+    answered with 304.
+    """
+    key = ResponseCache.make_key(
+        route, {**payload.model_dump(), "fields": fields}, index_version
+    )
+    etag = ResponseCache.etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if ResponseCache.matches(http_request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get_memory(key)
+    if body is None:
+        # The disk tier is read and written off the event loop
+        body = await run_in_threadpool(response_cache.get_disk, key)
+    if body is None:
+        result = await compute()
+        # pydantic's compiled serializer, no intermediate dicts
+        body = result.model_dump_json().encode("utf-8")
+        await run_in_threadpool(response_cache.put, key, body)
+        headers["X-Cache"] = "MISS"
+    else:
+        headers["X-Cache"] = "HIT"
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@rag_router.post("/rag/documents/stream")
+async def add_documents_stream(
+    http_request: Request, batch_size: int = 64, collection: Optional[str] = None
+):
+    """Bulk-ingest documents from a (gzip-compressed) NDJSON request body
+
+    Each line is ``{"text": ..., "metadata": {...}}``. The body is parsed
+    incrementally and ingested in batches of ``batch_size``; the next bytes
+    are only read once the previous batch is stored, so memory stays
+    constant and slow ingestion throttles the client.
+    """
+    rag = resolve_rag(collection)
+    require_writable(rag)
+    batch_size = max(1, min(batch_size, 1024))
+
+    encoding = http_request.headers.get("content-encoding", "").lower()
+    gzipped = True if encoding == "gzip" else None
+    totals = {"documents": 0, "chunks": 0, "batches": 0}
+    texts, metadatas = [], []
+
+    async def flush():
+        totals["chunks"] += await run_in_threadpool(
+            rag.add_document_batch, texts, metadatas, totals["documents"]
+        )
+        totals["documents"] += len(texts)
+        totals["batches"] += 1
+        texts.clear()
+        metadatas.clear()
+
+    try:
+        async for text, metadata in iter_documents(http_request.stream(), gzipped):
+            texts.append(text)
+            metadatas.append(metadata)
+            if len(texts) >= batch_size:
+                await flush()
+        if texts:
+            await flush()
+    except (NDJSONError, zlib.error) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid NDJSON stream after {totals['documents']} "
+            f"ingested documents: {str(e)}",
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed after {totals['documents']} ingested documents: {str(e)}",
+        )
+    finally:
+        if totals["batches"]:
+            invalidate_responses(rag)
+
+    return {
+        "message": f"Successfully added {totals['documents']} documents",
+        "document_count": totals["documents"],
+        "chunk_count": totals["chunks"],
+        "batch_count": totals["batches"],
+    }
+
+
+@rag_router.post("/rag/reindex")
+async def reindex_documents(http_request: Request, batch_size: int = 64):
+    """Replace the whole corpus from an NDJSON stream without downtime
+
+    The body has the format of ``/rag/documents/stream``. The documents are
+    ingested into a new collection while queries keep being answered from
+    the live one; once the stream ends the new collection is swapped in
+    atomically. Searches running at that moment finish on the old
+    collection, which is dropped after the last of them. A failed stream
+    leaves the live collection untouched.
+    """
+    rag = resolve_rag()
+    if rag.snapshot_store:
+        raise HTTPException(
+            status_code=409,
+            detail="RAG system is serving a read-only snapshot; "
+            "publish a new snapshot on the writer instead",
+        )
     try:
-        # Search for relevant documents
-        results = rag_system.search(request.query, request.top_k)
+        build = rag.start_reindex()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    batch_size = max(1, min(batch_size, 1024))
+
+    encoding = http_request.headers.get("content-encoding", "").lower()
+    gzipped = True if encoding == "gzip" else None
+    totals = {"documents": 0, "chunks": 0}
+    texts, metadatas = [], []
 
-        # Generate response
-        context_docs = [result["document"] for result in results]
-        response = rag_system.generate_response(request.query, context_docs)
+    async def flush():
+        totals["chunks"] += await run_in_threadpool(
+            build.add_document_batch, texts, metadatas, totals["documents"]
+        )
+        totals["documents"] += len(texts)
+        texts.clear()
+        metadatas.clear()
 
-        return QueryResponse(query=request.query, results=results, response=response)
+    try:
+        async for text, metadata in iter_documents(http_request.stream(), gzipped):
+            texts.append(text)
+            metadatas.append(metadata)
+            if len(texts) >= batch_size:
+                await flush()
+        if texts:
+            await flush()
+        version = await run_in_threadpool(build.commit)
+    except (NDJSONError, zlib.error) as e:
+        build.abort()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid NDJSON stream, reindex aborted: {str(e)}",
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+        build.abort()
+        raise HTTPException(status_code=500, detail=f"Reindex failed: {str(e)}")
+    except BaseException:
+        # The client went away mid-stream
+        build.abort()
+        raise
+
+    invalidate_responses(rag)
+    return {
+        "message": f"Reindexed {totals['documents']} documents",
+        "document_count": totals["documents"],
+        "chunk_count": totals["chunks"],
+        "collection": version,
+    }
+
+
+@rag_router.post("/rag/query", response_model=QueryResponse)
+async def query_rag(
+    request: QueryRequest, http_request: Request, fields: Optional[str] = None
+):
+    """Query the RAG system
+
+    ``fields`` projects each result onto a subset of ``id``, ``document``,
+    ``metadata`` and ``distance``, e.g. ``fields=id,distance``. A
+    ``collection`` in the body routes the query to that tenant collection.
+    """
+    rag = resolve_rag(request.collection)
+    projection = parse_fields_param(fields)
+
+    async def compute() -> QueryResponse:
+        try:
+            # Search for relevant documents
+            results = await run_in_threadpool(rag.search, request.query, request.top_k)
+
+            # Generate response
+            context_docs = [result["document"] for result in results]
+            response = await run_in_threadpool(
+                rag.generate_response, request.query, context_docs
+            )
+
+            return QueryResponse(
+                query=request.query,
+                results=project_results(results, projection),
+                response=response,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+    return await cached_json_response(
+        "/rag/query",
+        request,
+        http_request,
+        compute,
+        await current_index_version(rag),
+        projection,
+    )
+
+
+@rag_router.post("/rag/query/batch", response_model=BatchQueryResponse)
+async def query_rag_batch(
+    request: BatchQueryRequest, http_request: Request, fields: Optional[str] = None
+):
+    """Query the RAG system with many questions in one request
+
+    All queries search the batch's ``collection``; a query naming another
+    one is rejected rather than silently searched in the wrong collection.
+    """
+    for query in request.queries:
+        if query.collection is not None and query.collection != request.collection:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Query collection {query.collection!r} differs from the "
+                f"batch collection {request.collection!r}; send one batch per "
+                "collection",
+            )
+    rag = resolve_rag(request.collection)
+    projection = parse_fields_param(fields)
+    if not request.queries:
+        return BatchQueryResponse(results=[])
+
+    async def compute() -> BatchQueryResponse:
+        try:
+            # One batched embedding + search pass at the largest requested
+            # top_k, then trim each result list to the top_k its query asked for
+            top_ks = [q.top_k or rag.config.top_k for q in request.queries]
+            batch_results = await run_in_threadpool(
+                rag.search_batch,
+                [q.query for q in request.queries],
+                max(top_ks),
+            )
+
+            responses = []
+            for query, top_k, results in zip(request.queries, top_ks, batch_results):
+                results = results[:top_k]
+                response = None
+                if not request.retrieval_only:
+                    context_docs = [result["document"] for result in results]
+                    response = await run_in_threadpool(
+                        rag.generate_response, query.query, context_docs
+                    )
+                responses.append(
+                    QueryResponse(
+                        query=query.query,
+                        results=project_results(results, projection),
+                        response=response,
+                    )
+                )
+
+            return BatchQueryResponse(results=responses)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+    return await cached_json_response(
+        "/rag/query/batch",
+        request,
+        http_request,
+        compute,
+        await current_index_version(rag),
+        projection,
+    )
 
 
 # Multimodal Endpoints
-@app.post("/multimodal/analyze", response_model=ImageAnalysisResponse)
+@multimodal_router.post("/multimodal/analyze", response_model=ImageAnalysisResponse)
 async def analyze_image(file: UploadFile = File(...), query: Optional[str] = None):
     """Analyze an uploaded image"""
     if not multimodal_app:
@@ -217,27 +922,110 @@ async def analyze_image(file: UploadFile = File(...), query: Optional[str] = Non
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
+    from PIL import Image
+
     try:
-        # Read and process image
-        image_bytes = await file.read()
-        image = Image.open(io.BytesIO(image_bytes))
+        # Decode straight from the spooled upload at model resolution
+        with metrics.stage_timer("decode"):
+            image, original_size, original_mode = await run_in_threadpool(
+                decode_image_bounded,
+                file.file,
+                upload_config.get("target_side", DEFAULT_TARGET_SIDE),
+                upload_config.get("max_pixels", DEFAULT_MAX_PIXELS),
+            )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        # Unidentified or truncated images (OSError), corrupt headers that
+        # some plugins report as SyntaxError, decompression bombs
+        raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+    finally:
+        await file.close()
 
+    try:
         # Analyze image
-        results = multimodal_app.analyze_image(image, query)
+        results = await run_in_threadpool(multimodal_app.analyze_image, image, query)
 
         return ImageAnalysisResponse(
             caption=results["caption"],
             query=query,
             similarity=results.get("query_similarity"),
-            size=list(results["size"]),
-            mode=results["mode"],
+            size=list(original_size),
+            mode=original_mode,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image analysis failed: {str(e)}")
 
 
+@multimodal_router.post("/multimodal/search", response_model=MultimodalSearchResponse)
+async def search_multimodal(request: MultimodalSearchRequest, http_request: Request):
+    """Search documents and images with one query, as one ranked list
+
+    Results carry a ``modality`` (``text`` or ``image``), the raw CLIP
+    ``similarity`` and the calibrated ``score`` they are ranked by.
+    """
+    if not multimodal_app or multimodal_app.multimodal_index is None:
+        raise HTTPException(status_code=503, detail="Multimodal index not available")
+    index = multimodal_app.multimodal_index
+
+    async def compute() -> MultimodalSearchResponse:
+        try:
+            (results,) = await run_in_threadpool(
+                multimodal_app.search_multimodal,
+                [request.query],
+                request.top_k or 10,
+                request.modalities,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Multimodal search failed: {str(e)}"
+            )
+        return MultimodalSearchResponse(query=request.query, results=results)
+
+    return await cached_json_response(
+        "/multimodal/search", request, http_request, compute, f"mm.{index.version}"
+    )
+
+
+@multimodal_router.post("/multimodal/index")
+async def build_multimodal_index(request: MultimodalIndexRequest):
+    """(Re)build the joint index from gallery images and the RAG documents
+
+    Only images and chunks that are new or changed are encoded.
+    """
+    if not multimodal_app or multimodal_app.multimodal_index is None:
+        raise HTTPException(status_code=503, detail="Multimodal index not available")
+    rag = rag_system if request.include_documents else None
+    if request.include_documents and rag is None:
+        raise HTTPException(status_code=503, detail="RAG system not available")
+
+    try:
+        counts = await run_in_threadpool(
+            multimodal_app.build_multimodal_index,
+            multimodal_app.multimodal_index.store.root,
+            rag,
+            request.image_paths,
+            request.calibration_queries,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Multimodal indexing failed: {str(e)}"
+        )
+    response_cache.invalidate(f"mm.{multimodal_app.multimodal_index.version}", "mm")
+    return {
+        "message": "Multimodal index updated",
+        "version": multimodal_app.multimodal_index.version,
+        "counts": multimodal_app.multimodal_index.counts(),
+        **counts,
+    }
+
+
 # Additional utility endpoints
-@app.get("/rag/stats")
+@rag_router.get("/rag/stats")
 async def get_rag_stats():
     """Get RAG system statistics"""
     if not rag_system:
@@ -245,7 +1033,13 @@ async def get_rag_stats():
 
     try:
         # Get collection info
-        collection_count = rag_system.collection.count() if rag_system.collection else 0
+        if rag_system.snapshot_store:
+            snapshot = rag_system.snapshot
+            collection_count = len(snapshot) if snapshot else 0
+        else:
+            collection_count = (
+                rag_system.collection.count() if rag_system.collection else 0
+            )
 
         return {
             "collection_name": rag_system.config.collection_name,
@@ -253,11 +1047,117 @@ async def get_rag_stats():
             "embedding_model": rag_system.config.embedding_model,
             "chunk_size": rag_system.config.chunk_size,
             "top_k": rag_system.config.top_k,
+            "snapshot_version": (
+                rag_system.snapshot.version if rag_system.snapshot else None
+            ),
+            "index": (None if rag_system.snapshot_store else rag_system.index_stats()),
+            "tenants": tenant_manager.stats() if tenant_manager else None,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
 
+def create_app(
+    config_dict: Optional[Dict[str, Any]] = None,
+    routers: Optional[List[str]] = None,
+) -> FastAPI:
+    """Build the API application with the given routers enabled
+
+    The server state (middleware limits, caches, models) is process-wide,
+    so one process serves one application.
+    """
+    global app_config, routers_enabled, admission_controller, response_cache
+    global upload_config, upload_limits, warmup_runner
+
+    app_config = load_config() if config_dict is None else config_dict
+    routers_enabled = enabled_routers(app_config, routers)
+
+    application = FastAPI(
+        title="GenerativeAI Starter Kit API",
+        description="REST API for RAG, multimodal, and fine-tuning capabilities",
+        version=API_VERSION,
+        default_response_class=FastJSONResponse,
+    )
+
+    # Concurrency limits, bounded wait queues and per-client rate limits
+    admission_controller = AdmissionController.from_config(app_config)
+    application.add_middleware(AdmissionMiddleware, controller=admission_controller)
+    for path, limiter in admission_controller.limiters.items():
+        metrics.register_queue(path, lambda limiter=limiter: limiter.queue_depth)
+
+    # Reject oversized uploads while they stream in
+    upload_config = dict(app_config.get("uploads", {}))
+    upload_limits = {
+        "/multimodal/analyze": upload_config.get("max_bytes", DEFAULT_MAX_BYTES)
+    }
+    application.add_middleware(BodySizeLimitMiddleware, limits=upload_limits)
+
+    # Add CORS middleware (outside the two above, so their 413, 429 and 503
+    # responses carry the CORS headers too)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Cache of serialized responses for idempotent queries
+    response_cache = ResponseCache.from_config(app_config)
+    metrics.register_cache(
+        "response", lambda: response_cache.hits, lambda: response_cache.misses
+    )
+
+    # gzip/brotli for large bodies
+    application.add_middleware(
+        CompressionMiddleware,
+        minimum_size=app_config.get("compression", {}).get("minimum_size", 1024),
+    )
+
+    # Count and time every request per route template (outside admission
+    # control, so rejected requests are counted too)
+    application.add_middleware(metrics.MetricsMiddleware)
+
+    # Sampled request-scoped spans; the request span wraps everything else
+    tracing.configure(app_config)
+    application.add_middleware(tracing.TracingMiddleware)
+
+    warmup_runner = WarmupRunner(WarmupConfig.from_config(app_config))
+
+    application.include_router(core_router)
+    if "text" in routers_enabled:
+        application.include_router(text_router)
+    if "rag" in routers_enabled:
+        application.include_router(rag_router)
+    if "multimodal" in routers_enabled:
+        application.include_router(multimodal_router)
+    # msgpack-over-HTTP routes for internal callers, sharing the same models
+    if "binary" in routers_enabled:
+        from automation.binary_api import MSGPACK_AVAILABLE, create_binary_router
+
+        if MSGPACK_AVAILABLE:
+            application.include_router(
+                create_binary_router(
+                    get_rag=route_rag,
+                    get_multimodal=lambda: multimodal_app,
+                    on_ingest=invalidate_responses,
+                )
+            )
+
+    application.on_event("startup")(startup_event)
+    application.on_event("shutdown")(shutdown_event)
+    return application
+
+
+def __getattr__(name: str):
+    # ``api_server:app`` is built on first access, so importing this module
+    # for create_app() does not build a second application
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -267,10 +1167,49 @@ if __name__ == "__main__":
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind to")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of pre-forked workers sharing one memory-mapped index",
+    )
+    parser.add_argument(
+        "--snapshot-dir", default=None, help="Directory of published index snapshots"
+    )
+    parser.add_argument(
+        "--publish-snapshot",
+        action="store_true",
+        help="Export the collection as a new index snapshot and exit",
+    )
 
     args = parser.parse_args()
 
+    config_dict = load_config()
+    serving = config_dict.get("serving", {})
+    workers = args.workers or serving.get("workers", 1)
+    snapshot_dir = args.snapshot_dir or serving.get(
+        "snapshot_dir", "./api_index_snapshots"
+    )
+
+    if args.publish_snapshot:
+        publisher = build_rag_system(config_dict)
+        publisher.export_snapshot(snapshot_dir)
+        sys.exit(0)
+
     print(f"🌐 Starting API server on http://{args.host}:{args.port}")
-    print("📖 API documentation available at http://{args.host}:{args.port}/docs")
+    print(f"📖 API documentation available at http://{args.host}:{args.port}/docs")
+
+    if workers > 1:
+        from automation.prefork import serve_prefork
 
-    uvicorn.run("api_server:app", host=args.host, port=args.port, reload=args.reload)
+        serve_prefork(
+            create_app(config_dict),
+            preload=lambda: initialize_models(config_dict, snapshot_dir),
+            host=args.host,
+            port=args.port,
+            workers=workers,
+        )
+    else:
+        uvicorn.run(
+            "api_server:app", host=args.host, port=args.port, reload=args.reload
+        )
@@ -0,0 +1,309 @@
+# type: ignore
+"""
+Binary (msgpack-over-HTTP) API
+==============================
+
+A low-overhead front end for internal callers that query the RAG system in
+tight loops. Requests and responses are msgpack maps instead of JSON, search
+results are returned column-wise, and embeddings and distances travel as
+packed little-endian float32 arrays::
+
+    {"dtype": "<f4", "shape": [n, dim], "data": b"..."}
+
+which a client turns back into an array with
+``np.frombuffer(data, dtype).reshape(shape)``, without parsing any numbers.
+
+The routes live on the same FastAPI app as the REST endpoints (under
+``/bin``), so they share the loaded ``SimpleRAG`` and ``MultimodalApp``
+instances, the worker processes and the middleware stack:
+
+- ``POST /bin/rag/search``: ``{"query", "top_k"?, "fields"?,
+  "include_embeddings"?}``
+- ``POST /bin/rag/search/batch``: the same with ``"queries"`` instead
+- ``POST /bin/rag/embed``: ``{"texts"}`` -> query embeddings
+- ``POST /bin/rag/ingest``: ``{"documents", "metadata"?}``
+- ``POST /bin/multimodal/embed_text``: ``{"texts"}`` -> CLIP text embeddings
+
+The RAG routes accept an optional ``"collection"`` to address a tenant
+collection, as the REST endpoints do.
+
+Requires the ``msgpack`` package; the API server only mounts these routes
+when it is installed.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+# msgpack codec (optional)
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+ACCEPTED_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+MAX_BATCH_QUERIES = 1024
+
+# Result field -> response column
+RESULT_COLUMNS = {
+    "id": "ids",
+    "document": "documents",
+    "metadata": "metadatas",
+    "distance": "distances",
+}
+
+
+def pack_array(array) -> Dict[str, Any]:
+    """Pack a numeric array as little-endian float32 bytes with its shape"""
+    array = np.ascontiguousarray(array, dtype="<f4")
+    return {"dtype": "<f4", "shape": list(array.shape), "data": array.tobytes()}
+
+
+def unpack_array(packed: Dict[str, Any]) -> np.ndarray:
+    """Inverse of ``pack_array`` (zero-copy, read-only)"""
+    return np.frombuffer(packed["data"], dtype=packed["dtype"]).reshape(packed["shape"])
+
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def unpackb(body: bytes) -> Any:
+    return msgpack.unpackb(body, raw=False)
+
+
+def columnar_results(
+    results: List[Dict[str, Any]], fields: List[str]
+) -> Dict[str, Any]:
+    """Turn a list of search results into per-field columns"""
+    columns = {}
+    for field in fields:
+        values = [result.get(field) for result in results]
+        if field == "distance":
+            columns["distances"] = pack_array(
+                [np.nan if value is None else value for value in values]
+            )
+        else:
+            columns[RESULT_COLUMNS[field]] = values
+    return columns
+
+
+def _parse_fields(fields: Optional[List[str]]) -> List[str]:
+    if fields is None:
+        return list(RESULT_COLUMNS)
+    if not isinstance(fields, list) or any(f not in RESULT_COLUMNS for f in fields):
+        raise HTTPException(
+            status_code=400,
+            detail=f"fields must be a list of: {', '.join(RESULT_COLUMNS)}",
+        )
+    return fields
+
+
+def _parse_texts(value: Any, name: str, limit: int = MAX_BATCH_QUERIES) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise HTTPException(status_code=400, detail=f"{name} must be a list of strings")
+    if len(value) > limit:
+        raise HTTPException(
+            status_code=400, detail=f"{name} holds more than {limit} entries"
+        )
+    return value
+
+
+def _parse_top_k(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    # bool is an int subclass, but True is not a result count
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise HTTPException(status_code=400, detail="top_k must be a positive integer")
+    return value
+
+
+async def read_msgpack(request: Request) -> Dict[str, Any]:
+    """Read and decode a msgpack map from the request body"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in ACCEPTED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=415, detail=f"Content-Type must be {MSGPACK_CONTENT_TYPE}"
+        )
+    try:
+        payload = unpackb(await request.body())
+    except (ValueError, msgpack.ExtraData, msgpack.FormatError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid msgpack body: {e}")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a map")
+    return payload
+
+
+def msgpack_response(content: Any) -> Response:
+    return Response(content=packb(content), media_type=MSGPACK_CONTENT_TYPE)
+
+
+def create_binary_router(
+    get_rag: Callable[[Optional[str]], Any],
+    get_multimodal: Callable[[], Any],
+    on_ingest: Optional[Callable[[Any], None]] = None,
+) -> APIRouter:
+    """Build the ``/bin`` routes
+
+    ``get_rag`` and ``get_multimodal`` return the app's current model
+    instances (they are loaded at startup, after the routes are built).
+    ``get_rag`` receives the request's ``collection`` (None for the default
+    one) and raises ``ValueError`` for invalid names. ``on_ingest`` is
+    called with the RAG instance after documents were added, e.g. to
+    invalidate the response cache.
+    """
+    if not MSGPACK_AVAILABLE:
+        raise ImportError("msgpack is required for the binary API")
+
+    router = APIRouter(prefix="/bin", tags=["binary"])
+
+    def require_rag(payload: Dict[str, Any]):
+        try:
+            rag_system = get_rag(payload.get("collection"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if rag_system is None:
+            raise HTTPException(status_code=503, detail="RAG system not available")
+        return rag_system
+
+    async def search(rag_system, queries, top_k, fields, include_embeddings):
+        try:
+            embeddings = await run_in_threadpool(rag_system.embed_queries, queries)
+            batch_results = await run_in_threadpool(
+                rag_system.search_embeddings, embeddings, top_k
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+        content = {
+            "index_version": rag_system.index_version,
+            "results": [columnar_results(r, fields) for r in batch_results],
+        }
+        if include_embeddings:
+            content["embeddings"] = pack_array(embeddings)
+        return content
+
+    @router.post("/rag/search")
+    async def binary_search(request: Request):
+        """Search with one query; results and embedding as packed columns"""
+        payload = await read_msgpack(request)
+        rag_system = require_rag(payload)
+        query = payload.get("query")
+        if not isinstance(query, str):
+            raise HTTPException(status_code=400, detail="query must be a string")
+
+        content = await search(
+            rag_system,
+            [query],
+            _parse_top_k(payload.get("top_k")),
+            _parse_fields(payload.get("fields")),
+            payload.get("include_embeddings", False),
+        )
+        content.update(content.pop("results")[0])
+        return msgpack_response(content)
+
+    @router.post("/rag/search/batch")
+    async def binary_search_batch(request: Request):
+        """Search with many queries in one embedding and index pass"""
+        payload = await read_msgpack(request)
+        rag_system = require_rag(payload)
+        queries = _parse_texts(payload.get("queries"), "queries")
+        if not queries:
+            return msgpack_response(
+                {"index_version": rag_system.index_version, "results": []}
+            )
+
+        content = await search(
+            rag_system,
+            queries,
+            _parse_top_k(payload.get("top_k")),
+            _parse_fields(payload.get("fields")),
+            payload.get("include_embeddings", False),
+        )
+        return msgpack_response(content)
+
+    @router.post("/rag/embed")
+    async def binary_embed(request: Request):
+        """Embed texts with the RAG embedding model"""
+        payload = await read_msgpack(request)
+        rag_system = require_rag(payload)
+        texts = _parse_texts(payload.get("texts"), "texts")
+        if not texts:
+            return msgpack_response({"embeddings": pack_array(np.zeros((0, 0)))})
+        try:
+            embeddings = await run_in_threadpool(rag_system.embed_queries, texts)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Embedding failed: {str(e)}")
+        return msgpack_response({"embeddings": pack_array(embeddings)})
+
+    @router.post("/rag/ingest")
+    async def binary_ingest(request: Request):
+        """Add a batch of documents"""
+        payload = await read_msgpack(request)
+        rag_system = require_rag(payload)
+        if rag_system.snapshot_store:
+            raise HTTPException(
+                status_code=409,
+                detail="RAG system is serving a read-only snapshot; "
+                "ingest on the writer and publish a new snapshot",
+            )
+        if getattr(rag_system, "reindex_in_progress", False):
+            raise HTTPException(status_code=409, detail="A reindex is in progress")
+        documents = _parse_texts(payload.get("documents"), "documents", limit=65536)
+        metadata = payload.get("metadata")
+        if metadata is not None and (
+            not isinstance(metadata, list) or len(metadata) != len(documents)
+        ):
+            raise HTTPException(
+                status_code=400, detail="metadata must be a list matching documents"
+            )
+
+        try:
+            chunk_count = await run_in_threadpool(
+                rag_system.add_document_batch, documents, metadata
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to add documents: {str(e)}"
+            )
+        finally:
+            if on_ingest is not None:
+                on_ingest(rag_system)
+
+        return msgpack_response(
+            {
+                "document_count": len(documents),
+                "chunk_count": chunk_count,
+                "index_version": rag_system.index_version,
+            }
+        )
+
+    @router.post("/multimodal/embed_text")
+    async def binary_embed_text(request: Request):
+        """Encode texts into normalized CLIP embeddings"""
+        multimodal_app = get_multimodal()
+        if multimodal_app is None:
+            raise HTTPException(status_code=503, detail="Multimodal app not available")
+        payload = await read_msgpack(request)
+        texts = _parse_texts(payload.get("texts"), "texts")
+        if not texts:
+            return msgpack_response({"embeddings": pack_array(np.zeros((0, 0)))})
+        try:
+            embeddings = await run_in_threadpool(multimodal_app.encode_texts, texts)
+        except ValueError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Encoding failed: {str(e)}")
+        return msgpack_response({"embeddings": pack_array(embeddings)})
+
+    return router
@@ -0,0 +1,206 @@
+# type: ignore
+"""
+Hot Reload of the Server Configuration
+======================================
+
+Watches ``configs/config.yaml`` while the server runs and applies edits
+without a restart. Every changed setting falls into one of three classes:
+
+- *live*: tuning settings read on every request (``top_k``, chunking, cache
+  sizes, admission limits and queue sizes, tenant residency limits, upload
+  limits, the trace sample rate), applied in place to the running objects.
+  The image pipeline's pool sizes also apply live: loads started after the
+  change run on new pools, while running ones finish on the old pools
+- *rebuild*: settings the RAG system is built from (the vector database).
+  A new instance is initialized and warmed up in the background and then
+  swapped in atomically; requests keep being served by the old instance
+  until the swap, so there is no outage and no cold start
+- *restart*: settings baked into the middleware stack or the process layout
+  (workers, exporters, disk locations), and the models. These are reported
+  and ignored until the next restart. A new embedding model cannot be
+  swapped in: the stored vectors were made by the old one, so the index
+  must be rebuilt with it (``/rag/reindex``) after the restart
+
+A file that fails to parse (or is caught mid-write) is reported and the
+running configuration kept until a valid version is read.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import yaml
+
+# Settings (or whole sections) applied to the running server
+LIVE_SETTINGS = (
+    "rag.top_k",
+    "rag.chunk_size",
+    "rag.chunk_overlap",
+    "serving.snapshot_check_interval",
+    "response_cache.max_entries",
+    "response_cache.max_bytes",
+    "caption_cache.max_entries",
+    "caption_cache.max_bytes",
+    "prompt_cache.max_entries",
+    "image_fetch.max_connections",
+    "image_pipeline.batch_size",
+    "image_pipeline.io_workers",
+    "image_pipeline.decode_workers",
+    "image_pipeline.prefetch_batches",
+    "image_pipeline.timeout",
+    "image_pipeline.cache_max_entries",
+    "admission",
+    "tenants.memory_budget_mb",
+    "tenants.max_open",
+    "tenants.check_interval",
+    "uploads",
+    "tracing.sample_rate",
+    "warmup",
+    "config_reload.interval",
+)
+
+# Settings needing a new RAG instance, built in the background
+REBUILD_SETTINGS = ("vector_db",)
+
+
+def flatten(config: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Map dotted setting names (``rag.top_k``) to their values"""
+    flat = {}
+    for key, value in (config or {}).items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def _matches(name: str, settings) -> bool:
+    return any(name == s or name.startswith(s + ".") for s in settings)
+
+
+@dataclass
+class ConfigChanges:
+    """Changed setting names, grouped by how they can be applied"""
+
+    live: List[str] = field(default_factory=list)
+    rebuild: List[str] = field(default_factory=list)
+    restart: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.live or self.rebuild or self.restart)
+
+
+def diff_config(old: Dict[str, Any], new: Dict[str, Any]) -> ConfigChanges:
+    """Classify the settings that differ between two configurations"""
+    old_flat, new_flat = flatten(old), flatten(new)
+    changes = ConfigChanges()
+    for name in sorted(set(old_flat) | set(new_flat)):
+        if old_flat.get(name) == new_flat.get(name):
+            continue
+        if _matches(name, REBUILD_SETTINGS):
+            changes.rebuild.append(name)
+        elif _matches(name, LIVE_SETTINGS):
+            changes.live.append(name)
+        else:
+            changes.restart.append(name)
+    return changes
+
+
+def load_yaml(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path} does not contain a mapping")
+    return config
+
+
+class ConfigWatcher:
+    """Polls a config file and hands changed configurations to a callback
+
+    ``on_change(config, changes)`` is awaited on the event loop, one change
+    at a time; ``current`` only advances once it has returned, so a failed
+    apply is retried on the next edit. Restart-only settings are kept in
+    ``pending_restart`` until the process restarts.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        current: Dict[str, Any],
+        on_change: Callable[[Dict[str, Any], ConfigChanges], Awaitable[None]],
+        interval: float = 2.0,
+        load: Callable[[str], Dict[str, Any]] = load_yaml,
+    ):
+        self.path = path
+        self.current = current
+        self.on_change = on_change
+        self.interval = interval
+        self.load = load
+        self.generation = 0
+        self.pending_restart: List[str] = []
+        self.last_error: Optional[str] = None
+        self._mtime = self._stat()
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    async def check(self) -> bool:
+        """Reload the file if it changed; True if a change was applied"""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+
+        try:
+            config = self.load(self.path)
+        except Exception as e:
+            # Possibly caught mid-write: retried on the next poll, reported once
+            error = f"{type(e).__name__}: {e}"
+            if error != self.last_error:
+                print(f"⚠️ Ignoring invalid config {self.path}: {error}")
+            self.last_error = error
+            return False
+        self._mtime = mtime
+
+        changes = diff_config(self.current, config)
+        if not changes:
+            return False
+
+        if changes.restart:
+            print(
+                "⚠️ Config changes that need a restart: " + ", ".join(changes.restart)
+            )
+        try:
+            await self.on_change(config, changes)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"❌ Failed to apply config: {self.last_error}")
+            return False
+
+        self.current = config
+        self.generation += 1
+        self.last_error = None
+        self.pending_restart = sorted(set(self.pending_restart) | set(changes.restart))
+        print(f"🔄 Applied config generation {self.generation}")
+        return True
+
+    async def run(self):
+        """Watch the file until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "generation": self.generation,
+            "pending_restart": self.pending_restart,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,157 @@
+# type: ignore
+"""
+Streaming NDJSON Ingestion
+==========================
+
+Incremental parsing of (optionally gzip-compressed) newline-delimited JSON
+request bodies for bulk document ingestion. Bytes are decompressed and
+split into lines as they arrive, so memory use is bounded by the longest
+line plus one ingestion batch, whatever the size of the upload.
+
+Each line is one JSON object::
+
+    {"text": "document text", "metadata": {"source": "wiki"}}
+
+Backpressure comes for free: the API endpoint awaits each ingestion batch
+before pulling more bytes from the request, so a slow embedder throttles
+the client through TCP flow control.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+GZIP_MAGIC = b"\x1f\x8b"
+DEFAULT_MAX_LINE_BYTES = 8 * 1024 * 1024
+INFLATE_STEP_BYTES = 1024 * 1024
+
+
+class NDJSONError(ValueError):
+    """Raised for malformed lines, with the 1-based line number"""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"Line {line_number}: {message}")
+        self.line_number = line_number
+
+
+def _new_gzip_decompressor():
+    # wbits=16+MAX_WBITS selects the gzip container format
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+class _GzipStream:
+    """Incremental gzip decoder with bounded output per step
+
+    Inflating in bounded pieces keeps a highly compressed chunk from
+    expanding into one huge buffer; concatenated gzip members (as produced
+    by ``cat a.gz b.gz``) are decoded one after another.
+    """
+
+    def __init__(self, max_output: int = INFLATE_STEP_BYTES):
+        self.max_output = max_output
+        self.decompressor = _new_gzip_decompressor()
+        # Whether the current member has started (and so must be finished)
+        self.in_member = False
+
+    def feed(self, data: bytes):
+        while data:
+            self.in_member = True
+            out = self.decompressor.decompress(data, self.max_output)
+            if out:
+                yield out
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data
+                self.decompressor = _new_gzip_decompressor()
+                self.in_member = False
+            else:
+                data = self.decompressor.unconsumed_tail
+
+    def flush(self) -> bytes:
+        """The remaining output; raises ``zlib.error`` if the stream was cut"""
+        out = self.decompressor.flush()
+        if self.in_member and not self.decompressor.eof:
+            raise zlib.error("gzip stream is truncated")
+        return out
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    gzipped: Optional[bool] = None,
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> AsyncIterator[bytes]:
+    """Yield raw lines from a byte stream, decompressing gzip on the fly
+
+    With ``gzipped=None`` compression is detected from the gzip magic bytes.
+    A truncated gzip stream raises ``zlib.error``.
+    """
+    inflater = None
+    started = False
+    # The unfinished line, kept in pieces so every byte is scanned once
+    pending: List[bytes] = []
+    pending_bytes = 0
+    line_number = 0
+
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if not started:
+            started = True
+            if gzipped or (gzipped is None and chunk[:2] == GZIP_MAGIC):
+                inflater = _GzipStream()
+
+        pieces = inflater.feed(chunk) if inflater is not None else (chunk,)
+        for data in pieces:
+            start = 0
+            end = data.find(b"\n")
+            while end >= 0:
+                pending.append(data[start:end])
+                line_number += 1
+                yield b"".join(pending)
+                pending, pending_bytes = [], 0
+                start = end + 1
+                end = data.find(b"\n", start)
+            if start < len(data):
+                pending.append(data[start:])
+                pending_bytes += len(data) - start
+            if pending_bytes > max_line_bytes:
+                raise NDJSONError(
+                    line_number + 1, f"line longer than {max_line_bytes} bytes"
+                )
+
+    if inflater is not None:
+        pending.append(inflater.flush())
+    line = b"".join(pending)
+    if line:
+        yield line
+
+
+def parse_document_line(line: bytes, line_number: int) -> Tuple[str, Dict[str, Any]]:
+    """Parse one NDJSON line into ``(text, metadata)``"""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise NDJSONError(line_number, f"invalid JSON ({e})")
+
+    if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+        raise NDJSONError(line_number, 'expected an object with a "text" string')
+
+    metadata = record.get("metadata") or {}
+    if not isinstance(metadata, dict):
+        raise NDJSONError(line_number, '"metadata" must be an object')
+    return record["text"], metadata
+
+
+async def iter_documents(
+    chunks: AsyncIterator[bytes],
+    gzipped: Optional[bool] = None,
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ``(text, metadata)`` pairs from an NDJSON byte stream"""
+    line_number = 0
+    async for line in iter_ndjson_lines(chunks, gzipped, max_line_bytes):
+        line_number += 1
+        if line.strip():
+            yield parse_document_line(line, line_number)
@@ -0,0 +1,399 @@
+# type: ignore
+"""
+Prometheus Metrics for the API Server
+=====================================
+
+A small, dependency-free metrics registry that renders the Prometheus text
+exposition format. It provides counters, gauges (optionally backed by a
+callback, for values such as cache hit ratios or queue depths that are
+cheapest to read on scrape) and histograms with fixed buckets.
+
+Recording a sample costs one ``perf_counter`` call, a bisect over the
+bucket bounds and a short lock, so the instrumentation can stay on in
+production.
+
+In the pre-fork serving mode every worker keeps its own registry; scrape
+each worker (or label by pid in your collector) to get the full picture.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow generation
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+
+# Pipeline stages reported by the RAG and multimodal systems
+PIPELINE_STAGES = (
+    "embed",
+    "search",
+    "generate",
+    "caption",
+    "clip",
+    "decode",
+    "image_search",
+    "zero_shot",
+    "multimodal_search",
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Scope key under which middlewares that answer before routing (admission
+# control, upload limits) name the route they protect
+ROUTE_SCOPE_KEY = "metrics.route"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class holding one value per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, or be read from a callback on scrape"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Read the value from ``function`` whenever the metrics are scraped"""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                items.append((key, float(function())))
+            except Exception:
+                continue
+        for key, value in items:
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """A histogram with cumulative buckets, as expected by Prometheus"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def labels_init(self, **labels):
+        """Create an empty series so it is exported before the first sample"""
+        key = self._key(labels)
+        with self._lock:
+            self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._series.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames, key, ("le", _format_value(bound))
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """A collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=None
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Default registry and the metrics shared by the API server
+REGISTRY = MetricsRegistry()
+
+REQUESTS_TOTAL = REGISTRY.counter(
+    "genai_http_requests_total",
+    "HTTP requests handled, by route, method and status code",
+    ("route", "method", "status"),
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "genai_http_request_duration_seconds",
+    "HTTP request latency in seconds, by route and method",
+    ("route", "method"),
+)
+REQUESTS_IN_PROGRESS = REGISTRY.gauge(
+    "genai_http_requests_in_progress",
+    "HTTP requests currently being handled",
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "genai_pipeline_stage_duration_seconds",
+    "Latency of individual pipeline stages in seconds",
+    ("stage",),
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "genai_cache_hit_ratio",
+    "Fraction of cache lookups that were hits, by cache",
+    ("cache",),
+)
+WARMUP_SECONDS = REGISTRY.gauge(
+    "genai_warmup_step_seconds",
+    "Latency of each startup warmup step, for the first and steady-state calls",
+    ("step", "call"),
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "genai_queue_depth",
+    "Number of items waiting in a pool or queue, by queue",
+    ("queue",),
+)
+
+for _stage in PIPELINE_STAGES:
+    STAGE_LATENCY.labels_init(stage=_stage)
+
+
+# Set while synthetic calls (the warmup) run, so their cold-start timings
+# stay out of the histograms while real requests keep being recorded
+_stages_suppressed: ContextVar[bool] = ContextVar("stages_suppressed", default=False)
+
+
+@contextmanager
+def suppress_stages():
+    """Drop the stage timings of calls made in this context"""
+    token = _stages_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _stages_suppressed.reset(token)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record the duration of one pipeline stage
+
+    Matches the ``stage_observer`` hook of ``SimpleRAG`` and ``MultimodalApp``.
+    """
+    if _stages_suppressed.get():
+        return
+    STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+def stage_timer(stage: str):
+    """Context manager timing one pipeline stage"""
+    return STAGE_LATENCY.time(stage=stage)
+
+
+def register_cache(name: str, hits: Callable[[], int], misses: Callable[[], int]):
+    """Export the hit ratio of a cache from its hit and miss counters"""
+
+    def _ratio() -> float:
+        total = hits() + misses()
+        return hits() / total if total else 0.0
+
+    CACHE_HIT_RATIO.set_function(_ratio, cache=name)
+
+
+def register_queue(name: str, depth: Callable[[], int]):
+    """Export the current depth of a pool or queue"""
+    QUEUE_DEPTH.set_function(depth, queue=name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route
+
+    Routes are labelled by their path template (``/rag/query``), never by the
+    raw URL, so label cardinality stays bounded. Requests answered before
+    routing (e.g. shed with 429/503) are labelled with the route named under
+    ``ROUTE_SCOPE_KEY``, the others that matched no route as "unmatched".
+    """
+
+    def __init__(self, app, exclude: Optional[Tuple[str, ...]] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude or ())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        status = {"code": 500}
+        start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            template = (
+                getattr(route, "path", None)
+                or scope.get(ROUTE_SCOPE_KEY)
+                or "unmatched"
+            )
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start, route=template, method=method
+            )
+            REQUESTS_TOTAL.inc(route=template, method=method, status=status["code"])
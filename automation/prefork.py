@@ -0,0 +1,132 @@
+# type: ignore
+"""
+Pre-fork Serving for the API Server
+===================================
+
+Runs several uvicorn workers that share the models and the memory-mapped
+index loaded once by the master process. The master loads everything,
+freezes the garbage collector so inherited objects are not written to
+(which would break copy-on-write sharing), binds the listening socket and
+then forks the workers. Dead workers are respawned; SIGINT/SIGTERM stop
+the whole group.
+
+Index updates do not need a restart: workers pick up new versions from the
+snapshot store on their own (see ``SimpleRAG.initialize_from_snapshot``).
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import gc
+import os
+import signal
+import socket
+from typing import Callable, Dict, Optional
+
+import uvicorn
+
+
+def _bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _limit_threads(threads: int):
+    """Split the cores between workers instead of oversubscribing them"""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _run_worker(app, sock: socket.socket, threads: int):
+    """Entry point of a forked worker process"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _limit_threads(threads)
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            _run_worker(app, sock, threads)
+        except Exception as e:
+            print(f"❌ Worker {os.getpid()} crashed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def serve_prefork(
+    app,
+    preload: Callable[[], None],
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 2,
+    threads_per_worker: Optional[int] = None,
+):
+    """Load models once, then fork ``workers`` uvicorn processes"""
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork serving requires a POSIX platform")
+
+    print(f"🧠 Preloading models before forking {workers} workers...")
+    preload()
+
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers do not touch (and therefore copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    sock = _bind_socket(host, port)
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def _shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    for slot in range(workers):
+        children[_spawn(app, sock, threads)] = slot
+    print(f"✅ Started {workers} workers ({threads} threads each)")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+
+        print(f"⚠️ Worker {pid} exited with status {status}, respawning...")
+        children[_spawn(app, sock, threads)] = slot
+
+    sock.close()
+    print("👋 All workers stopped")
@@ -0,0 +1,199 @@
+# type: ignore
+"""
+Response Cache for Idempotent API Queries
+=========================================
+
+Caches serialized JSON responses of idempotent endpoints such as
+``/rag/query``. Entries are keyed by the route, the canonical request body
+and the index version, so a change to the collection can never serve a
+stale answer: it simply produces different keys.
+
+The cache has two tiers:
+
+- an in-memory LRU bounded by entry count and total bytes
+- an optional on-disk tier (one file per entry, grouped by index version)
+  that catches entries evicted from memory and survives restarts when the
+  index version is stable (e.g. a published snapshot)
+
+Versions carry the namespace of their index as a dotted prefix (e.g.
+``rag.`` or ``t.<tenant>.``), so invalidating one index's stale versions
+leaves the entries of every other index alone.
+
+The cache key doubles as a strong ETag, so ``If-None-Match`` revalidations
+are answered with 304 without even looking up the body.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """A two-tier (memory LRU + optional disk) cache of response bodies"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any]) -> "ResponseCache":
+        cache_config = config_dict.get("response_cache", {})
+        return cls(
+            max_entries=cache_config.get("max_entries", 1024),
+            max_bytes=cache_config.get("max_bytes", 64 * 1024 * 1024),
+            disk_dir=cache_config.get("disk_dir"),
+        )
+
+    @staticmethod
+    def make_key(route: str, payload: Any, index_version: str) -> str:
+        """Build the cache key from the route, request body and index version"""
+        canonical = json.dumps(
+            payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        request = f"{route}\n{canonical}".encode("utf-8")
+        digest = hashlib.sha256(request).hexdigest()[:32]
+        # The version prefix keeps disk entries of one index version together
+        return f"{_safe_version(index_version)}-{digest}"
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'"{key}"'
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """Check an ``If-None-Match`` header value against an ETag"""
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self.get_memory(key)
+        if body is None:
+            body = self.get_disk(key)
+        return body
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        """Look a key up in the memory tier only (a miss is not counted)"""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return body
+
+    def get_disk(self, key: str) -> Optional[bytes]:
+        """Look a key up in the disk tier (blocking), after a memory miss"""
+        body = self._read_disk(key)
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Promote disk hits back into memory
+        self._store_memory(key, body)
+        return body
+
+    def put(self, key: str, body: bytes):
+        self._store_memory(key, body)
+        self._write_disk(key, body)
+
+    def invalidate(
+        self, current_version: Optional[str] = None, namespace: Optional[str] = None
+    ):
+        """Drop cached entries, keeping only those of ``current_version``
+
+        With ``namespace`` only versions in that namespace are dropped.
+        """
+        keep = _safe_version(current_version) if current_version else None
+        scope = _safe_version(namespace) + "." if namespace else ""
+
+        def stale(version: str) -> bool:
+            return version.startswith(scope) and version != keep
+
+        with self._lock:
+            for key in list(self._entries):
+                if stale(key.rsplit("-", 1)[0]):
+                    self._bytes -= len(self._entries.pop(key))
+
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if stale(name):
+                    shutil.rmtree(os.path.join(self.disk_dir, name), ignore_errors=True)
+
+    def resize(self, max_entries: int, max_bytes: int):
+        """Change the memory limits, evicting entries beyond the new ones"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _store_memory(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        version, digest = key.rsplit("-", 1)
+        return os.path.join(self.disk_dir, version, digest + ".json")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, body: bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+
+def _safe_version(version: str) -> str:
+    """Make an index version usable as a key prefix and directory name"""
+    return "".join(c if c.isalnum() or c in "._" else "_" for c in str(version))
@@ -0,0 +1,351 @@
+# type: ignore
+"""
+Multi-Tenant Collection Routing
+===============================
+
+Serves many tenant collections from one node. Each tenant's chunks live in
+their own ``SnapshotStore`` directory under a common root, and all tenants
+share the single embedding model of the default ``SimpleRAG`` instance.
+
+Index residency is managed under a memory budget:
+
+- tenants are opened lazily on their first request
+- the most recently used tenants are held *resident*, with their matrices
+  read into process memory, as long as their total size fits the budget
+- least recently used tenants are demoted to a memory-mapped view of the
+  same files, which stays searchable but whose pages the OS can reclaim,
+  and beyond ``max_open`` tenants the mapping itself is closed
+
+A tenant written by another process (e.g. another pre-forked worker) is
+picked up once its ``CURRENT`` pointer changes, checked at most once every
+``check_interval`` seconds.
+
+``TenantIndexManager.index(name)`` returns a ``TenantIndex``, which offers
+the subset of the ``SimpleRAG`` interface the API endpoints use, so a
+request is routed to a tenant simply by swapping the object it talks to.
+
+Every ingest publishes a complete new version of the tenant (copying its
+existing chunks), which suits the many-small-collections case this is for;
+one large corpus belongs in the default collection. Ingests hold the
+tenant store's cross-process ``write_lock()`` from reading the current
+version until publishing, so writers in different workers append to each
+other's versions instead of replacing them.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import re
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from examples.rag.index_snapshot import IndexSnapshot, SnapshotStore
+
+TENANT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+DEFAULT_MEMORY_BUDGET_MB = 512
+DEFAULT_MAX_OPEN = 256
+
+
+def validate_tenant_name(name: str) -> str:
+    """Check that a tenant name is safe to use as a directory name"""
+    if not isinstance(name, str) or not TENANT_NAME_PATTERN.match(name):
+        raise ValueError(
+            f"Invalid collection name {name!r}: use 1-64 letters, digits, "
+            "'_' or '-', starting with a letter or digit"
+        )
+    return name
+
+
+class _TenantEntry:
+    """An open tenant snapshot and its residency state"""
+
+    __slots__ = ("snapshot", "resident", "checked_at")
+
+    def __init__(self, snapshot: IndexSnapshot, resident: bool):
+        self.snapshot = snapshot
+        self.resident = resident
+        self.checked_at = time.monotonic()
+
+
+class TenantIndexManager:
+    """Lazily opened tenant indexes, kept resident under an LRU memory budget"""
+
+    def __init__(
+        self,
+        root: str,
+        rag,
+        memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024,
+        max_open: int = DEFAULT_MAX_OPEN,
+        check_interval: float = 1.0,
+    ):
+        self.root = root
+        self.rag = rag
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_open = max_open
+        self.check_interval = check_interval
+        self.loads = 0
+        self.demotions = 0
+        self._entries: "OrderedDict[str, _TenantEntry]" = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+        # Serialize checking and loading each tenant, without blocking others
+        # (dropped with the tenant's entry)
+        self._load_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any], rag) -> "TenantIndexManager":
+        tenant_config = config_dict.get("tenants", {})
+        return cls(
+            root=tenant_config.get("root", "./api_tenants"),
+            rag=rag,
+            memory_budget_bytes=int(
+                tenant_config.get("memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)
+                * 1024
+                * 1024
+            ),
+            max_open=tenant_config.get("max_open", DEFAULT_MAX_OPEN),
+            check_interval=tenant_config.get("check_interval", 1.0),
+        )
+
+    def reconfigure(self, config_dict: Dict[str, Any]):
+        """Apply changed residency limits, demoting tenants if needed"""
+        tenant_config = config_dict.get("tenants", {})
+        with self._lock:
+            self.memory_budget_bytes = int(
+                tenant_config.get("memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)
+                * 1024
+                * 1024
+            )
+            self.max_open = tenant_config.get("max_open", DEFAULT_MAX_OPEN)
+            self.check_interval = tenant_config.get("check_interval", 1.0)
+            self._rebalance()
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._resident_bytes
+
+    def index(self, name: str) -> "TenantIndex":
+        """Route to a tenant (created on its first ingest)"""
+        return TenantIndex(self, validate_tenant_name(name))
+
+    def tenants(self) -> List[str]:
+        """Names of all tenants with a published index"""
+        return sorted(
+            name
+            for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "CURRENT"))
+        )
+
+    def _store(self, name: str) -> SnapshotStore:
+        return SnapshotStore(os.path.join(self.root, name))
+
+    def acquire(self, name: str) -> Optional[IndexSnapshot]:
+        """The tenant's current snapshot, loading it if needed (None if empty)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                if self._usable(entry):
+                    return entry.snapshot
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # Another thread may have loaded it while this one waited
+                entry = self._entries.get(name)
+                if entry is not None and self._usable(entry):
+                    return entry.snapshot
+            snapshot = self._load(name, entry)
+
+        if snapshot is None:
+            with self._lock:
+                # Names without a published index hold no lock
+                if name not in self._entries:
+                    self._load_locks.pop(name, None)
+        return snapshot
+
+    def _usable(self, entry: _TenantEntry) -> bool:
+        """Whether an entry can be served without a check (under the lock)"""
+        fresh = time.monotonic() - entry.checked_at < self.check_interval
+        oversized = entry.snapshot.nbytes > self.memory_budget_bytes
+        return fresh and (entry.resident or oversized)
+
+    def _load(
+        self, name: str, entry: Optional[_TenantEntry]
+    ) -> Optional[IndexSnapshot]:
+        """Check the tenant's current version (holding its load lock)"""
+        store_path = os.path.join(self.root, name)
+        if not os.path.isdir(store_path):
+            return None
+        store = self._store(name)
+        version = store.current_version()
+        if version is None:
+            return None
+
+        if entry is not None and entry.snapshot.version == version:
+            with self._lock:
+                entry.checked_at = time.monotonic()
+                snapshot = entry.snapshot
+                if entry.resident:
+                    return snapshot
+            # Promote a demoted tenant back into memory
+            return self._install(name, snapshot)
+        return self._install(name, IndexSnapshot(os.path.join(store.root, version)))
+
+    def _install(self, name: str, snapshot: IndexSnapshot) -> IndexSnapshot:
+        """Make a snapshot the tenant's current one and rebalance residency"""
+        fits = snapshot.nbytes <= self.memory_budget_bytes
+        if fits and not snapshot.in_memory:
+            snapshot = snapshot.to_memory()
+            self.loads += 1
+        elif not fits and snapshot.in_memory:
+            snapshot = snapshot.to_mapped()
+
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            if previous is not None and previous.resident:
+                self._resident_bytes -= previous.snapshot.nbytes
+            self._entries[name] = _TenantEntry(snapshot, resident=fits)
+            if fits:
+                self._resident_bytes += snapshot.nbytes
+            self._rebalance()
+        return snapshot
+
+    def _rebalance(self):
+        """Demote least recently used tenants until the budget holds"""
+        for name in list(self._entries):
+            if self._resident_bytes <= self.memory_budget_bytes:
+                break
+            entry = self._entries[name]
+            if entry.resident:
+                self._resident_bytes -= entry.snapshot.nbytes
+                # Release the private copy; the mapping reads the same files
+                entry.snapshot = entry.snapshot.to_mapped()
+                entry.resident = False
+                self.demotions += 1
+
+        while len(self._entries) > self.max_open:
+            name, entry = self._entries.popitem(last=False)
+            if entry.resident:
+                self._resident_bytes -= entry.snapshot.nbytes
+            self._load_locks.pop(name, None)
+
+    def version(self, name: str) -> str:
+        snapshot = self.acquire(name)
+        return snapshot.version if snapshot else "empty"
+
+    def search_batch(
+        self, name: str, query_embeddings: np.ndarray, top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        snapshot = self.acquire(name)
+        if snapshot is None:
+            return [[] for _ in query_embeddings]
+        return snapshot.search(query_embeddings, top_k)
+
+    def add_document_batch(
+        self, name: str, documents: List[str], metadata: List[Dict] = None
+    ) -> int:
+        """Chunk, embed and append documents, publishing a new tenant version"""
+        store = self._store(name)
+        with store.write_lock():
+            with self._lock:
+                load_lock = self._load_locks.setdefault(name, threading.Lock())
+            with load_lock:
+                # The version on disk, which another worker may have replaced
+                # since this process last checked
+                with self._lock:
+                    entry = self._entries.get(name)
+                current = self._load(name, entry)
+
+            doc_id_offset = 0
+            if current is not None and len(current):
+                doc_id_offset = 1 + max(m.get("doc_id", -1) for m in current.metadatas)
+
+            chunks, metadatas, embeddings = self.rag.embed_documents(
+                documents, metadata, doc_id_offset
+            )
+            added = len(chunks)
+            if not added:
+                return 0
+
+            ids = [f"chunk_{uuid.uuid4().hex}" for _ in chunks]
+            if current is not None and len(current):
+                ids = current.ids + ids
+                chunks = current.documents + chunks
+                metadatas = current.metadatas + metadatas
+                embeddings = np.concatenate([current.embeddings, embeddings])
+
+            version = store.publish(ids, embeddings, chunks, metadatas)
+            with self._lock:
+                load_lock = self._load_locks.setdefault(name, threading.Lock())
+            with load_lock:
+                self._install(name, IndexSnapshot(os.path.join(store.root, version)))
+            store.prune(keep=2)
+            return added
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            resident = [n for n, e in self._entries.items() if e.resident]
+            return {
+                "open_tenants": len(self._entries),
+                "resident_tenants": resident,
+                "resident_bytes": self._resident_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "demotions": self.demotions,
+            }
+
+
+class TenantIndex:
+    """A tenant collection behind the ``SimpleRAG`` interface used by the API"""
+
+    # Tenant collections are always writable
+    snapshot_store = None
+
+    def __init__(self, manager: TenantIndexManager, name: str):
+        self.manager = manager
+        self.name = name
+        self.config = manager.rag.config
+
+    @property
+    def index_version(self) -> str:
+        return f"t.{self.name}.{self.manager.version(self.name)}"
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        return self.manager.rag.embed_queries(queries)
+
+    def search_embeddings(
+        self, query_embeddings: np.ndarray, top_k: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        return self.manager.search_batch(
+            self.name, query_embeddings, top_k or self.config.top_k
+        )
+
+    def search_batch(
+        self, queries: List[str], top_k: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        if not queries:
+            return []
+        return self.search_embeddings(self.embed_queries(queries), top_k)
+
+    def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+        return self.search_batch([query], top_k)[0]
+
+    def generate_response(self, query: str, context_docs: List[str]) -> str:
+        return self.manager.rag.generate_response(query, context_docs)
+
+    def add_document_batch(
+        self, documents: List[str], metadata: List[Dict] = None, doc_id_offset=0
+    ) -> int:
+        # Document ids continue from the tenant's stored documents
+        return self.manager.add_document_batch(self.name, documents, metadata)
+
+    def add_documents(self, documents: List[str], metadata: List[Dict] = None):
+        self.add_document_batch(documents, metadata)
@@ -0,0 +1,74 @@
+# type: ignore
+"""
+Text Processing Routes
+======================
+
+The lightweight text endpoints formerly served by ``docker_api.py`` as a
+separate application. They need no model libraries, so a deployment that
+enables only this router starts in a fraction of a second.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+router = APIRouter(tags=["text"])
+
+
+class TextRequest(BaseModel):
+    text: str
+    max_length: int = 100
+
+
+class TextResponse(BaseModel):
+    result: str
+    processed: bool
+
+
+@router.post("/process-text", response_model=TextResponse)
+async def process_text(request: TextRequest):
+    """Truncate and tag a text (a minimal processing example)"""
+    try:
+        processed_text = f"Processed: {request.text[:request.max_length]}"
+        if len(request.text) > request.max_length:
+            processed_text += "..."
+
+        return TextResponse(result=processed_text, processed=True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/demo")
+async def demo_endpoint():
+    """Describe the demo deployment"""
+    return {
+        "demo": "This is a demo endpoint",
+        "features": [
+            "FastAPI framework",
+            "Docker containerization",
+            "Health checks",
+            "API documentation",
+            "Error handling",
+        ],
+        "usage": {
+            "health_check": "GET /health",
+            "process_text": "POST /process-text",
+            "documentation": "GET /docs",
+        },
+    }
+
+
+@router.get("/info")
+async def get_info():
+    """Runtime information about the service"""
+    return {
+        "app_name": "GenerativeAI-Starter-Kit",
+        "python_version": "3.11",
+        "environment": os.getenv("ENVIRONMENT", "development"),
+        "container": True,
+        "timestamp": "2025-09-25",
+    }
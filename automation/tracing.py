@@ -0,0 +1,515 @@
+# type: ignore
+"""
+Request-Scoped Tracing
+======================
+
+A lightweight span API for finding out which pipeline stage made a request
+slow. Spans nest through a ``contextvars`` context variable, so the span
+opened by ``TracingMiddleware`` for a request becomes the parent of every
+span opened while serving it, including inside ``run_in_threadpool`` calls
+(which copy the context into the worker thread)::
+
+    from automation import tracing
+
+    with tracing.span("rag.rerank", candidates=len(results)) as current:
+        ...
+        current.set_attribute("kept", len(kept))
+
+Sampling is decided once per trace, at the root span: unsampled traces get
+a shared no-op span that records nothing, so tracing can stay on in
+production at a low ``sample_rate``. Incoming W3C ``traceparent`` headers
+are honoured (parent-based sampling), and sampled responses carry their
+``traceparent`` so a slow request can be looked up.
+
+Finished spans are queued and exported in batches by a background thread,
+either as JSON lines (``JSONLogExporter``) or as OTLP/HTTP JSON to a local
+OpenTelemetry collector (``OTLPHTTPExporter``). When the queue is full new
+spans are dropped rather than slowing requests down.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import threading
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318/v1/traces"
+DEFAULT_SERVICE_NAME = "genai-starter-kit-api"
+
+# OTLP span kinds
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """A timed, named operation within a trace"""
+
+    recording = True
+
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        kind: str = "internal",
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException):
+        self.error = f"{type(exception).__name__}: {exception}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The JSON log representation of the span"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+        }
+
+
+class _NonRecordingSpan:
+    """The span of an unsampled trace: accepts every call, records nothing"""
+
+    recording = False
+    name = None
+    trace_id = None
+    span_id = None
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NonRecordingSpan()
+
+_current_span: ContextVar = ContextVar("genai_current_span", default=None)
+
+
+def current_span():
+    """The innermost active span, or None outside any trace"""
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Parse a W3C ``traceparent`` header into (trace_id, span_id, sampled)"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 0x01)
+
+
+class JSONLogExporter:
+    """Write finished spans as JSON lines to a file (or stderr)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+            for span in spans
+        )
+        with self._lock:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            else:
+                sys.stderr.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Build an OTLP/HTTP JSON ``ExportTraceServiceRequest`` body"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes({"service.name": service_name})
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "automation.tracing"},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": SPAN_KINDS.get(span.kind, 1),
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": _otlp_attributes(span.attributes),
+                                "status": (
+                                    {"code": 2, "message": span.error}
+                                    if span.error
+                                    else {"code": 1}
+                                ),
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class OTLPHTTPExporter:
+    """Send finished spans to an OpenTelemetry collector over OTLP/HTTP JSON"""
+
+    def __init__(
+        self,
+        endpoint: str = DEFAULT_OTLP_ENDPOINT,
+        service_name: str = DEFAULT_SERVICE_NAME,
+        timeout: float = 2.0,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        body = json.dumps(otlp_payload(spans, self.service_name)).encode("utf-8")
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class BatchSpanProcessor:
+    """Queue finished spans and export them in batches from a background thread
+
+    The thread is started lazily and restarted after a fork, so pre-forked
+    workers each export their own spans.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        max_queue: int = 2048,
+        batch_size: int = 256,
+        flush_interval: float = 2.0,
+    ):
+        self.exporter = exporter
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = None
+        self._pid = None
+        self._export_lock = threading.Lock()
+
+    def submit(self, span: Span):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(self.max_queue)
+        threading.Thread(
+            target=self._run, args=(self._queue,), name="span-exporter", daemon=True
+        ).start()
+
+    def _run(self, spans: queue.Queue):
+        while True:
+            try:
+                batch = [spans.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            batch = self._drain(spans, batch)
+            self._export(batch)
+            for _ in batch:
+                spans.task_done()
+
+    def _drain(self, spans: queue.Queue, batch: List[Span]) -> List[Span]:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(spans.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[Span]):
+        try:
+            with self._export_lock:
+                self.exporter.export(batch)
+        except Exception as e:
+            print(f"⚠️ Failed to export {len(batch)} spans: {e}")
+
+    def flush(self):
+        """Export everything queued so far, waiting for in-flight batches"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        while True:
+            batch = self._drain(self._queue, [])
+            if not batch:
+                break
+            self._export(batch)
+            for _ in batch:
+                self._queue.task_done()
+        self._queue.join()
+
+
+class Tracer:
+    """Creates spans, applies sampling and hands finished spans to the exporter
+
+    A tracer without an exporter records nothing.
+    """
+
+    def __init__(self, exporter=None, sample_rate: float = 0.0, **processor_options):
+        self.sample_rate = sample_rate
+        self.processor = (
+            BatchSpanProcessor(exporter, **processor_options) if exporter else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None,
+        kind: str = "internal",
+    ):
+        """Open a span as a child of the current one
+
+        A new root span samples the trace, or follows the sampling decision
+        of a remote parent given as a ``traceparent`` header.
+        """
+        parent = _current_span.get()
+        if parent is NOOP_SPAN:
+            yield NOOP_SPAN
+            return
+
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, attributes, kind)
+        else:
+            remote = parse_traceparent(traceparent)
+            sampled = remote[2] if remote else self.should_sample()
+            if not self.enabled or not sampled:
+                token = _current_span.set(NOOP_SPAN)
+                try:
+                    yield NOOP_SPAN
+                finally:
+                    _current_span.reset(token)
+                return
+            trace_id, parent_id = (
+                (remote[0], remote[1])
+                if remote
+                else (
+                    _new_trace_id(),
+                    None,
+                )
+            )
+            span = Span(name, trace_id, parent_id, attributes, kind)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self.processor.submit(span)
+
+    def flush(self):
+        if self.processor is not None:
+            self.processor.flush()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, **attributes):
+    """Open a span on the global tracer (a no-op outside sampled traces)"""
+    return _tracer.start_span(name, attributes)
+
+
+def configure(config_dict: Dict[str, Any]) -> Tracer:
+    """Install the global tracer from the ``tracing`` config section
+
+    ``exporter`` is ``"json"`` (JSON lines to ``path``, or stderr without a
+    path), ``"otlp"`` (OTLP/HTTP JSON to ``endpoint``) or ``"none"``.
+    """
+    tracing_config = config_dict.get("tracing", {})
+    kind = tracing_config.get("exporter", "none")
+    if kind == "json":
+        exporter = JSONLogExporter(tracing_config.get("path"))
+    elif kind == "otlp":
+        exporter = OTLPHTTPExporter(
+            tracing_config.get("endpoint", DEFAULT_OTLP_ENDPOINT),
+            tracing_config.get("service_name", DEFAULT_SERVICE_NAME),
+        )
+    elif kind == "none":
+        exporter = None
+    else:
+        raise ValueError(f"Unknown tracing exporter: {kind}")
+
+    tracer = Tracer(
+        exporter,
+        sample_rate=tracing_config.get("sample_rate", 0.01),
+        max_queue=tracing_config.get("max_queue", 2048),
+    )
+    set_tracer(tracer)
+    return tracer
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope.get("method", "GET")
+        attributes = {"http.method": method, "http.target": scope.get("path", "")}
+
+        with _tracer.start_span(
+            f"{method} {scope.get('path', '')}", attributes, traceparent, "server"
+        ) as request_span:
+
+            async def traced_send(message):
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute("http.status_code", message["status"])
+                    if request_span.recording:
+                        headers = list(message.get("headers", []))
+                        headers.append(
+                            (b"traceparent", request_span.traceparent.encode("ascii"))
+                        )
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                # Name the span by route template once routing has run
+                route = scope.get("route")
+                if request_span.recording and route is not None:
+                    request_span.name = f"{method} {route.path}"
+                    request_span.set_attribute("http.route", route.path)
@@ -0,0 +1,159 @@
+# type: ignore
+"""
+Bounded Uploads and Image Decoding
+==================================
+
+Keeps the memory used by image uploads bounded:
+
+- ``BodySizeLimitMiddleware`` rejects oversized request bodies with 413
+  while they stream in (by ``Content-Length`` up front, and by counting
+  chunks for chunked uploads). Below the limit, Starlette's multipart
+  parser streams file parts into a ``SpooledTemporaryFile`` that moves to
+  disk after 1 MB, so the upload is never held as one ``bytes`` object.
+- ``decode_image_bounded`` checks the pixel count from the image header,
+  then uses Pillow's ``draft`` (DCT scaling for JPEG) and ``reduce`` to
+  decode straight to roughly the resolution the models need, instead of
+  decoding the full-resolution bitmap first.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import json
+import math
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from automation import metrics
+
+# PIL is only needed to decode images, so it is imported there: the size
+# limit middleware (installed in every deployment) works without it
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# Largest input resolution used by the models (BLIP base runs at 384px,
+# CLIP ViT-B/32 at 224px); decoding beyond this is wasted work
+DEFAULT_TARGET_SIDE = 384
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 40_000_000
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds its byte or pixel limit"""
+
+
+def decode_image_bounded(
+    fileobj,
+    target_side: int = DEFAULT_TARGET_SIDE,
+    max_pixels: int = DEFAULT_MAX_PIXELS,
+) -> Tuple["Image.Image", Tuple[int, int], str]:
+    """Decode an image at reduced resolution
+
+    Returns the decoded RGB image, whose shorter side is at least
+    ``target_side`` (unless the original is smaller), plus the original
+    ``(width, height)`` and mode read from the header.
+    """
+    from PIL import Image
+
+    image = Image.open(fileobj)
+    original_size = image.size
+    original_mode = image.mode
+    width, height = original_size
+    if width * height > max_pixels:
+        raise UploadTooLarge(
+            f"Image has {width * height} pixels, the limit is {max_pixels}"
+        )
+
+    scale = min(width, height) / target_side
+    if scale > 1:
+        # JPEG: let the decoder scale by 1/2, 1/4 or 1/8 while decoding.
+        # draft() never goes below the requested size.
+        image.draft("RGB", (math.ceil(width / scale), math.ceil(height / scale)))
+
+    image = image.convert("RGB")
+
+    # Integer box reduction for whatever the decoder could not scale away
+    factor = int(min(image.size) // target_side)
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    return image, original_size, original_mode
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware rejecting request bodies above a per-route limit"""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http":
+            limit = self.limits.get(scope.get("path"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        # A 413 sent before routing is still counted under this route
+        scope[metrics.ROUTE_SCOPE_KEY] = scope["path"]
+
+        for name, value in scope.get("headers", ()):
+            if name != b"content-length":
+                continue
+            try:
+                length = int(value)
+            except ValueError:
+                length = -1
+            if length < 0:
+                await self._respond(send, 400, "Invalid Content-Length header")
+                return
+            if length > limit:
+                await self._reject(send, limit)
+                return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit and not rejected:
+                    # Answer now: the app may turn the error into a 400
+                    rejected = True
+                    await self._reject(send, limit)
+                    raise UploadTooLarge(f"Request body exceeds {limit} bytes")
+            return message
+
+        async def guarded_send(message):
+            # Whatever the app sends after the 413 is dropped
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if not rejected:
+                raise
+
+    @classmethod
+    async def _reject(cls, send, limit: int):
+        await cls._respond(
+            send, 413, f"Request body exceeds the limit of {limit} bytes"
+        )
+
+    @staticmethod
+    async def _respond(send, status: int, detail: str):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
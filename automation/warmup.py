@@ -0,0 +1,260 @@
+# type: ignore
+"""
+Startup Warmup and Canary Queries
+=================================
+
+The first requests after a deploy are several times slower than the rest:
+torch initializes kernels and thread pools lazily, tokenizers fill their
+caches and the index pages are still on disk. ``WarmupRunner`` pays those
+costs before the server reports ready:
+
+- synthetic ``embed`` and ``search`` calls for every configured query
+  length and batch size
+- synthetic ``caption`` and ``clip`` calls for every configured image size
+- a pass over the index that faults its pages into memory
+- optional canary queries, real queries run through the full retrieval and
+  generation path as a final check
+
+Each step is timed on its first call and, over the remaining iterations,
+at steady state. The timings are exported as metrics and appended as one
+JSON line per warmup to ``results_path``, so startup regressions show up
+when deploys are compared. A failed warmup is retried with exponential
+backoff, so a transient error does not keep the server unready until the
+next restart.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import json
+import time
+import asyncio
+import statistics
+import threading
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from automation import metrics
+
+# Varied words, so tokenizers see more than one repeated token
+WARMUP_VOCABULARY = (
+    "retrieval augmented generation embeds documents into vectors and "
+    "searches the nearest chunks before a language model writes an answer "
+    "grounded in the context images are captioned and compared with text"
+).split()
+
+
+@dataclass
+class WarmupConfig:
+    """Configuration for the startup warmup"""
+
+    enabled: bool = True
+    iterations: int = 3
+    query_words: List[int] = field(default_factory=lambda: [8, 64, 256])
+    batch_sizes: List[int] = field(default_factory=lambda: [1, 8])
+    image_sizes: List[List[int]] = field(
+        default_factory=lambda: [[384, 384], [640, 480]]
+    )
+    canary_queries: List[str] = field(default_factory=list)
+    touch_index: bool = True
+    # A failed step keeps the server unready
+    fail_on_error: bool = True
+    # Delay before retrying a failed warmup (0: never), doubled per attempt
+    retry_seconds: float = 5.0
+    max_retry_seconds: float = 300.0
+    results_path: Optional[str] = "./api_warmup.jsonl"
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any]) -> "WarmupConfig":
+        warmup = config_dict.get("warmup", {})
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in warmup.items() if k in known})
+
+
+@dataclass
+class WarmupStep:
+    """Timings of one warmup step"""
+
+    name: str
+    first_seconds: float
+    steady_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+def synthetic_text(words: int, offset: int = 0) -> str:
+    """A deterministic text of ``words`` words"""
+    n = len(WARMUP_VOCABULARY)
+    return " ".join(WARMUP_VOCABULARY[(offset + i) % n] for i in range(words))
+
+
+def synthetic_image(width: int, height: int, seed: int = 0) -> "Image.Image":
+    """A noise image, so preprocessing runs on realistic pixel data"""
+    # Only multimodal deployments have PIL (and need numpy here)
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+class WarmupRunner:
+    """Runs the warmup once and tracks readiness
+
+    ``state`` moves from ``pending`` through ``running`` to ``ready`` (or
+    ``failed``, which ``run_until_ready`` retries).
+    """
+
+    def __init__(self, config: Optional[WarmupConfig] = None):
+        self.config = config or WarmupConfig()
+        self.state = "pending"
+        self.steps: List[WarmupStep] = []
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def run(self, rag=None, multimodal=None) -> List[WarmupStep]:
+        """Warm up the given systems (blocking); skipped ones may be None"""
+        with self._lock:
+            if self.state not in ("pending", "failed"):
+                return self.steps
+            self.state = "running"
+
+        self.steps = []
+        self.started_at = time.time()
+        start = time.perf_counter()
+
+        if not self.config.enabled:
+            self.duration = 0.0
+            self.state = "ready"
+            return self.steps
+
+        print("🔥 Warming up models and index...")
+        # Keep cold-start latencies out of the serving histograms (only
+        # these calls: requests served meanwhile are still recorded)
+        with metrics.suppress_stages():
+            try:
+                if rag is not None:
+                    self._warm_rag(rag)
+                if multimodal is not None:
+                    self._warm_multimodal(multimodal)
+            except Exception as e:
+                self.steps.append(WarmupStep("warmup", 0.0, error=str(e)))
+
+        self.duration = time.perf_counter() - start
+        failed = [step for step in self.steps if step.error]
+        if failed and self.config.fail_on_error:
+            self.state = "failed"
+            print(f"❌ Warmup failed: {failed[0].name}: {failed[0].error}")
+        else:
+            self.state = "ready"
+            print(f"✅ Warmup complete in {self.duration:.2f}s")
+        self._persist()
+        return self.steps
+
+    async def run_until_ready(self, rag=None, multimodal=None):
+        """Run the warmup off the event loop, retrying it while it fails"""
+        delay = self.config.retry_seconds
+        while True:
+            await run_in_threadpool(self.run, rag, multimodal)
+            if self.state != "failed" or delay <= 0:
+                return
+            print(f"🔁 Retrying warmup in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self.config.max_retry_seconds)
+
+    def _measure(self, name: str, function: Callable[[], Any], iterations=None):
+        """Time ``function`` on its first call and at steady state"""
+        iterations = max(1, iterations or self.config.iterations)
+        timings = []
+        try:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - start)
+        except Exception as e:
+            step = WarmupStep(name, timings[0] if timings else 0.0, error=str(e))
+        else:
+            steady = statistics.median(timings[1:]) if len(timings) > 1 else None
+            step = WarmupStep(name, timings[0], steady)
+
+        self.steps.append(step)
+        metrics.WARMUP_SECONDS.set(step.first_seconds, step=name, call="first")
+        if step.steady_seconds is not None:
+            metrics.WARMUP_SECONDS.set(step.steady_seconds, step=name, call="steady")
+        return step
+
+    def _warm_rag(self, rag):
+        config = self.config
+        if config.touch_index:
+            self._measure("touch_index", rag.touch_index, iterations=1)
+
+        for words in config.query_words:
+            for batch_size in config.batch_sizes:
+                texts = [synthetic_text(words, offset=i) for i in range(batch_size)]
+                self._measure(
+                    f"embed[{words}w,x{batch_size}]",
+                    lambda texts=texts: rag.embed_queries(texts),
+                )
+
+        for batch_size in config.batch_sizes:
+            texts = [synthetic_text(16, offset=i) for i in range(batch_size)]
+            try:
+                embeddings = rag.embed_queries(texts)
+            except Exception:
+                # Already recorded as a failed embed step
+                continue
+            self._measure(
+                f"search[x{batch_size}]",
+                lambda embeddings=embeddings: rag.search_embeddings(embeddings),
+            )
+
+        for i, query in enumerate(config.canary_queries):
+
+            def canary(query=query):
+                results = rag.search(query)
+                rag.generate_response(query, [r["document"] for r in results])
+
+            self._measure(f"canary[{i}]", canary, iterations=1)
+
+    def _warm_multimodal(self, multimodal):
+        text = synthetic_text(12)
+        for width, height in self.config.image_sizes:
+            image = synthetic_image(width, height)
+            self._measure(
+                f"caption[{width}x{height}]",
+                # Bypass the caption cache so every iteration runs the model
+                lambda image=image: multimodal.generate_caption(image, use_cache=False),
+            )
+            self._measure(
+                f"clip[{width}x{height}]",
+                lambda image=image: multimodal.calculate_similarity(image, text),
+            )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "steps": [asdict(step) for step in self.steps],
+        }
+
+    def _persist(self):
+        """Append this warmup's timings to the results file"""
+        path = self.config.results_path
+        if not path:
+            return
+        try:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({**self.report(), "pid": os.getpid()}) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not record warmup results: {e}")
@@ -0,0 +1,221 @@
+# type: ignore
+"""
+Pooled and Cached URL Image Fetching
+====================================
+
+``ImageFetcher`` downloads images for ``MultimodalApp`` and its loading
+pipeline:
+
+- one shared ``requests.Session`` keeps connections alive and pools them
+  per host, so repeated downloads skip the TCP and TLS handshakes
+- at most ``max_connections`` downloads run at once, and at most
+  ``per_host`` against any one host (further requests wait for a pooled
+  connection)
+- bodies are streamed and abandoned as soon as they exceed ``max_bytes``
+  (checked against ``Content-Length`` up front when the server sends one)
+- with ``cache_dir``, bodies are cached on disk with their validators:
+  responses still fresh under ``Cache-Control: max-age`` are served without
+  a request, stale ones are revalidated with ``If-None-Match`` /
+  ``If-Modified-Since`` and a ``304`` reuses the cached body
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+
+class ImageFetcher:
+    """Downloads images over pooled keep-alive connections, with a disk cache"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        timeout: float = 10.0,
+        max_connections: int = 16,
+        per_host: int = 8,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.chunk_size = chunk_size
+        self.stats = {"requests": 0, "cache_hits": 0, "revalidated": 0, "bytes": 0}
+
+        self.session = requests.Session()
+        # Requests beyond per_host wait for one of the host's connections
+        adapter = HTTPAdapter(
+            pool_connections=max(1, max_connections),
+            pool_maxsize=max(1, per_host),
+            pool_block=True,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max(1, max_connections))
+        self._lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any]) -> "ImageFetcher":
+        fetch_config = config_dict.get("image_fetch", {})
+        return cls(
+            cache_dir=fetch_config.get("cache_dir"),
+            max_bytes=fetch_config.get("max_bytes", DEFAULT_MAX_BYTES),
+            timeout=fetch_config.get("timeout", 10.0),
+            max_connections=fetch_config.get("max_connections", 16),
+            per_host=fetch_config.get("per_host", 8),
+        )
+
+    def fetch(self, url: str) -> bytes:
+        """The body of ``url``, from the cache when it is still valid"""
+        cached = self._read_cache(url)
+        if cached is not None:
+            meta, body = cached
+            if meta.get("fresh_until", 0) > time.time():
+                self._count("cache_hits")
+                return body
+
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self._slots:
+            self._count("requests")
+            with self.session.get(
+                url, headers=headers, timeout=self.timeout, stream=True
+            ) as response:
+                if response.status_code == 304 and cached is not None:
+                    self._count("revalidated")
+                    self._write_cache(url, body, response.headers, meta)
+                    return body
+                response.raise_for_status()
+                body = self._read_body(url, response)
+
+        self._write_cache(url, body, response.headers)
+        return body
+
+    def fetch_many(
+        self, urls: List[str], workers: Optional[int] = None
+    ) -> List[Union[bytes, Exception]]:
+        """Fetch URLs concurrently; failed ones are returned as exceptions"""
+
+        def fetch_one(url: str):
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                return e
+
+        workers = workers or self.max_connections
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return list(pool.map(fetch_one, urls))
+
+    def resize(self, max_connections: int):
+        """Change how many downloads may run at once
+
+        Downloads already running release the slots of the previous limit.
+        """
+        self.max_connections = max_connections
+        self._slots = threading.BoundedSemaphore(max(1, max_connections))
+
+    def close(self):
+        self.session.close()
+
+    def _read_body(self, url: str, response) -> bytes:
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise ValueError(
+                f"{url} is {int(length)} bytes; the limit is {self.max_bytes}"
+            )
+
+        chunks, size = [], 0
+        for chunk in response.iter_content(self.chunk_size):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ValueError(f"{url} exceeds the limit of {self.max_bytes} bytes")
+            chunks.append(chunk)
+        self._count("bytes", size)
+        return b"".join(chunks)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    # Disk cache: <sha256(url)>.body and .json (validators and freshness)
+
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        stem = os.path.join(self.cache_dir, key)
+        return stem + ".body", stem + ".json"
+
+    def _read_cache(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        if not self.cache_dir:
+            return None
+        body_path, meta_path = self._cache_paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or meta.get("size") != len(body):
+            return None
+        return meta, body
+
+    def _write_cache(self, url: str, body: bytes, headers, previous=None):
+        if not self.cache_dir:
+            return
+        cache_control = _parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-store" in cache_control:
+            return
+
+        previous = previous or {}
+        meta = {
+            "url": url,
+            "size": len(body),
+            # A 304 may omit validators that are still current
+            "etag": headers.get("ETag") or previous.get("etag"),
+            "last_modified": headers.get("Last-Modified")
+            or previous.get("last_modified"),
+            "fresh_until": 0,
+        }
+        max_age = cache_control.get("max-age")
+        if max_age and max_age.isdigit() and "no-cache" not in cache_control:
+            meta["fresh_until"] = time.time() + int(max_age)
+
+        body_path, meta_path = self._cache_paths(url)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        if not previous:
+            with open(body_path + suffix, "wb") as f:
+                f.write(body)
+            os.replace(body_path + suffix, body_path)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + suffix, meta_path)
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
@@ -0,0 +1,222 @@
+# type: ignore
+"""
+Precomputed CLIP Image Index
+============================
+
+Searching a gallery by re-encoding every image for every query costs one
+CLIP forward pass per image. ``ImageIndex`` embeds the gallery once and
+keeps the L2-normalized image vectors in a memory-mapped matrix (stored with
+the versioned ``SnapshotStore`` of the RAG example), so a text query costs
+one text encode and one vectorized top-k over the matrix.
+
+Updates are incremental: each image is stored with a fingerprint of its
+file (modification time and size), and ``update`` only embeds images that
+are new or changed, copying the vectors of unchanged ones. URLs have no
+fingerprint and are embedded once unless ``refresh=True``.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import sys
+import heapq
+import hashlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from examples.rag.index_snapshot import IndexSnapshot, SnapshotStore
+except ImportError:
+    # Run as a script from examples/multimodal
+    sys.path.append(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+    from examples.rag.index_snapshot import IndexSnapshot, SnapshotStore
+
+# Embeds image paths batch by batch, yielding the vectors of the images that
+# could be loaded together with their paths
+EmbedPaths = Callable[[List[str]], Iterable[Tuple[np.ndarray, List[str]]]]
+
+
+def image_id(path: str) -> str:
+    """A stable id for an image path or URL"""
+    return "img_" + hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint(path: str) -> Optional[Dict[str, int]]:
+    """Modification time and size of a local image (None for URLs)"""
+    if path.startswith(("http://", "https://")):
+        return None
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+class ImageIndex:
+    """L2-normalized image embeddings of a gallery, searchable by text"""
+
+    def __init__(self, root: str):
+        self.store = SnapshotStore(root)
+        self.snapshot: Optional[IndexSnapshot] = self.store.open_current()
+
+    def __len__(self) -> int:
+        return len(self.snapshot) if self.snapshot else 0
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.snapshot.version if self.snapshot else None
+
+    @property
+    def paths(self) -> List[str]:
+        return list(self.snapshot.documents) if self.snapshot else []
+
+    def update(
+        self,
+        paths: List[str],
+        embed: EmbedPaths,
+        prune: bool = True,
+        refresh: bool = False,
+    ) -> Dict[str, int]:
+        """Bring the index in line with ``paths``, embedding only what changed
+
+        With ``prune`` images no longer listed are dropped; otherwise
+        ``paths`` are added to the existing gallery. A new version is only
+        published if something changed.
+        """
+        existing = {}
+        if self.snapshot is not None:
+            existing = {
+                meta["path"]: (row, meta)
+                for row, meta in enumerate(self.snapshot.metadatas)
+            }
+
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        listed = dict.fromkeys(paths)
+        kept, stale = [], []
+        for path in listed:
+            try:
+                current = fingerprint(path)
+            except OSError as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                counts["failed"] += 1
+                continue
+
+            previous = existing.get(path)
+            if previous is not None and not refresh:
+                if current is None or current == previous[1].get("fingerprint"):
+                    kept.append(previous)
+                    continue
+            stale.append((path, current))
+
+        unlisted = [existing[path] for path in existing if path not in listed]
+        if prune:
+            counts["removed"] = len(unlisted)
+        else:
+            kept.extend(unlisted)
+        counts["unchanged"] = len(kept)
+
+        vectors, metadatas = [], []
+        fingerprints = dict(stale)
+        if stale:
+            for embeddings, loaded in embed(list(fingerprints)):
+                for vector, path in zip(embeddings, loaded):
+                    vectors.append(vector)
+                    metadatas.append({"path": path, "fingerprint": fingerprints[path]})
+                    counts["updated" if path in existing else "added"] += 1
+        counts["failed"] += len(stale) - len(vectors)
+
+        if not (vectors or counts["removed"]):
+            return counts
+
+        parts = []
+        if kept:
+            rows = [row for row, _ in kept]
+            parts.append(np.asarray(self.snapshot.embeddings[rows]))
+        if vectors:
+            parts.append(_normalize(np.stack(vectors).astype(np.float32)))
+        if parts:
+            embeddings = np.concatenate(parts)
+        else:
+            embeddings = np.zeros((0, self.snapshot.embeddings.shape[1]), np.float32)
+        metadatas = [meta for _, meta in kept] + metadatas
+        gallery = [meta["path"] for meta in metadatas]
+
+        self.store.publish(
+            [image_id(path) for path in gallery], embeddings, gallery, metadatas
+        )
+        self.store.prune(keep=2)
+        self.snapshot = self.store.open_current()
+        print(
+            f"🖼️ Image index {self.version}: {len(self)} images "
+            f"({counts['added']} added, {counts['updated']} updated, "
+            f"{counts['removed']} removed)"
+        )
+        return counts
+
+    def search(
+        self, text_embeddings: np.ndarray, top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k images for each L2-normalized text embedding"""
+        queries = np.atleast_2d(np.asarray(text_embeddings, dtype=np.float32))
+        if self.snapshot is None:
+            return [[] for _ in range(len(queries))]
+
+        # For unit vectors the squared L2 distance is 2 - 2 * cosine
+        return [
+            [
+                {
+                    "id": result["id"],
+                    "path": result["document"],
+                    "similarity": 1.0 - result["distance"] / 2.0,
+                }
+                for result in results
+            ]
+            for results in self.snapshot.search(_normalize(queries), top_k)
+        ]
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` highest scores, best first"""
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.sort(np.argpartition(-scores, top_k - 1)[:top_k])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class TopK:
+    """The ``k`` best-scored items of a stream of batches, in O(k) memory
+
+    Ties keep the item pushed first, as ``top_k_indices`` does.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.seen = 0
+        # Min-heap of (score, -sequence, item): the root is evicted first
+        self._heap: List[Tuple[float, int, Any]] = []
+
+    def push(self, scores: np.ndarray, items: List[Any]):
+        """Offer a batch of items with their scores"""
+        scores = np.asarray(scores, dtype=np.float32)
+        start, self.seen = self.seen, self.seen + len(items)
+        for i in np.sort(top_k_indices(scores, self.k)):
+            entry = (float(scores[i]), -(start + int(i)), items[i])
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+            elif entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def results(self) -> List[Tuple[Any, float]]:
+        """(item, score) pairs, best first"""
+        ranked = sorted(self._heap, key=lambda entry: entry[:2], reverse=True)
+        return [(item, score) for score, _, item in ranked]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
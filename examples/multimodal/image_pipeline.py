@@ -0,0 +1,421 @@
+# type: ignore
+"""
+Parallel Image Loading Pipeline
+===============================
+
+Loading a gallery one image at a time leaves CLIP idle while files are read,
+URLs fetched and JPEGs decoded. ``ImagePipeline`` overlaps that work with
+inference:
+
+- a thread pool reads files and downloads URLs (I/O releases the GIL)
+- a process pool decodes, resizes and crops the images (``crop_image``;
+  with ``normalize_pixels`` it is a numpy port of CLIP's torchvision
+  transform, so workers do not need torch)
+- with ``cache_dir``, the crops of local files are kept in a ``PixelCache``
+  and later loads of an unchanged file skip reading and decoding it
+- a background thread assembles the results, in order, into batches on a
+  bounded queue, so at most ``prefetch_batches`` batches wait for the model
+  and memory stays bounded however large the gallery is
+
+Images that cannot be read or decoded are reported in the batch's
+``failed`` list instead of failing the batch. ``pending("io")`` and
+``pending("decode")`` give the work queued or running on each pool.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import io
+import queue
+import weakref
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Normalization constants of the CLIP image encoder
+CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+
+@dataclass
+class PipelineConfig:
+    """Configuration for the image loading pipeline"""
+
+    batch_size: int = 32
+    # Threads reading files and URLs. Each waits for its image to be decoded,
+    # so there must be more of them than decoders (None: decoders + 4)
+    io_workers: Optional[int] = None
+    # Decoder processes (None: one per CPU, 0: decode in the I/O threads)
+    decode_workers: Optional[int] = None
+    # Decoded batches allowed to wait for the model
+    prefetch_batches: int = 2
+    image_size: int = 224
+    # Seconds allowed for one URL download
+    timeout: float = 10.0
+    # Directory of the memory-mapped cache of decoded crops (None: no cache)
+    cache_dir: Optional[str] = None
+    # Crops kept by the cache when it is compacted
+    cache_max_entries: int = 20000
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any]) -> "PipelineConfig":
+        pipeline = config_dict.get("image_pipeline", {})
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in pipeline.items() if k in known})
+
+
+@dataclass
+class ImageBatch:
+    """Preprocessed images ready for the CLIP image encoder"""
+
+    # Shape (len(paths), 3, image_size, image_size), float32
+    pixels: np.ndarray
+    paths: List[str] = field(default_factory=list)
+    # (path, error) of the images of this batch that could not be loaded
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def read_image_bytes(path: str, timeout: float = 10.0) -> bytes:
+    """Read an image file, or download it if ``path`` is a URL"""
+    if path.startswith(("http://", "https://")):
+        import requests
+
+        response = requests.get(path, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def preprocess_image(image: "Image.Image", size: int = 224) -> np.ndarray:
+    """CLIP's input transform: bicubic resize, center crop and normalize
+
+    Returns a float32 array of shape (3, size, size).
+    """
+    return normalize_pixels(crop_image(image, size))
+
+
+def crop_image(image: "Image.Image", size: int = 224) -> np.ndarray:
+    """Resize and center crop an image as CLIP does, before normalization
+
+    Returns a uint8 RGB array of shape (size, size, 3).
+    """
+    from PIL import Image
+
+    # Resize the short side to ``size``, as torchvision's Resize(size) does
+    width, height = image.size
+    if width <= height:
+        resized = (size, int(size * height / width))
+    else:
+        resized = (int(size * width / height), size)
+    image = image.resize(resized, Image.BICUBIC)
+
+    left = int(round((resized[0] - size) / 2.0))
+    top = int(round((resized[1] - size) / 2.0))
+    image = image.crop((left, top, left + size, top + size)).convert("RGB")
+    return np.asarray(image, dtype=np.uint8)
+
+
+def normalize_pixels(pixels: np.ndarray) -> np.ndarray:
+    """Turn a uint8 crop (size, size, 3) into a CLIP input array (3, size, size)"""
+    pixels = pixels.astype(np.float32) / 255.0
+    pixels = (pixels - CLIP_MEAN) / CLIP_STD
+    return np.ascontiguousarray(pixels.transpose(2, 0, 1))
+
+
+def decode_image(data: bytes, size: int = 224) -> np.ndarray:
+    """Decode image bytes into a uint8 crop (runs in worker processes)
+
+    Workers return the crop rather than the normalized float array: it is a
+    quarter of the size to send back, and it is what the pixel cache stores.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        return crop_image(image, size)
+
+
+def make_thumbnail(image: "Image.Image", size: int = 256) -> "Image.Image":
+    """An RGB copy of ``image`` that fits in ``size`` x ``size`` pixels
+
+    JPEGs are decoded at a reduced scale (``Image.draft``) instead of at full
+    resolution.
+    """
+    from PIL import Image
+
+    image.draft("RGB", (size, size))
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail((size, size), Image.BICUBIC)
+    return thumbnail
+
+
+_DONE = object()
+
+
+def _shutdown_pools(*pools):
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+class _Pools:
+    """The executors built for one pool size, and the loads using them"""
+
+    def __init__(self, io: ThreadPoolExecutor, decode, finalizer):
+        self.io = io
+        self.decode: Optional[ProcessPoolExecutor] = decode
+        self.finalizer: weakref.finalize = finalizer
+        self.users = 0
+        # Replaced by pools of a new size; shut down once unused
+        self.retired = False
+
+
+def _shut_down_later(pools: _Pools):
+    """Shut retired pools down without blocking the caller"""
+    # Nothing submits to them any more; running work finishes first
+    threading.Thread(target=pools.finalizer, daemon=True).start()
+
+
+class ImagePipeline:
+    """Loads images in the background and yields them as batches
+
+    The pools are created on first use and shared by later calls; ``close()``
+    shuts them down, as does collecting the pipeline. ``reconfigure()``
+    applies a new configuration: loads started afterwards use pools of the
+    new size, while running ones finish on the old pools.
+    """
+
+    def __init__(self, config: Optional[PipelineConfig] = None, fetcher=None):
+        self.config = config or PipelineConfig()
+        # Optional ImageFetcher used for URLs (pooled connections, disk cache)
+        self.fetcher = fetcher
+        # Crops of local images, so they are decoded once (see pixel_cache)
+        self.cache = None
+        if self.config.cache_dir:
+            try:
+                from examples.multimodal.pixel_cache import PixelCache
+            except ImportError:
+                from pixel_cache import PixelCache
+
+            self.cache = PixelCache(
+                self.config.cache_dir,
+                self.config.image_size,
+                max_entries=self.config.cache_max_entries,
+            )
+        self._current: Optional[_Pools] = None
+        self._lock = threading.Lock()
+        # Work submitted to each pool and not finished yet (queue depths)
+        self._pending = {"io": 0, "decode": 0}
+
+    def pending(self, pool: str) -> int:
+        """Loads (``io``) or decodes (``decode``) queued or running"""
+        return self._pending[pool]
+
+    def _track(self, pool: str, amount: int):
+        with self._lock:
+            self._pending[pool] += amount
+
+    def _pools(self):
+        with self._lock:
+            pools = self._open_pools()
+            return pools.io, pools.decode
+
+    def _open_pools(self) -> _Pools:
+        """The current pools, created if needed (under the lock)"""
+        if self._current is None:
+            workers = self.config.decode_workers
+            if workers is None:
+                workers = os.cpu_count() or 1
+            io_workers = self.config.io_workers
+            if io_workers is None:
+                # The extra threads read while every decoder is busy
+                io_workers = workers + 4
+            io = ThreadPoolExecutor(
+                max_workers=max(1, io_workers),
+                thread_name_prefix="image-io",
+            )
+            decode = None
+            if workers > 0:
+                # Spawned, not forked: the parent may hold torch/CUDA state
+                decode = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            # A process pool left to interpreter exit can race its own
+            # cleanup, so shut the pools down with the pipeline
+            finalizer = weakref.finalize(self, _shutdown_pools, io, decode)
+            self._current = _Pools(io, decode, finalizer)
+        return self._current
+
+    def reconfigure(self, config: PipelineConfig):
+        """Apply a new configuration to the loads started from now on
+
+        ``cache_dir`` and ``image_size`` keep their values: the cache files
+        are laid out for them. A new ``cache_max_entries`` applies from the
+        cache's next compaction.
+        """
+        retired = None
+        with self._lock:
+            old = self.config
+            self.config = replace(
+                config, cache_dir=old.cache_dir, image_size=old.image_size
+            )
+            if self.cache is not None:
+                self.cache.max_entries = config.cache_max_entries
+
+            resized = (config.io_workers, config.decode_workers) != (
+                old.io_workers,
+                old.decode_workers,
+            )
+            if resized and self._current is not None:
+                self._current.retired = True
+                if not self._current.users:
+                    retired = self._current
+                self._current = None
+        if retired is not None:
+            _shut_down_later(retired)
+
+    def _release(self, pools: _Pools):
+        with self._lock:
+            pools.users -= 1
+            unused = pools.retired and not pools.users
+        if unused:
+            _shut_down_later(pools)
+
+    def _load(self, path: str, decode: Optional[ProcessPoolExecutor]) -> np.ndarray:
+        key = self.cache.key(path) if self.cache is not None else None
+        if key is not None:
+            pixels = self.cache.get(key)
+            if pixels is not None:
+                return normalize_pixels(pixels)
+
+        if self.fetcher is not None and path.startswith(("http://", "https://")):
+            data = self.fetcher.fetch(path)
+        else:
+            data = read_image_bytes(path, timeout=self.config.timeout)
+        size = self.config.image_size
+        if decode is None:
+            pixels = decode_image(data, size)
+        else:
+            self._track("decode", 1)
+            try:
+                pixels = decode.submit(decode_image, data, size).result()
+            finally:
+                self._track("decode", -1)
+        if key is not None:
+            self.cache.put(key, pixels)
+        return normalize_pixels(pixels)
+
+    def batches(
+        self, paths: List[str], batch_size: Optional[int] = None
+    ) -> Iterator[ImageBatch]:
+        """Yield the images of ``paths`` in order, ``batch_size`` at a time
+
+        Loading runs ahead of the consumer by at most ``prefetch_batches``
+        batches. Closing the iterator early cancels the remaining work.
+        """
+        batch_size = max(1, batch_size or self.config.batch_size)
+        out = queue.Queue(maxsize=max(1, self.config.prefetch_batches))
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(list(paths), batch_size, out, stop),
+            name="image-batches",
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+    def _produce(self, paths, batch_size: int, out: queue.Queue, stop):
+        with self._lock:
+            pools = self._open_pools()
+            pools.users += 1
+        in_flight = deque()
+        try:
+            for start in range(0, len(paths), batch_size):
+                batch = paths[start : start + batch_size]
+                in_flight.append([(p, self._submit(pools, p)) for p in batch])
+                # Keep loading ahead while earlier batches wait in the queue
+                if len(in_flight) > self.config.prefetch_batches:
+                    if not self._put(out, self._collect(in_flight.popleft()), stop):
+                        return
+            while in_flight:
+                if not self._put(out, self._collect(in_flight.popleft()), stop):
+                    return
+        except BaseException as e:
+            self._put(out, e, stop)
+        finally:
+            for batch in in_flight:
+                for _, future in batch:
+                    if future.cancel():
+                        self._track("io", -1)
+            self._release(pools)
+            self._put(out, _DONE, stop)
+
+    def _submit(self, pools: _Pools, path: str) -> Future:
+        self._track("io", 1)
+        try:
+            return pools.io.submit(self._run_load, path, pools.decode)
+        except BaseException:
+            self._track("io", -1)
+            raise
+
+    def _run_load(self, path: str, decode) -> np.ndarray:
+        try:
+            return self._load(path, decode)
+        finally:
+            self._track("io", -1)
+
+    def _collect(self, batch: List[Tuple[str, Future]]) -> ImageBatch:
+        pixels, loaded, failed = [], [], []
+        for path, future in batch:
+            try:
+                pixels.append(future.result())
+                loaded.append(path)
+            except Exception as e:
+                failed.append((path, f"{type(e).__name__}: {e}"))
+        size = self.config.image_size
+        if pixels:
+            stacked = np.stack(pixels)
+        else:
+            stacked = np.zeros((0, 3, size, size), dtype=np.float32)
+        return ImageBatch(stacked, loaded, failed)
+
+    @staticmethod
+    def _put(out: queue.Queue, item, stop) -> bool:
+        """Queue ``item`` unless the consumer has gone away"""
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        with self._lock:
+            if self._current is not None:
+                self._current.finalizer()
+            self._current = None
+
+    def __enter__(self) -> "ImagePipeline":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
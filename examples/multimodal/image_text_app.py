@@ -14,11 +14,14 @@ License: MIT
 """
 
 import os
+import time
+import threading
+import hashlib
 import torch
 import numpy as np
 from PIL import Image
-from typing import List, Dict, Any, Optional
-import requests
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple, Union
 from io import BytesIO
 
 # CLIP for image-text understanding
@@ -38,29 +41,130 @@ from transformers import BlipProcessor, BlipForConditionalGeneration
 # Gradio for web interface
 import gradio as gr
 
+# Request tracing spans (no-op when the automation package is not importable)
+try:
+    from automation.tracing import span as trace_span
+except ImportError:
+
+    @contextmanager
+    def trace_span(name: str, **attributes):
+        yield None
+
+
+# Caption cache (in memory and optionally on disk)
+try:
+    from automation.response_cache import ResponseCache
+except ImportError:
+    ResponseCache = None
+
+# Gallery index, image loading, CPU inference and prompt embeddings
+try:
+    from examples.multimodal.image_index import ImageIndex, TopK
+    from examples.multimodal.image_fetcher import ImageFetcher
+    from examples.multimodal.image_pipeline import (
+        ImagePipeline,
+        PipelineConfig,
+        make_thumbnail,
+    )
+    from examples.multimodal import cpu_inference
+    from examples.multimodal.multimodal_index import MultimodalIndex
+    from examples.multimodal.prompt_store import PromptSet, PromptStore, zero_shot
+except ImportError:
+    from image_index import ImageIndex, TopK
+    from image_fetcher import ImageFetcher
+    from image_pipeline import ImagePipeline, PipelineConfig, make_thumbnail
+    import cpu_inference
+    from multimodal_index import MultimodalIndex
+    from prompt_store import PromptSet, PromptStore, zero_shot
+
+InferenceConfig = cpu_inference.InferenceConfig
+
+
+def image_digest(image: Image.Image) -> str:
+    """A hash of the decoded pixels, the same for repeat uploads of an image"""
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def _normalized(features: np.ndarray) -> np.ndarray:
+    features = features.astype(np.float32)
+    return features / np.linalg.norm(features, axis=-1, keepdims=True)
+
 
 class MultimodalApp:
     """A multimodal application for image-text tasks"""
 
-    def __init__(self):
+    CLIP_MODEL = "ViT-B/32"
+    CAPTION_MODEL = "Salesforce/blip-image-captioning-base"
+
+    def __init__(
+        self,
+        pipeline_config: Optional[PipelineConfig] = None,
+        caption_cache: Optional["ResponseCache"] = None,
+        inference_config: Optional[InferenceConfig] = None,
+        prompt_store: Optional[PromptStore] = None,
+        image_fetcher: Optional[ImageFetcher] = None,
+    ):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.clip_model = None
         self.clip_preprocess = None
         self.caption_processor = None
         self.caption_model = None
+        # Quantization, threads, decoding and ONNX settings
+        self.inference_config = inference_config or InferenceConfig()
+        # CLIP encoders in ONNX Runtime, when inference_config.onnx_dir is set
+        self.onnx_clip: Optional["cpu_inference.OnnxClipEncoder"] = None
+        # Precomputed CLIP embeddings of a gallery, see build_image_index()
+        self.image_index: Optional[ImageIndex] = None
+        # Gallery images and RAG chunks in one index, see build_multimodal_index()
+        self.multimodal_index: Optional[MultimodalIndex] = None
+        # Concurrent builds would each publish from the same version and
+        # drop each other's rows
+        self._multimodal_build_lock = threading.Lock()
+        # Pooled, size-limited and cached downloads of image URLs
+        self.image_fetcher = image_fetcher or ImageFetcher()
+        # Background loading of image batches for indexing and search
+        self.image_pipeline = ImagePipeline(pipeline_config, self.image_fetcher)
+        # Captions by image content and generation settings
+        if caption_cache is None and ResponseCache is not None:
+            caption_cache = ResponseCache(max_entries=4096, max_bytes=4 * 1024 * 1024)
+        self.caption_cache = caption_cache
+        # Text embeddings of prompt sets and recent queries
+        if prompt_store is None:
+            prompt_store = PromptStore()
+        self.prompt_store = prompt_store
+        # Optional callback receiving (stage, seconds) for each pipeline stage
+        self.stage_observer: Optional[Callable[[str, float], None]] = None
 
         print(f"🖥️  Using device: {self.device}")
 
+    @contextmanager
+    def _stage(self, name: str, **attributes):
+        """Trace a pipeline stage and report its duration to the stage observer"""
+        with trace_span(f"multimodal.{name}", **attributes):
+            if self.stage_observer is None:
+                yield
+                return
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.stage_observer(name, time.perf_counter() - start)
+
     def initialize(self):
         """Initialize models"""
         print("🚀 Initializing multimodal models...")
+        cpu_inference.configure_threads(
+            self.inference_config.num_threads, self.inference_config.interop_threads
+        )
 
         # Initialize CLIP for image-text similarity
         if CLIP_AVAILABLE:
             try:
                 print("📊 Loading CLIP model...")
                 self.clip_model, self.clip_preprocess = clip.load(
-                    "ViT-B/32", device=self.device
+                    self.CLIP_MODEL, device=self.device
                 )
                 print("✅ CLIP model loaded successfully")
             except Exception as e:
@@ -69,91 +173,461 @@ class MultimodalApp:
         # Initialize BLIP for image captioning
         try:
             print("🖼️  Loading BLIP model for image captioning...")
-            self.caption_processor = BlipProcessor.from_pretrained(
-                "Salesforce/blip-image-captioning-base"
-            )
+            self.caption_processor = BlipProcessor.from_pretrained(self.CAPTION_MODEL)
             self.caption_model = BlipForConditionalGeneration.from_pretrained(
-                "Salesforce/blip-image-captioning-base"
+                self.CAPTION_MODEL
             )
             self.caption_model.to(self.device)
             print("✅ BLIP model loaded successfully")
         except Exception as e:
             print(f"❌ Failed to load BLIP: {e}")
 
+        self._optimize_models()
+
+    def _optimize_models(self):
+        """Apply the CPU optimizations of the inference config"""
+        config = self.inference_config
+        if self.device != "cpu":
+            if config.quantize or config.onnx_dir:
+                print("⚠️ Quantization and ONNX are CPU optimizations; skipped")
+            return
+
+        if config.onnx_dir and not cpu_inference.ONNX_AVAILABLE:
+            print("⚠️ onnxruntime not available. Install with: pip install onnxruntime")
+        elif config.onnx_dir and self.clip_model is not None:
+            try:
+                # Exported from the fp32 model, quantized in ONNX
+                self.onnx_clip = cpu_inference.OnnxClipEncoder.export_or_load(
+                    self.clip_model,
+                    config.onnx_dir,
+                    self.CLIP_MODEL,
+                    quantize=config.quantize,
+                    num_threads=config.num_threads,
+                )
+                print("✅ CLIP encoders running in ONNX Runtime")
+            except Exception as e:
+                print(f"❌ Failed to export CLIP to ONNX: {e}")
+
+        if config.quantize:
+            if self.clip_model is not None and self.onnx_clip is None:
+                self.clip_model = cpu_inference.quantize_linear(self.clip_model)
+            if self.caption_model is not None:
+                self.caption_model = cpu_inference.quantize_linear(self.caption_model)
+            print("✅ Linear layers quantized to int8")
+
     def load_image(self, image_path: str) -> Image.Image:
         """Load image from file path or URL"""
         try:
             if image_path.startswith(("http://", "https://")):
-                response = requests.get(image_path)
-                image = Image.open(BytesIO(response.content)).convert("RGB")
+                data = self.image_fetcher.fetch(image_path)
+                image = Image.open(BytesIO(data)).convert("RGB")
             else:
                 image = Image.open(image_path).convert("RGB")
             return image
         except Exception as e:
             raise ValueError(f"Failed to load image: {e}")
 
-    def generate_caption(self, image: Image.Image) -> str:
+    def load_thumbnail(self, image_path: str, size: int = 256) -> Image.Image:
+        """Load a small copy of an image, e.g. to display a search result"""
+        try:
+            if image_path.startswith(("http://", "https://")):
+                source = BytesIO(self.image_fetcher.fetch(image_path))
+            else:
+                source = image_path
+            with Image.open(source) as image:
+                return make_thumbnail(image, size)
+        except Exception as e:
+            raise ValueError(f"Failed to load thumbnail: {e}")
+
+    def generate_caption(self, image: Image.Image, use_cache: bool = True) -> str:
         """Generate a caption for the image"""
         if not self.caption_model or not self.caption_processor:
             return "Caption model not available"
 
         try:
-            # Process image
-            inputs = self.caption_processor(image, return_tensors="pt").to(self.device)
-
-            # Generate caption
-            with torch.no_grad():
-                out = self.caption_model.generate(**inputs, max_length=50, num_beams=3)
-
-            caption = self.caption_processor.decode(out[0], skip_special_tokens=True)
-            return caption
+            return self.generate_captions([image], use_cache=use_cache)[0]
         except Exception as e:
             return f"Error generating caption: {e}"
 
+    def generate_captions(
+        self,
+        images: List[Image.Image],
+        batch_size: int = 8,
+        max_length: Optional[int] = None,
+        num_beams: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> List[str]:
+        """Caption images in batches of ``batch_size``
+
+        ``max_length`` and ``num_beams`` default to the inference config.
+        Captions are cached by image content and generation settings, so
+        repeats of an image (within the call or across calls) are captioned
+        once.
+        """
+        if not self.caption_model or not self.caption_processor:
+            raise ValueError("Caption model not loaded. Call initialize() first.")
+
+        settings = {
+            "max_length": max_length or self.inference_config.max_length,
+            "num_beams": num_beams or self.inference_config.num_beams,
+        }
+        keys = [self._caption_key(image, settings) for image in images]
+        captions: Dict[str, str] = {}
+        if use_cache and self.caption_cache is not None:
+            for key in set(keys):
+                cached = self.caption_cache.get(key)
+                if cached is not None:
+                    captions[key] = cached.decode("utf-8")
+
+        # One image per uncached key
+        pending = {}
+        for key, image in zip(keys, images):
+            if key not in captions:
+                pending.setdefault(key, image)
+        pending = list(pending.items())
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            with self._stage("caption", batch_size=len(batch)):
+                inputs = self.caption_processor(
+                    images=[image for _, image in batch], return_tensors="pt"
+                ).to(self.device)
+                with torch.inference_mode():
+                    out = self.caption_model.generate(**inputs, **settings)
+                # Shorter captions are padded to the longest in the batch
+                texts = self.caption_processor.batch_decode(
+                    out, skip_special_tokens=True
+                )
+            for (key, _), caption in zip(batch, texts):
+                captions[key] = caption
+                if self.caption_cache is not None:
+                    self.caption_cache.put(key, caption.encode("utf-8"))
+
+        return [captions[key] for key in keys]
+
+    def _caption_key(self, image: Image.Image, settings: Dict[str, Any]) -> str:
+        if ResponseCache is None:
+            # Nothing is cached; the key only dedupes images within a call
+            return image_digest(image)
+        # The model name scopes entries, so a model change never serves
+        # captions of the old one
+        return ResponseCache.make_key(
+            "caption",
+            {"image": image_digest(image), **settings},
+            self.CAPTION_MODEL,
+        )
+
     def calculate_similarity(self, image: Image.Image, text: str) -> float:
         """Calculate similarity between image and text using CLIP"""
         if not CLIP_AVAILABLE or not self.clip_model:
             return 0.0
 
         try:
-            # Preprocess image and text
-            image_input = self.clip_preprocess(image).unsqueeze(0).to(self.device)
-            text_input = clip.tokenize([text]).to(self.device)
-
-            # Calculate features
-            with torch.no_grad():
-                image_features = self.clip_model.encode_image(image_input)
-                text_features = self.clip_model.encode_text(text_input)
-
-                # Calculate cosine similarity
-                similarity = torch.cosine_similarity(
-                    image_features, text_features
-                ).item()
-
-            return similarity
+            return float(self.calculate_similarities([image], text)[0])
         except Exception as e:
             print(f"Error calculating similarity: {e}")
             return 0.0
 
-    def search_images(self, query: str, image_paths: List[str]) -> List[Dict[str, Any]]:
-        """Search images based on text query"""
-        results = []
-
-        for image_path in image_paths:
-            try:
-                image = self.load_image(image_path)
-                similarity = self.calculate_similarity(image, query)
+    def calculate_similarities(
+        self, images: List[Image.Image], text: str, batch_size: int = 32
+    ) -> np.ndarray:
+        """Cosine similarity between each image and the text
+
+        The text is encoded once and the images in batches, each scored with
+        one matrix product.
+        """
+        text_embedding = self.encode_texts([text])[0]
+        scores = [
+            self.encode_images(images[start : start + batch_size]) @ text_embedding
+            for start in range(0, len(images), batch_size)
+        ]
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+    def encode_texts(self, texts: List[str], use_cache: bool = True) -> np.ndarray:
+        """Encode texts into L2-normalized CLIP embeddings (float32)
+
+        Texts of registered prompt sets and recently encoded ones are served
+        from the prompt store.
+        """
+        if not CLIP_AVAILABLE or not self.clip_model:
+            raise ValueError("CLIP model not loaded. Call initialize() first.")
+
+        if not use_cache:
+            return self._encode_text_batch(texts)
+        return self.prompt_store.embed(texts, self._encode_text_batch)
+
+    def _encode_text_batch(self, texts: List[str]) -> np.ndarray:
+        with self._stage("clip"):
+            # Document chunks can exceed CLIP's 77-token context
+            tokens = clip.tokenize(list(texts), truncate=True)
+            if self.onnx_clip is not None:
+                return _normalized(self.onnx_clip.encode_text(tokens.numpy()))
+            with torch.inference_mode():
+                features = self.clip_model.encode_text(tokens.to(self.device))
+                features = features.float()
+                features = features / features.norm(dim=-1, keepdim=True)
+        return features.cpu().numpy()
+
+    def encode_images(self, images: List[Image.Image]) -> np.ndarray:
+        """Encode images into L2-normalized CLIP embeddings (float32)"""
+        if not CLIP_AVAILABLE or not self.clip_model:
+            raise ValueError("CLIP model not loaded. Call initialize() first.")
 
-                results.append(
-                    {"path": image_path, "similarity": similarity, "image": image}
-                )
-            except Exception as e:
-                print(f"Error processing {image_path}: {e}")
+        pixels = torch.stack([self.clip_preprocess(i) for i in images])
+        return self.encode_pixels(pixels.numpy())
 
-        # Sort by similarity
-        results.sort(key=lambda x: x["similarity"], reverse=True)
+    def encode_pixels(self, pixels: np.ndarray) -> np.ndarray:
+        """Encode preprocessed images (N, 3, H, W) into normalized embeddings"""
+        if not CLIP_AVAILABLE or not self.clip_model:
+            raise ValueError("CLIP model not loaded. Call initialize() first.")
+
+        with self._stage("clip", batch_size=len(pixels)):
+            if self.onnx_clip is not None:
+                return _normalized(self.onnx_clip.encode_image(pixels))
+            image_input = torch.from_numpy(pixels).to(self.device)
+            with torch.inference_mode():
+                features = self.clip_model.encode_image(image_input).float()
+                features = features / features.norm(dim=-1, keepdim=True)
+        return features.cpu().numpy()
+
+    def text_encoder_key(self) -> str:
+        """Identifies the text encoder, so persisted embeddings match it"""
+        key = self.CLIP_MODEL
+        if self.onnx_clip is not None:
+            key += "-onnx"
+        if self.inference_config.quantize and self.device == "cpu":
+            key += "-int8"
+        return key
+
+    def register_prompts(
+        self, name: str, prompts: List[str], labels: Optional[List[str]] = None
+    ) -> PromptSet:
+        """Encode a prompt set once (or load it from the prompt store's disk)"""
+        if not CLIP_AVAILABLE or not self.clip_model:
+            raise ValueError("CLIP model not loaded. Call initialize() first.")
+
+        return self.prompt_store.register(
+            name,
+            prompts,
+            self._encode_text_batch,
+            model=self.text_encoder_key(),
+            labels=labels,
+        )
+
+    def classify_zero_shot(
+        self,
+        images: List[Image.Image],
+        prompts: Union[str, List[str], PromptSet],
+        top_k: int = 5,
+    ) -> List[List[Dict[str, Any]]]:
+        """Rank prompts for each image (zero-shot classification)
+
+        ``prompts`` is a registered set (or its name) or a list of ad-hoc
+        prompts. Every image is scored against every prompt in one matrix
+        product.
+        """
+        if isinstance(prompts, str):
+            if prompts not in self.prompt_store.sets:
+                raise ValueError(f"Unknown prompt set: {prompts}")
+            prompts = self.prompt_store.sets[prompts]
+        elif not isinstance(prompts, PromptSet):
+            prompts = PromptSet("adhoc", list(prompts), self.encode_texts(prompts))
+
+        logit_scale = 100.0
+        if hasattr(self.clip_model, "logit_scale"):
+            logit_scale = float(self.clip_model.logit_scale.exp().item())
+        image_embeddings = self.encode_images(images)
+        with self._stage("zero_shot", prompts=len(prompts.prompts)):
+            return zero_shot(image_embeddings, prompts, top_k, logit_scale)
+
+    def embed_image_batches(
+        self, image_paths: List[str], batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[np.ndarray, List[str]]]:
+        """Load and encode images batch by batch, skipping ones that fail
+
+        Images are read and preprocessed by the image pipeline while the
+        previous batch is encoded. Yields each batch's embeddings and the
+        paths they belong to.
+        """
+        for batch in self.image_pipeline.batches(image_paths, batch_size):
+            for image_path, error in batch.failed:
+                print(f"Error processing {image_path}: {error}")
+            if batch.paths:
+                yield self.encode_pixels(batch.pixels), batch.paths
+
+    def build_image_index(
+        self,
+        image_paths: List[str],
+        index_dir: str = "./image_index",
+        batch_size: Optional[int] = None,
+        prune: bool = True,
+    ) -> Dict[str, int]:
+        """Embed a gallery once into a memory-mapped index at ``index_dir``
+
+        Calling it again only embeds images that were added or changed since
+        the last build. Returns the counts of added/updated/unchanged/removed
+        and failed images.
+        """
+        if self.image_index is None or self.image_index.store.root != index_dir:
+            self.image_index = ImageIndex(index_dir)
+        return self.image_index.update(
+            image_paths,
+            lambda paths: self.embed_image_batches(paths, batch_size),
+            prune=prune,
+        )
+
+    def score_images(
+        self, query: str, image_paths: List[str], batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """Score images against a text query, yielding batch by batch
+
+        The query is encoded once. Each batch of images is decoded, scored
+        and dropped before the next one, so memory does not grow with the
+        number of images. Yields the paths of each batch that could be loaded
+        and their cosine similarities to the query.
+        """
+        text_embedding = self.encode_texts([query])[0]
+        for embeddings, paths in self.embed_image_batches(image_paths, batch_size):
+            yield paths, embeddings @ text_embedding
+
+    def search_images(
+        self,
+        query: str,
+        image_paths: Optional[List[str]] = None,
+        top_k: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        thumbnail_size: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search images based on text query, best matches first
+
+        Without ``image_paths`` the gallery of the image index is searched
+        and only the query is encoded. Otherwise the given images are scored
+        in batches of ``batch_size`` while a heap keeps the ``top_k`` best
+        paths and scores. Results hold no decoded images; with
+        ``thumbnail_size``, thumbnails are loaded for the returned results
+        only (see ``load_thumbnail``).
+        """
+        if image_paths is None:
+            if self.image_index is None:
+                raise ValueError("No image index. Call build_image_index() first.")
+            embedding = self.encode_texts([query])
+            with self._stage("image_search", gallery=len(self.image_index)):
+                results = self.image_index.search(
+                    embedding, top_k or len(self.image_index)
+                )[0]
+        else:
+            best = TopK(top_k or len(image_paths))
+            for paths, scores in self.score_images(query, image_paths, batch_size):
+                best.push(scores, paths)
+            results = [
+                {"path": path, "similarity": score} for path, score in best.results()
+            ]
+
+        if thumbnail_size:
+            for result in results:
+                try:
+                    result["thumbnail"] = self.load_thumbnail(
+                        result["path"], thumbnail_size
+                    )
+                except ValueError as e:
+                    print(f"Error processing {result['path']}: {e}")
+                    result["thumbnail"] = None
         return results
 
+    def build_multimodal_index(
+        self,
+        index_dir: str = "./multimodal_index",
+        rag: Optional[Any] = None,
+        image_paths: Optional[List[str]] = None,
+        calibration_queries: Optional[List[str]] = None,
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Index gallery images and the chunks of a RAG system together
+
+        ``image_paths`` are first brought into the image index (see
+        ``build_image_index``); its vectors are then copied, so no image is
+        encoded twice. The chunks of ``rag`` (a ``SimpleRAG``) are encoded
+        with CLIP's text encoder, only those new or changed since the last
+        build. ``calibration_queries`` (typical queries) re-estimate each
+        modality's score calibration.
+        """
+        if not CLIP_AVAILABLE or not self.clip_model:
+            raise ValueError("CLIP model not loaded. Call initialize() first.")
+
+        with self._multimodal_build_lock:
+            return self._build_multimodal_index(
+                index_dir, rag, image_paths, calibration_queries, batch_size
+            )
+
+    def _build_multimodal_index(
+        self,
+        index_dir: str,
+        rag: Optional[Any],
+        image_paths: Optional[List[str]],
+        calibration_queries: Optional[List[str]],
+        batch_size: Optional[int],
+    ) -> Dict[str, Any]:
+        index = self.multimodal_index
+        if index is None or index.store.root != index_dir:
+            index = self.multimodal_index = MultimodalIndex(index_dir)
+
+        counts: Dict[str, Any] = {}
+        if image_paths is not None:
+            self.build_image_index(image_paths, batch_size=batch_size)
+        if self.image_index is not None:
+            counts.update(index.update_images(self.image_index))
+        if rag is not None:
+            ids, documents, metadatas = rag.export_chunks()
+            counts.update(
+                index.update_texts(
+                    ids,
+                    documents,
+                    metadatas,
+                    lambda texts: self.encode_texts(texts, use_cache=False),
+                    model=self.text_encoder_key(),
+                )
+            )
+        if calibration_queries:
+            counts["calibration"] = index.calibrate(
+                self.encode_texts(calibration_queries, use_cache=False)
+            )
+        return counts
+
+    def search_multimodal(
+        self,
+        queries: List[Union[str, Image.Image]],
+        top_k: int = 10,
+        modalities: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """One ranked list of text chunks and images for each query
+
+        A query is a text or an image. All text queries are encoded in one
+        call, all image queries in another, and every query is scored against
+        every row of the multimodal index in a single matrix product.
+        """
+        if self.multimodal_index is None:
+            raise ValueError(
+                "No multimodal index. Call build_multimodal_index() first."
+            )
+        if not queries:
+            return []
+
+        texts = [i for i, q in enumerate(queries) if isinstance(q, str)]
+        images = [i for i, q in enumerate(queries) if not isinstance(q, str)]
+        embeddings: List[Optional[np.ndarray]] = [None] * len(queries)
+        if texts:
+            encoded = self.encode_texts([queries[i] for i in texts])
+            for i, row in zip(texts, encoded):
+                embeddings[i] = row
+        if images:
+            encoded = self.encode_images([queries[i] for i in images])
+            for i, row in zip(images, encoded):
+                embeddings[i] = row
+
+        index = self.multimodal_index
+        with self._stage("multimodal_search", rows=len(index), queries=len(queries)):
+            return index.search(np.stack(embeddings), top_k, modalities)
+
     def analyze_image(
         self, image: Image.Image, query: Optional[str] = None
     ) -> Dict[str, Any]:
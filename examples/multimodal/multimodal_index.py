@@ -0,0 +1,374 @@
+# type: ignore
+"""
+Joint Text and Image Index
+==========================
+
+``SimpleRAG`` searches document chunks and ``ImageIndex`` searches a
+gallery, each with its own embedding space. ``MultimodalIndex`` puts both
+into CLIP's joint space: gallery images with their CLIP image vectors and
+the chunks of a RAG collection with their CLIP text vectors, each row tagged
+with its modality. One query (a text or an image) is scored against every
+row with a single matrix product and answered with one ranked list.
+
+Raw cosine similarities are not comparable across modalities: CLIP text
+queries typically score 0.2-0.35 against matching images but 0.7-0.9
+against matching text. Each modality therefore has a calibration (the mean
+and standard deviation of its similarities), and results are ranked by the
+z-score ``(similarity - mean) / std``. ``calibrate`` estimates both from a
+sample of queries and persists them next to the index.
+
+The rows are stored in the versioned, memory-mapped ``SnapshotStore`` of the
+RAG example, like the image index. Other processes serving the same
+directory (e.g. pre-forked API workers) poll ``CURRENT`` every
+``check_interval`` seconds and swap in the new version and calibration;
+superseded versions are kept for ``retain_seconds`` so none is deleted
+before every reader has moved on.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from examples.multimodal.image_index import ImageIndex, top_k_indices
+    from examples.rag.index_snapshot import IndexSnapshot, SnapshotStore
+except ImportError:
+    # Run as a script from examples/multimodal
+    sys.path.append(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+    from examples.multimodal.image_index import ImageIndex, top_k_indices
+    from examples.rag.index_snapshot import IndexSnapshot, SnapshotStore
+
+MODALITIES = ("text", "image")
+CALIBRATION_FILE = "calibration.json"
+
+# Encodes texts into L2-normalized CLIP text embeddings, one row per text
+EncodeTexts = Callable[[List[str]], np.ndarray]
+
+
+class MultimodalIndex:
+    """CLIP embeddings of text chunks and images, searchable in one pass"""
+
+    def __init__(
+        self, root: str, check_interval: float = 1.0, retain_seconds: float = 60.0
+    ):
+        self.store = SnapshotStore(root)
+        self.check_interval = check_interval
+        self.retain_seconds = retain_seconds
+        # The current snapshot with the modality of each row (as an index
+        # into MODALITIES), swapped as one pair so searches never mix them
+        self._state: Tuple[Optional[IndexSnapshot], np.ndarray] = (
+            None,
+            np.zeros(0, dtype=np.int64),
+        )
+        self.calibration = {m: {"mean": 0.0, "std": 1.0} for m in MODALITIES}
+        self._calibration_mtime: Optional[int] = None
+        self._load_calibration()
+        self._open()
+        self._checked_at = time.monotonic()
+
+    def __len__(self) -> int:
+        snapshot = self.snapshot
+        return len(snapshot) if snapshot else 0
+
+    @property
+    def snapshot(self) -> Optional[IndexSnapshot]:
+        self._refresh()
+        return self._state[0]
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the rows or the calibration change"""
+        snapshot = self.snapshot
+        digest = hashlib.sha256(
+            json.dumps(self.calibration, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:8]
+        return f"{snapshot.version if snapshot else 'empty'}.{digest}"
+
+    def counts(self) -> Dict[str, int]:
+        """Number of rows of each modality"""
+        self._refresh()
+        counts = np.bincount(self._state[1], minlength=len(MODALITIES))
+        return {m: int(counts[i]) for i, m in enumerate(MODALITIES)}
+
+    def update_texts(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        encode: EncodeTexts,
+        model: str = "",
+        batch_size: int = 256,
+    ) -> Dict[str, int]:
+        """Replace the text rows, encoding only chunks that are new or changed
+
+        ``ids``, ``documents`` and ``metadatas`` are the chunks of a RAG
+        collection (see ``SimpleRAG.export_chunks``). ``model`` identifies the
+        text encoder; vectors of another encoder are never reused.
+        """
+        self._refresh()
+        snapshot, codes = self._state
+        previous = {}
+        for row in _rows(codes, "text"):
+            meta = snapshot.metadatas[row]
+            key = (snapshot.ids[row], snapshot.documents[row])
+            if meta.get("encoder") == model:
+                previous[key] = row
+        reused = [previous.get(key) for key in zip(ids, documents)]
+        missing = [i for i, row in enumerate(reused) if row is None]
+
+        encoded = [
+            _normalize(
+                encode([documents[i] for i in missing[start : start + batch_size]])
+            )
+            for start in range(0, len(missing), batch_size)
+        ]
+        if encoded:
+            dimension = encoded[0].shape[1]
+        else:
+            dimension = snapshot.embeddings.shape[1] if snapshot else 0
+        embeddings = np.zeros((len(ids), dimension), dtype=np.float32)
+        kept = [i for i, row in enumerate(reused) if row is not None]
+        if kept:
+            embeddings[kept] = snapshot.embeddings[[reused[i] for i in kept]]
+        if encoded:
+            embeddings[missing] = np.concatenate(encoded)
+
+        metadatas = [{**meta, "encoder": model} for meta in metadatas]
+        self._replace("text", ids, embeddings, documents, metadatas)
+        return {"texts": len(ids), "encoded": len(missing)}
+
+    def update_images(self, image_index: ImageIndex) -> Dict[str, int]:
+        """Replace the image rows with the gallery of ``image_index``
+
+        The image vectors are copied, so no image is encoded again.
+        """
+        snapshot = image_index.snapshot
+        if snapshot is None:
+            self._replace("image", [], np.zeros((0, 0), np.float32), [], [])
+            return {"images": 0}
+        self._replace(
+            "image",
+            list(snapshot.ids),
+            _normalize(np.asarray(snapshot.embeddings)),
+            list(snapshot.documents),
+            list(snapshot.metadatas),
+        )
+        return {"images": len(snapshot)}
+
+    def calibrate(self, query_embeddings: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """Estimate each modality's similarity distribution from sample queries
+
+        Use queries like the ones the index will serve; modalities without
+        rows keep their calibration.
+        """
+        queries = _normalize(np.atleast_2d(query_embeddings))
+        self._refresh()
+        snapshot, codes = self._state
+        calibration = dict(self.calibration)
+        for code, modality in enumerate(MODALITIES):
+            rows = np.flatnonzero(codes == code)
+            if len(rows) == 0 or len(queries) == 0:
+                continue
+            scores = queries @ np.asarray(snapshot.embeddings[rows]).T
+            calibration[modality] = {
+                "mean": float(scores.mean()),
+                "std": max(float(scores.std()), 1e-6),
+            }
+        self.set_calibration(calibration)
+        return calibration
+
+    def set_calibration(self, calibration: Dict[str, Dict[str, float]]):
+        """Set (and persist) the mean and std of some modalities' similarities"""
+        unknown = set(calibration) - set(MODALITIES)
+        if unknown:
+            raise ValueError(f"Unknown modalities {sorted(unknown)}")
+        merged = dict(self.calibration)
+        for modality, stats in calibration.items():
+            if stats.get("std", 1.0) <= 0:
+                raise ValueError("Calibration std must be positive")
+            merged[modality] = {
+                "mean": float(stats.get("mean", 0.0)),
+                "std": float(stats.get("std", 1.0)),
+            }
+        path = os.path.join(self.store.root, CALIBRATION_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(merged, f)
+        os.replace(tmp_path, path)
+        self.calibration = merged
+        self._calibration_mtime = os.stat(path).st_mtime_ns
+
+    def search(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 10,
+        modalities: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """One ranked list across modalities for each query embedding
+
+        Each result holds the raw cosine ``similarity`` and the calibrated
+        ``score`` it is ranked by. ``modalities`` restricts the results.
+        """
+        queries = _normalize(np.atleast_2d(query_embeddings))
+        allowed = np.ones(len(MODALITIES), dtype=bool)
+        if modalities is not None:
+            unknown = set(modalities) - set(MODALITIES)
+            if unknown:
+                raise ValueError(f"Unknown modalities {sorted(unknown)}")
+            allowed = np.array([m in modalities for m in MODALITIES])
+
+        # Read the rows and their modalities once: a swap may happen meanwhile
+        self._refresh()
+        snapshot, codes = self._state
+        calibration = self.calibration
+        if snapshot is None or len(snapshot) == 0:
+            return [[] for _ in range(len(queries))]
+
+        # One product over every row, then per-row calibration by modality
+        mean = np.array([calibration[m]["mean"] for m in MODALITIES])
+        std = np.array([calibration[m]["std"] for m in MODALITIES])
+        similarities = queries @ snapshot.embeddings.T
+        scores = (similarities - mean[codes]) / std[codes]
+        scores[:, ~allowed[codes]] = -np.inf
+        top_k = min(top_k, int(allowed[codes].sum()))
+
+        return [
+            [
+                {
+                    "id": snapshot.ids[i],
+                    "modality": MODALITIES[codes[i]],
+                    "document": snapshot.documents[i],
+                    "metadata": snapshot.metadatas[i],
+                    "similarity": float(similarities[q, i]),
+                    "score": float(scores[q, i]),
+                }
+                for i in top_k_indices(scores[q], top_k)
+            ]
+            for q in range(len(queries))
+        ]
+
+    def _replace(
+        self,
+        modality: str,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ):
+        """Publish a version whose rows of ``modality`` are the given ones
+
+        The other rows are taken from the current version, read under the
+        store's write lock so an update published meanwhile by another process
+        is kept. Nothing is published if the rows are already the current ones.
+        """
+        with self.store.write_lock():
+            self._open()
+            if not self._publish(modality, ids, embeddings, documents, metadatas):
+                return
+        print(f"🔀 Multimodal index {self._state[0].version}: {self.counts()}")
+
+    def _publish(
+        self,
+        modality: str,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> bool:
+        snapshot, codes = self._state
+        tagged = [{**meta, "modality": modality} for meta in metadatas]
+        current = _rows(codes, modality)
+        if snapshot is not None and len(current) == len(ids):
+            if (
+                [snapshot.ids[i] for i in current] == list(ids)
+                and [snapshot.documents[i] for i in current] == list(documents)
+                and [snapshot.metadatas[i] for i in current] == tagged
+                and np.array_equal(snapshot.embeddings[current], embeddings)
+            ):
+                return False
+
+        others = np.flatnonzero(codes != MODALITIES.index(modality))
+        if len(ids) and len(others):
+            if embeddings.shape[1] != snapshot.embeddings.shape[1]:
+                raise ValueError(
+                    "Text and image embeddings must come from the same CLIP model"
+                )
+
+        if len(others):
+            kept = np.asarray(snapshot.embeddings[others], dtype=np.float32)
+            embeddings = np.concatenate([kept, embeddings]) if len(ids) else kept
+            ids = [snapshot.ids[i] for i in others] + list(ids)
+            documents = [snapshot.documents[i] for i in others] + list(documents)
+            tagged = [snapshot.metadatas[i] for i in others] + tagged
+
+        if not len(ids):
+            embeddings = np.zeros((0, embeddings.shape[-1]), dtype=np.float32)
+        self.store.publish(ids, embeddings, documents, tagged)
+        self.store.prune(keep=2, min_age=self.retain_seconds)
+        self._open()
+        return True
+
+    def _refresh(self):
+        """Swap in a version or calibration published by another process"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        version = self.store.current_version()
+        snapshot = self._state[0]
+        if version != (snapshot.version if snapshot else None):
+            self._open()
+        self._load_calibration()
+
+    def _open(self):
+        try:
+            snapshot = self.store.open_current()
+        except FileNotFoundError:
+            # Pruned between reading CURRENT and opening it: keep the old one
+            return
+        codes = np.zeros(0, dtype=np.int64)
+        if snapshot is not None:
+            codes = np.array(
+                [MODALITIES.index(meta["modality"]) for meta in snapshot.metadatas],
+                dtype=np.int64,
+            )
+        # One assignment, so readers see the old pair or the new one
+        self._state = (snapshot, codes)
+
+    def _load_calibration(self):
+        path = os.path.join(self.store.root, CALIBRATION_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if mtime == self._calibration_mtime:
+                return
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        calibration = dict(self.calibration)
+        for modality in MODALITIES:
+            if modality in stored:
+                calibration[modality] = stored[modality]
+        self.calibration = calibration
+        self._calibration_mtime = mtime
+
+
+def _rows(codes: np.ndarray, modality: str) -> np.ndarray:
+    return np.flatnonzero(codes == MODALITIES.index(modality))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,232 @@
+# type: ignore
+"""
+Preprocessed Gallery Image Cache
+================================
+
+Encoding a gallery decodes every JPEG at full resolution only to shrink it
+to CLIP's 224px input. ``PixelCache`` keeps the result of that work: the
+resized, center-cropped RGB pixels of each image, as uint8, in one
+memory-mapped file. Rebuilding an index after a model change, or scoring
+the same files again, reads the crops instead of decoding the JPEGs.
+
+The crops are stored before normalization, so they do not depend on the
+model, only on the input size. Entries are keyed by path, modification time
+and size, so an edited file is decoded again. URLs are not cached here: the
+image fetcher already caches their bytes.
+
+Layout of ``directory``:
+
+- ``pixels-<size>.bin``: fixed-size records of ``size * size * 3`` bytes
+- ``pixels-<size>.idx``: an append-only log of ``record<TAB>key`` lines,
+  written after the record, so a crash never indexes a partial record; its
+  header names the data file it belongs to
+- ``pixels-<size>.lock``: locked (``flock``) around every append and read
+
+Several processes (e.g. pre-forked API workers) can share one directory:
+appends hold an exclusive lock and number the record after the data file's
+size, and readers pick up the lines other processes appended before each
+lookup. Once the files hold more than twice ``max_entries`` records, or
+more superseded records (older versions of an edited file) than live ones,
+they are compacted to the newest crop of each of the newest ``max_entries``
+images. On platforms without ``fcntl`` there is no cross-process locking, so
+give each process its own directory there.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+# First line of the index: the inode of the data file it describes
+HEADER = "#pixels"
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from examples.multimodal.image_index import fingerprint
+except ImportError:
+    from image_index import fingerprint
+
+
+class PixelCache:
+    """Center-cropped uint8 images of a gallery, memory-mapped from disk"""
+
+    def __init__(self, directory: str, image_size: int = 224, max_entries: int = 20000):
+        self.directory = directory
+        self.image_size = image_size
+        self.max_entries = max_entries
+        self.shape = (image_size, image_size, 3)
+        self.record_bytes = image_size * image_size * 3
+        stem = os.path.join(directory, f"pixels-{image_size}")
+        self.data_path = stem + ".bin"
+        self.index_path = stem + ".idx"
+        self.lock_path = stem + ".lock"
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self._records: Dict[str, int] = {}
+        # The newest key of each image path
+        self._paths: Dict[str, str] = {}
+        # Lines of the index file seen so far: (inode, bytes read, records)
+        self._index_state = (None, 0, 0)
+        self._mapped: Optional[np.memmap] = None
+        # Whether the index file belongs to the data file
+        self._valid = False
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, self._file_lock(exclusive=False):
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    @staticmethod
+    def key(path: str) -> Optional[str]:
+        """The cache key of a local image (None for URLs and missing files)"""
+        try:
+            stat = fingerprint(path)
+        except OSError:
+            return None
+        if stat is None:
+            return None
+        return f"{os.path.abspath(path)}|{stat['mtime_ns']}|{stat['size']}"
+
+    def get(self, key: Optional[str]) -> Optional[np.ndarray]:
+        """The cached crop for ``key``, shape (size, size, 3), uint8"""
+        with self._lock, self._file_lock(exclusive=False):
+            # Other processes may have appended (or compacted) since
+            self._sync()
+            record = self._records.get(key) if key else None
+            if record is None:
+                self.misses += 1
+                return None
+            if self._mapped is None or record >= len(self._mapped):
+                self._map()
+            self.hits += 1
+            return np.array(self._mapped[record])
+
+    def put(self, key: Optional[str], pixels: np.ndarray):
+        """Store the crop of an image (ignored for URLs)"""
+        if not key:
+            return
+        pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+        if pixels.shape != self.shape:
+            raise ValueError(f"Expected pixels of shape {self.shape}")
+
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            if key in self._records:
+                return
+            if not self._valid:
+                self._write_files([], b"")
+            # Number the record after the complete records in the data file;
+            # a partial record left by a crash is overwritten
+            record = os.path.getsize(self.data_path) // self.record_bytes
+            with open(self.data_path, "r+b") as f:
+                f.seek(record * self.record_bytes)
+                f.write(pixels.tobytes())
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(f"{record}\t{key}\n")
+            self._sync()
+
+            if self._needs_compaction():
+                self._compact()
+
+    def _needs_compaction(self) -> bool:
+        stored = self._index_state[2]
+        # The slack keeps small caches from compacting on every edit
+        return stored > 2 * self.max_entries or stored > 2 * len(self._paths) + 64
+
+    def _compact(self):
+        """Rewrite the files with the newest ``max_entries`` live crops"""
+        keys = sorted(self._paths.values(), key=self._records.get)
+        keys = keys[-self.max_entries :] if self.max_entries > 0 else []
+        self._map()
+        data = b"".join(
+            np.asarray(self._mapped[self._records[key]]).tobytes() for key in keys
+        )
+        self._write_files(keys, data)
+        self.compactions += 1
+
+    def _write_files(self, keys, data: bytes):
+        """Replace both files (under the exclusive lock)
+
+        The index names the data file's inode in its header, so a crash
+        between the two renames leaves an index that is recognized as stale.
+        Processes holding the old mapping keep reading the old inode.
+        """
+        data_tmp = f"{self.data_path}.{os.getpid()}.tmp"
+        index_tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(data_tmp, "wb") as f:
+            f.write(data)
+        os.replace(data_tmp, self.data_path)
+        with open(index_tmp, "w", encoding="utf-8") as f:
+            f.write(f"{HEADER}\t{os.stat(self.data_path).st_ino}\n")
+            f.writelines(f"{record}\t{key}\n" for record, key in enumerate(keys))
+        os.replace(index_tmp, self.index_path)
+        self._sync()
+
+    def _sync(self):
+        """Read the index lines appended since the last call"""
+        try:
+            stat = os.stat(self.index_path)
+            data_stat = os.stat(self.data_path)
+        except OSError:
+            stat = data_stat = None
+        inode, offset, stored = self._index_state
+        if stat is None or stat.st_ino != inode or stat.st_size < offset:
+            # New, missing or replaced by a compaction: start over
+            self._records, self._paths, self._mapped = {}, {}, None
+            offset = stored = 0
+            self._index_state = (None, 0, 0)
+            self._valid = False
+            if stat is None:
+                return
+        elif stat.st_size == offset:
+            return
+
+        with open(self.index_path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        # Only complete lines; a line being written is read next time
+        complete = tail[: tail.rfind(b"\n") + 1]
+        lines = complete.decode("utf-8").splitlines()
+        if offset == 0 and lines:
+            # The header must name the current data file
+            self._valid = lines.pop(0) == f"{HEADER}\t{data_stat.st_ino}"
+        if self._valid:
+            complete_records = data_stat.st_size // self.record_bytes
+            for line in lines:
+                record, _, key = line.partition("\t")
+                if record.isdigit() and key and int(record) < complete_records:
+                    self._records[key] = int(record)
+                    self._paths[key.rsplit("|", 2)[0]] = key
+                    stored += 1
+        self._index_state = (stat.st_ino, offset + len(complete), stored)
+
+    def _map(self):
+        count = os.path.getsize(self.data_path) // self.record_bytes
+        self._mapped = np.memmap(
+            self.data_path, dtype=np.uint8, mode="r", shape=(count,) + self.shape
+        )
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
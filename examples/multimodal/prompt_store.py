@@ -0,0 +1,234 @@
+# type: ignore
+"""
+CLIP Prompt Embedding Store
+===========================
+
+Image search and zero-shot tagging keep scoring images against the same
+prompts, yet every call used to tokenize and encode them again.
+``PromptStore`` encodes each text once:
+
+- *registered prompt sets* (e.g. a tagging vocabulary of a few thousand
+  prompts) are encoded in batches and persisted as ``.npy`` matrices keyed
+  by the model and the prompts, so a restart loads them instead of running
+  the text encoder
+- *ad-hoc texts* (search queries) are kept in an LRU bounded by entry count
+
+``zero_shot`` scores images against a whole prompt set with one matrix
+product.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from examples.multimodal.image_index import top_k_indices
+except ImportError:
+    from image_index import top_k_indices
+
+# Encodes texts into L2-normalized embeddings, one row per text
+EncodeTexts = Callable[[List[str]], np.ndarray]
+
+
+@dataclass
+class PromptSet:
+    """A named set of prompts and their embeddings"""
+
+    name: str
+    prompts: List[str]
+    # Shape (len(prompts), dim), L2-normalized
+    embeddings: np.ndarray
+    # Label reported for each prompt (defaults to the prompt itself)
+    labels: Optional[List[str]] = None
+
+    def __post_init__(self):
+        if self.labels is None:
+            self.labels = list(self.prompts)
+        if len(self.labels) != len(self.prompts):
+            raise ValueError("A prompt set needs one label per prompt")
+
+
+class PromptStore:
+    """Text embeddings of registered prompt sets and recent ad-hoc texts"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: int = 4096,
+        batch_size: int = 256,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.sets: Dict[str, PromptSet] = {}
+        # Rows of registered prompts by text, for lookups from embed()
+        self._registered: Dict[str, np.ndarray] = {}
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_dict: Dict[str, Any]) -> "PromptStore":
+        store_config = config_dict.get("prompt_cache", {})
+        return cls(
+            directory=store_config.get("directory"),
+            max_entries=store_config.get("max_entries", 4096),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def register(
+        self,
+        name: str,
+        prompts: List[str],
+        encode: EncodeTexts,
+        model: str = "",
+        labels: Optional[List[str]] = None,
+    ) -> PromptSet:
+        """Encode (or load the persisted embeddings of) a prompt set
+
+        ``model`` identifies the text encoder; embeddings persisted for a
+        different model or different prompts are never reused.
+        """
+        prompts = list(prompts)
+        path = self._set_path(name, prompts, model)
+        embeddings = None
+        if path is not None and os.path.exists(path):
+            embeddings = np.load(path)
+            if embeddings.shape[0] != len(prompts):
+                embeddings = None
+        if embeddings is None:
+            embeddings = self._encode(prompts, encode)
+            if path is not None:
+                _save_atomic(path, embeddings)
+
+        prompt_set = PromptSet(name, prompts, embeddings, labels)
+        with self._lock:
+            previous = self.sets.get(name)
+            if previous is not None:
+                for prompt in previous.prompts:
+                    self._registered.pop(prompt, None)
+            self.sets[name] = prompt_set
+            for prompt, row in zip(prompts, embeddings):
+                self._registered[prompt] = row
+        return prompt_set
+
+    def embed(self, texts: List[str], encode: EncodeTexts) -> np.ndarray:
+        """Embeddings of ``texts``, encoding only those not seen before"""
+        texts = list(texts)
+        rows: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for text in texts:
+                if text in rows:
+                    continue
+                row = self._registered.get(text)
+                if row is None:
+                    row = self._entries.get(text)
+                    if row is not None:
+                        self._entries.move_to_end(text)
+                if row is not None:
+                    rows[text] = row
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        missing = [text for text in dict.fromkeys(texts) if text not in rows]
+        if missing:
+            encoded = self._encode(missing, encode)
+            with self._lock:
+                for text, row in zip(missing, encoded):
+                    rows[text] = row
+                    self._entries[text] = row
+                    self._entries.move_to_end(text)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([rows[text] for text in texts])
+
+    def resize(self, max_entries: int):
+        """Change how many ad-hoc embeddings are kept, evicting the oldest"""
+        with self._lock:
+            self.max_entries = max_entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget ad-hoc embeddings and registered sets (not the files)"""
+        with self._lock:
+            self._entries.clear()
+            self._registered.clear()
+            self.sets.clear()
+
+    def _encode(self, texts: List[str], encode: EncodeTexts) -> np.ndarray:
+        batches = [
+            encode(texts[start : start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        return np.concatenate(batches).astype(np.float32)
+
+    def _set_path(self, name: str, prompts: List[str], model: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        digest = hashlib.sha256(
+            json.dumps([model, prompts], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+        return os.path.join(self.directory, f"{safe_name}-{digest}.npy")
+
+
+def zero_shot(
+    image_embeddings: np.ndarray,
+    prompt_set: PromptSet,
+    top_k: int = 5,
+    logit_scale: float = 100.0,
+) -> List[List[Dict[str, Any]]]:
+    """Rank the prompts of a set for each image with one matrix product
+
+    ``probability`` is CLIP's softmax over all prompts of the set, with the
+    model's logit scale; ``similarity`` is the raw cosine similarity.
+    """
+    images = np.atleast_2d(image_embeddings).astype(np.float32)
+    similarities = images @ prompt_set.embeddings.T
+    logits = logit_scale * similarities
+    logits -= logits.max(axis=1, keepdims=True)
+    probabilities = np.exp(logits)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+    results = []
+    for row, probs in zip(similarities, probabilities):
+        best = top_k_indices(row, top_k)
+        results.append(
+            [
+                {
+                    "label": prompt_set.labels[i],
+                    "prompt": prompt_set.prompts[i],
+                    "similarity": float(row[i]),
+                    "probability": float(probs[i]),
+                }
+                for i in best
+            ]
+        )
+    return results
+
+
+def _save_atomic(path: str, array: np.ndarray):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
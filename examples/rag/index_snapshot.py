@@ -0,0 +1,276 @@
+# type: ignore
+"""
+Memory-Mapped Index Snapshots
+=============================
+
+Read-only, memory-mapped snapshots of a RAG collection. A snapshot is a
+directory holding the embedding matrix as a ``.npy`` file plus a JSON file
+with ids, documents and metadata. Because the matrix is opened with
+``mmap_mode="r"``, processes forked after a snapshot is opened share its
+pages through the OS page cache instead of each holding a private copy.
+
+Snapshots are published through a ``SnapshotStore``: every publish writes a
+new version directory and then atomically repoints the ``CURRENT`` file, so
+readers always see either the old or the new version, never a partial one.
+Writers that derive a new version from the current one hold the store's
+``write_lock()`` (an ``flock`` on its ``LOCK`` file) from reading the
+current version until publishing, so concurrent writers in separate
+processes never publish from the same base and drop each other's rows.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import os
+import copy
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+EMBEDDINGS_FILE = "embeddings.npy"
+NORMS_FILE = "norms.npy"
+RECORDS_FILE = "records.json"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "LOCK"
+
+# Without fcntl, writers are only serialized within this process
+_process_write_lock = threading.Lock()
+
+
+class IndexSnapshot:
+    """A read-only, memory-mapped view of an exported collection
+
+    With ``in_memory=True`` the matrix is read into process memory instead,
+    trading the shared, reclaimable mapping for searches that never fault
+    pages in from disk.
+    """
+
+    def __init__(self, path: str, in_memory: bool = False):
+        self.path = path
+        self.version = os.path.basename(os.path.normpath(path))
+        self.in_memory = in_memory
+
+        # Memory-map the matrix so pages are shared between processes
+        mmap_mode = None if in_memory else "r"
+        self.embeddings = np.load(
+            os.path.join(path, EMBEDDINGS_FILE), mmap_mode=mmap_mode
+        )
+        self.norms = np.load(os.path.join(path, NORMS_FILE), mmap_mode=mmap_mode)
+
+        records_path = os.path.join(path, RECORDS_FILE)
+        self.records_bytes = os.path.getsize(records_path)
+        with open(records_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory needed to hold the snapshot resident"""
+        return self.embeddings.nbytes + self.norms.nbytes + self.records_bytes
+
+    def touch(self, block_rows: int = 4096) -> int:
+        """Read every page of the matrix so the first searches do not fault
+
+        Returns the number of bytes touched.
+        """
+        for start in range(0, len(self), block_rows):
+            np.asarray(self.embeddings[start : start + block_rows]).sum()
+        np.asarray(self.norms).sum()
+        return self.embeddings.nbytes + self.norms.nbytes
+
+    def to_memory(self) -> "IndexSnapshot":
+        """A copy of this snapshot with the matrix read into process memory"""
+        return self._with_arrays(np.array(self.embeddings), np.array(self.norms), True)
+
+    def to_mapped(self) -> "IndexSnapshot":
+        """A copy of this snapshot with the matrix memory-mapped again"""
+        return self._with_arrays(
+            np.load(os.path.join(self.path, EMBEDDINGS_FILE), mmap_mode="r"),
+            np.load(os.path.join(self.path, NORMS_FILE), mmap_mode="r"),
+            False,
+        )
+
+    def _with_arrays(self, embeddings, norms, in_memory: bool) -> "IndexSnapshot":
+        # Records are shared; only the matrix storage changes
+        snapshot = copy.copy(self)
+        snapshot.embeddings = embeddings
+        snapshot.norms = norms
+        snapshot.in_memory = in_memory
+        return snapshot
+
+    @staticmethod
+    def write(
+        path: str,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ):
+        """Write a snapshot directory (the directory must not exist yet)"""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) != len(ids):
+            raise ValueError("Embeddings must be a 2-D array with one row per id")
+
+        os.makedirs(path)
+        np.save(os.path.join(path, EMBEDDINGS_FILE), embeddings)
+        np.save(
+            os.path.join(path, NORMS_FILE),
+            np.einsum("ij,ij->i", embeddings, embeddings),
+        )
+        with open(os.path.join(path, RECORDS_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"ids": ids, "documents": documents, "metadatas": metadatas},
+                f,
+                ensure_ascii=False,
+            )
+
+    def search(
+        self, query_embeddings: np.ndarray, top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Search the snapshot for a batch of query embeddings
+
+        Distances are squared L2, matching Chroma's default metric, so results
+        are interchangeable with ``SimpleRAG.search`` on a live collection.
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+
+        top_k = min(top_k, len(self))
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        scores = queries @ self.embeddings.T
+        distances = query_norms[:, None] + self.norms[None, :] - 2.0 * scores
+
+        # argpartition is O(n) per query; only the top_k slice gets sorted
+        candidates = np.argpartition(distances, top_k - 1, axis=1)[:, :top_k]
+        batch_results = []
+        for row, idx in enumerate(candidates):
+            order = idx[np.argsort(distances[row, idx])]
+            batch_results.append(
+                [
+                    {
+                        "id": self.ids[i],
+                        "document": self.documents[i],
+                        "metadata": self.metadatas[i],
+                        "distance": float(distances[row, i]),
+                    }
+                    for i in order
+                ]
+            )
+        return batch_results
+
+
+class SnapshotStore:
+    """A directory of versioned snapshots with an atomic ``CURRENT`` pointer"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def current_version(self) -> Optional[str]:
+        """Return the name of the current version, if any"""
+        try:
+            with open(self.current_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def write_lock(self):
+        """Hold the store's exclusive writer lock (across processes)
+
+        Separate opens of the lock file exclude each other even within one
+        process, so the lock also serializes threads.
+        """
+        if fcntl is None:
+            with _process_write_lock:
+                yield
+            return
+        with open(os.path.join(self.root, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def publish(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> str:
+        """Write a new snapshot version and atomically make it current"""
+        version = f"v{time.time_ns()}"
+        staging = os.path.join(self.root, f".{version}.tmp")
+        IndexSnapshot.write(staging, ids, embeddings, documents, metadatas)
+        os.replace(staging, os.path.join(self.root, version))
+
+        # Repoint CURRENT with a rename so readers never see a partial write
+        pointer_tmp = f"{self.current_path}.{os.getpid()}.tmp"
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer_tmp, self.current_path)
+        return version
+
+    def open_current(self) -> Optional[IndexSnapshot]:
+        """Open the current snapshot, or return None if nothing is published"""
+        version = self.current_version()
+        if version is None:
+            return None
+        return IndexSnapshot(os.path.join(self.root, version))
+
+    def prune(self, keep: int = 2, min_age: float = 0.0):
+        """Delete all but the newest ``keep`` versions
+
+        Processes that still have an older version mapped keep working: on
+        POSIX the mapped files stay readable until they are unmapped. A
+        process that read ``CURRENT`` but has not opened that version yet
+        would fail, so with ``min_age`` a version is only deleted once it has
+        been superseded for that many seconds (longer than readers take to
+        poll ``CURRENT``).
+        """
+        current = self.current_version()
+        versions = sorted(
+            (
+                name
+                for name in os.listdir(self.root)
+                if name.startswith("v") and os.path.isdir(os.path.join(self.root, name))
+            ),
+            key=_published_at,
+        )
+        deletable = versions[:-keep] if keep > 0 else versions
+        cutoff = time.time_ns() - int(min_age * 1e9)
+        for name, successor in zip(deletable, versions[1:] + [None]):
+            if name == current:
+                continue
+            if min_age and (successor is None or _published_at(successor) > cutoff):
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+def _published_at(version: str) -> int:
+    """Publish time of a version (its name is ``v<time_ns>``)"""
+    try:
+        return int(version[1:])
+    except ValueError:
+        return 0
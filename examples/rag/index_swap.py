@@ -0,0 +1,103 @@
+# type: ignore
+"""
+Reference-Counted Index Versions
+================================
+
+``IndexSlot`` holds the active version of an index for blue/green swaps:
+
+- readers ``lease()`` the active version for the duration of one search,
+  which pins it
+- ``swap()`` makes a new version active atomically; searches already in
+  flight finish on the version they leased
+- a replaced version is *draining* until its last lease is returned, and
+  is then handed to the ``release`` callback (e.g. to delete its storage)
+
+This keeps reindexing invisible to readers: they never see a half-built
+index and never have a version deleted underneath them.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Version:
+    """One version of the index and the number of leases on it"""
+
+    __slots__ = ("value", "leases", "retired")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.leases = 0
+        self.retired = False
+
+
+class IndexSlot:
+    """The active index version, swapped atomically and released when unused"""
+
+    def __init__(
+        self, value: Any = None, release: Optional[Callable[[Any], None]] = None
+    ):
+        self.release = release
+        self.swaps = 0
+        self.released = 0
+        self._active = _Version(value)
+        self._draining: List[_Version] = []
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Any:
+        return self._active.value
+
+    @contextmanager
+    def lease(self):
+        """Pin the active version until the block exits"""
+        with self._lock:
+            version = self._active
+            version.leases += 1
+        try:
+            yield version.value
+        finally:
+            with self._lock:
+                version.leases -= 1
+                done = version.retired and version.leases == 0
+                if done:
+                    self._draining.remove(version)
+            if done:
+                self._release(version)
+
+    def swap(self, value: Any) -> Any:
+        """Make ``value`` the active version, returning the one it replaces
+
+        The replaced version is released right away if nothing leases it,
+        otherwise once the last lease is returned.
+        """
+        with self._lock:
+            previous = self._active
+            self._active = _Version(value)
+            self.swaps += 1
+            previous.retired = True
+            idle = previous.leases == 0
+            if not idle:
+                self._draining.append(previous)
+        if idle:
+            self._release(previous)
+        return previous.value
+
+    def _release(self, version: _Version):
+        self.released += 1
+        if self.release is not None and version.value is not None:
+            self.release(version.value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_leases": self._active.leases,
+                "draining_versions": len(self._draining),
+                "draining_leases": sum(v.leases for v in self._draining),
+                "swaps": self.swaps,
+                "released": self.released,
+            }
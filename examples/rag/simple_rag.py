@@ -13,9 +13,12 @@ License: MIT
 """
 
 import os
+import time
+import uuid
 import yaml
-from typing import List, Dict, Any
-from dataclasses import dataclass
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, replace
 
 # Core libraries
 import numpy as np
@@ -27,6 +30,23 @@ from chromadb.config import Settings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 
+# Read-only memory-mapped snapshots and blue/green collection swaps
+try:
+    from examples.rag.index_snapshot import SnapshotStore
+    from examples.rag.index_swap import IndexSlot
+except ImportError:
+    from index_snapshot import SnapshotStore
+    from index_swap import IndexSlot
+
+# Request tracing spans (no-op when the automation package is not importable)
+try:
+    from automation.tracing import span as trace_span
+except ImportError:
+
+    @contextmanager
+    def trace_span(name: str, **attributes):
+        yield None
+
 
 @dataclass
 class RAGConfig:
@@ -38,6 +58,10 @@ class RAGConfig:
     top_k: int = 5
     collection_name: str = "rag_documents"
     persist_directory: str = "./chroma_db"
+    snapshot_check_interval: float = 1.0
+    # Superseded snapshots are deleted once readers have had this long to
+    # move on to the new one
+    snapshot_retain_seconds: float = 60.0
 
 
 class SimpleRAG:
@@ -47,20 +71,69 @@ class SimpleRAG:
         self.config = config or RAGConfig()
         self.embedding_model = None
         self.vector_db = None
-        self.collection = None
+        # The active collection; reindexing swaps in a new one
+        self._collection_slot = IndexSlot(release=self._drop_collection)
+        self._build: Optional["IndexBuild"] = None
+        self.snapshot_store = None
+        self.snapshot = None
+        self._snapshot_checked_at = 0.0
+        # Bumped on every write so caches can key on the index version
+        self._index_epoch = time.time_ns()
+        self._index_generation = 0
+        # Optional callback receiving (stage, seconds) for each pipeline stage
+        self.stage_observer: Optional[Callable[[str, float], None]] = None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.config.chunk_size,
             chunk_overlap=self.config.chunk_overlap,
             length_function=len,
         )
 
+    def update_settings(self, config: RAGConfig):
+        """Apply the tuning settings of ``config`` to a running instance
+
+        ``top_k``, the chunking parameters and the snapshot check interval
+        take effect for the next request; the embedding model and the
+        vector store are left as they are.
+        """
+        if (config.chunk_size, config.chunk_overlap) != (
+            self.config.chunk_size,
+            self.config.chunk_overlap,
+        ):
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=config.chunk_size,
+                chunk_overlap=config.chunk_overlap,
+                length_function=len,
+            )
+        # Swap in a new object so concurrent requests see either config whole
+        self.config = replace(
+            self.config,
+            top_k=config.top_k,
+            chunk_size=config.chunk_size,
+            chunk_overlap=config.chunk_overlap,
+            snapshot_check_interval=config.snapshot_check_interval,
+        )
+
+    @contextmanager
+    def _stage(self, name: str, **attributes):
+        """Trace a pipeline stage and report its duration to the stage observer"""
+        with trace_span(f"rag.{name}", **attributes):
+            if self.stage_observer is None:
+                yield
+                return
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.stage_observer(name, time.perf_counter() - start)
+
     def initialize(self):
         """Initialize the RAG system"""
         print("🚀 Initializing RAG system...")
 
-        # Load embedding model
-        print(f"📊 Loading embedding model: {self.config.embedding_model}")
-        self.embedding_model = SentenceTransformer(self.config.embedding_model)
+        # Load embedding model (unless one was handed over by a previous instance)
+        if self.embedding_model is None:
+            print(f"📊 Loading embedding model: {self.config.embedding_model}")
+            self.embedding_model = SentenceTransformer(self.config.embedding_model)
 
         # Initialize vector database
         print("🗄️ Initializing vector database...")
@@ -69,24 +142,198 @@ class SimpleRAG:
             settings=Settings(anonymized_telemetry=False),
         )
 
-        # Get or create collection
+        # Get or create collection (the latest reindexed version, if any)
+        name = self._read_active_collection() or self.config.collection_name
         try:
-            self.collection = self.vector_db.get_collection(self.config.collection_name)
-            print(f"✅ Found existing collection: {self.config.collection_name}")
+            self.collection = self.vector_db.get_collection(name)
+            print(f"✅ Found existing collection: {name}")
         except Exception:
-            self.collection = self.vector_db.create_collection(
-                self.config.collection_name
+            self.collection = self.vector_db.create_collection(name)
+            print(f"✅ Created new collection: {name}")
+
+    @property
+    def collection(self):
+        """The active Chroma collection"""
+        return self._collection_slot.current
+
+    @collection.setter
+    def collection(self, collection):
+        self._collection_slot = IndexSlot(collection, release=self._drop_collection)
+
+    @property
+    def reindex_in_progress(self) -> bool:
+        return self._build is not None
+
+    def _active_pointer(self) -> str:
+        return os.path.join(
+            self.config.persist_directory, f"{self.config.collection_name}.active"
+        )
+
+    def _read_active_collection(self) -> Optional[str]:
+        try:
+            with open(self._active_pointer(), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def start_reindex(self) -> "IndexBuild":
+        """Start building a new version of the collection next to the live one
+
+        Searches keep using the live collection until ``IndexBuild.commit``
+        swaps the new one in. Only one reindex can run at a time, and other
+        writes are refused meanwhile, as they would be lost on the swap.
+        """
+        if self.snapshot_store:
+            raise ValueError("Cannot reindex a read-only snapshot")
+        if not self.collection:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+        if self._build is not None:
+            raise ValueError("A reindex is already in progress")
+
+        name = f"{self.config.collection_name}-{uuid.uuid4().hex[:12]}"
+        self._build = IndexBuild(self, self.vector_db.create_collection(name))
+        print(f"🏗️ Building new collection version: {name}")
+        return self._build
+
+    def _swap_collection(self, collection):
+        """Make ``collection`` the active one; the old one drains, then is dropped"""
+        pointer = self._active_pointer()
+        os.makedirs(os.path.dirname(pointer), exist_ok=True)
+        with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+            f.write(collection.name)
+        os.replace(pointer + ".tmp", pointer)
+
+        self._collection_slot.swap(collection)
+        self._index_epoch = time.time_ns()
+        self._index_generation = 0
+        print(f"🔀 Swapped in collection {collection.name}")
+
+    def _drop_collection(self, collection):
+        """Delete a replaced collection once no search uses it any more"""
+        try:
+            self.vector_db.delete_collection(collection.name)
+            print(f"🗑️ Dropped collection {collection.name}")
+        except Exception as e:
+            print(f"⚠️ Could not drop collection {collection.name}: {e}")
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Leases on the active collection and on replaced, draining ones"""
+        return {
+            **self._collection_slot.stats(),
+            "collection": self.collection.name if self.collection else None,
+            "reindex_in_progress": self.reindex_in_progress,
+        }
+
+    def initialize_from_snapshot(self, snapshot_dir: str):
+        """Initialize a read-only RAG system served from a memory-mapped snapshot
+
+        No vector database client is opened, which makes the instance safe to
+        create before forking worker processes: the model weights and the
+        mapped index pages are then shared copy-on-write.
+        """
+        print("🚀 Initializing read-only RAG system...")
+
+        if self.embedding_model is None:
+            print(f"📊 Loading embedding model: {self.config.embedding_model}")
+            self.embedding_model = SentenceTransformer(self.config.embedding_model)
+
+        print(f"🗺️ Mapping index snapshot from: {snapshot_dir}")
+        self.snapshot_store = SnapshotStore(snapshot_dir)
+        self.snapshot = self.snapshot_store.open_current()
+        self._snapshot_checked_at = time.monotonic()
+        if self.snapshot is None:
+            print("⚠️ No snapshot published yet, searches return no results")
+        else:
+            print(
+                f"✅ Mapped snapshot {self.snapshot.version} "
+                f"({len(self.snapshot)} chunks)"
             )
-            print(f"✅ Created new collection: {self.config.collection_name}")
 
-    def add_documents(self, documents: List[str], metadata: List[Dict] = None):
-        """Add documents to the vector database"""
+    def export_snapshot(self, snapshot_dir: str) -> str:
+        """Publish the current collection as a new memory-mapped snapshot"""
         if not self.collection:
             raise ValueError("RAG system not initialized. Call initialize() first.")
 
-        print(f"📝 Processing {len(documents)} documents...")
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+        if embeddings.size == 0:
+            dimension = self.embedding_model.get_sentence_embedding_dimension()
+            embeddings = embeddings.reshape(0, dimension)
 
-        # Split documents into chunks
+        store = SnapshotStore(snapshot_dir)
+        version = store.publish(
+            data["ids"], embeddings, data["documents"], data["metadatas"]
+        )
+        print(f"✅ Published snapshot {version} ({len(data['ids'])} chunks)")
+        # Every publish is a full copy, so drop the ones readers have left
+        store.prune(keep=2, min_age=self.config.snapshot_retain_seconds)
+        return version
+
+    def export_chunks(self) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """The ids, texts and metadata of every indexed chunk
+
+        Used to index the same chunks in another embedding space, e.g. the
+        joint text and image index of the multimodal example.
+        """
+        if self.snapshot_store:
+            self._refresh_snapshot()
+            snapshot = self.snapshot
+            if snapshot is None:
+                return [], [], []
+            return (
+                list(snapshot.ids),
+                list(snapshot.documents),
+                list(snapshot.metadatas),
+            )
+        if not self.collection:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+
+        with self._collection_slot.lease() as collection:
+            data = collection.get(include=["documents", "metadatas"])
+        return data["ids"], data["documents"], data["metadatas"]
+
+    def _refresh_snapshot(self):
+        """Swap in a newer snapshot if one has been published"""
+        now = time.monotonic()
+        if now - self._snapshot_checked_at < self.config.snapshot_check_interval:
+            return
+        self._snapshot_checked_at = now
+
+        version = self.snapshot_store.current_version()
+        current = self.snapshot.version if self.snapshot else None
+        if version and version != current:
+            # Rebinding is atomic; in-flight searches keep the old mapping
+            self.snapshot = self.snapshot_store.open_current()
+
+    def touch_index(self) -> int:
+        """Bring the index into memory ahead of the first queries
+
+        A snapshot is read page by page (returning the bytes touched); a
+        Chroma collection loads its index on the first query, so one query
+        is run instead.
+        """
+        if self.snapshot_store:
+            self._refresh_snapshot()
+            return self.snapshot.touch() if self.snapshot else 0
+        if not self.collection:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+        if self.collection.count():
+            dimension = self.embedding_model.get_sentence_embedding_dimension()
+            self.collection.query(query_embeddings=[[0.0] * dimension], n_results=1)
+        return 0
+
+    @property
+    def index_version(self) -> str:
+        """An identifier that changes whenever the searchable index changes"""
+        if self.snapshot_store:
+            self._refresh_snapshot()
+            return self.snapshot.version if self.snapshot else "empty"
+        return f"c{self._index_epoch}.{self._index_generation}"
+
+    def _chunk_documents(
+        self, documents: List[str], metadata: List[Dict] = None, doc_id_offset=0
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Split documents into chunks with per-chunk metadata"""
         all_chunks = []
         all_metadata = []
 
@@ -99,17 +346,32 @@ class SimpleRAG:
             for j, chunk in enumerate(chunks):
                 chunk_metadata = {
                     **doc_metadata,
-                    "doc_id": i,
+                    "doc_id": doc_id_offset + i,
                     "chunk_id": j,
                     "chunk_text": chunk[:100] + "..." if len(chunk) > 100 else chunk,
                 }
                 all_metadata.append(chunk_metadata)
 
+        return all_chunks, all_metadata
+
+    def add_documents(self, documents: List[str], metadata: List[Dict] = None):
+        """Add documents to the vector database"""
+        if not self.collection:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+        if self._build is not None:
+            raise ValueError("A reindex is in progress; add documents to it instead")
+
+        print(f"📝 Processing {len(documents)} documents...")
+
+        # Split documents into chunks
+        all_chunks, all_metadata = self._chunk_documents(documents, metadata)
+
         print(f"📄 Created {len(all_chunks)} chunks")
 
         # Generate embeddings
         print("🔢 Generating embeddings...")
-        embeddings = self.embedding_model.encode(all_chunks, show_progress_bar=True)
+        with self._stage("embed"):
+            embeddings = self.embedding_model.encode(all_chunks, show_progress_bar=True)
 
         # Add to vector database
         print("💾 Adding to vector database...")
@@ -121,45 +383,172 @@ class SimpleRAG:
             metadatas=all_metadata,
             ids=ids,
         )
+        self._index_generation += 1
 
         print(f"✅ Added {len(all_chunks)} chunks to the database")
 
-    def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
-        """Search for relevant documents"""
+    def add_document_batch(
+        self, documents: List[str], metadata: List[Dict] = None, doc_id_offset=0
+    ) -> int:
+        """Chunk, embed and store one batch of a document stream
+
+        Chunk ids are unique across batches, so a stream can be ingested as
+        many batches. Returns the number of chunks added.
+        """
         if not self.collection:
             raise ValueError("RAG system not initialized. Call initialize() first.")
+        if self._build is not None:
+            raise ValueError("A reindex is in progress; add documents to it instead")
 
-        top_k = top_k or self.config.top_k
+        all_chunks, all_metadata, embeddings = self.embed_documents(
+            documents, metadata, doc_id_offset
+        )
+        if not all_chunks:
+            return 0
+
+        self.collection.add(
+            embeddings=embeddings.tolist(),
+            documents=all_chunks,
+            metadatas=all_metadata,
+            ids=[f"chunk_{uuid.uuid4().hex}" for _ in all_chunks],
+        )
+        self._index_generation += 1
+        return len(all_chunks)
 
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode([query])
+    def embed_documents(
+        self, documents: List[str], metadata: List[Dict] = None, doc_id_offset=0
+    ) -> Tuple[List[str], List[Dict[str, Any]], np.ndarray]:
+        """Chunk and embed documents without storing them
 
-        # Search in vector database
-        results = self.collection.query(
-            query_embeddings=query_embedding.tolist(), n_results=top_k
+        Returns the chunks, their metadata and a float32 embedding matrix,
+        for callers that keep their own index.
+        """
+        if not self.embedding_model:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+
+        all_chunks, all_metadata = self._chunk_documents(
+            documents, metadata, doc_id_offset
+        )
+        if not all_chunks:
+            return [], [], np.zeros((0, 0), dtype=np.float32)
+
+        with self._stage("embed"):
+            embeddings = self.embedding_model.encode(all_chunks)
+        return all_chunks, all_metadata, np.asarray(embeddings, dtype=np.float32)
+
+    def add_documents_stream(
+        self, documents: Iterable[Tuple[str, Dict]], batch_size: int = 64
+    ) -> Dict[str, int]:
+        """Add ``(text, metadata)`` pairs from an iterable in bounded batches
+
+        Only one batch is held in memory at a time, so corpora of any size
+        can be ingested from a generator.
+        """
+        totals = {"documents": 0, "chunks": 0, "batches": 0}
+        texts, metadatas = [], []
+
+        def flush():
+            totals["chunks"] += self.add_document_batch(
+                texts, metadatas, totals["documents"]
+            )
+            totals["documents"] += len(texts)
+            totals["batches"] += 1
+            texts.clear()
+            metadatas.clear()
+
+        for text, doc_metadata in documents:
+            texts.append(text)
+            metadatas.append(doc_metadata or {})
+            if len(texts) >= batch_size:
+                flush()
+        if texts:
+            flush()
+
+        print(
+            f"✅ Streamed {totals['documents']} documents "
+            f"({totals['chunks']} chunks) into the database"
         )
+        return totals
+
+    def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+        """Search for relevant documents"""
+        return self.search_batch([query], top_k)[0]
+
+    def search_batch(
+        self, queries: List[str], top_k: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for relevant documents for several queries in one pass
+
+        All queries are embedded with a single ``encode`` call and sent to the
+        vector store as one batched query. Results are returned in the order
+        of ``queries``.
+        """
+        if not queries:
+            return []
+        with trace_span(
+            "rag.retrieve", queries=len(queries), top_k=top_k or self.config.top_k
+        ):
+            return self.search_embeddings(self.embed_queries(queries), top_k)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed queries with a single ``encode`` call, as a float32 matrix"""
+        if not self.embedding_model:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+        with self._stage("embed"):
+            embeddings = self.embedding_model.encode(list(queries))
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def search_embeddings(
+        self, query_embeddings: np.ndarray, top_k: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search the index with precomputed query embeddings"""
+        if not self.collection and not self.snapshot_store:
+            raise ValueError("RAG system not initialized. Call initialize() first.")
+        if len(query_embeddings) == 0:
+            return []
+
+        top_k = top_k or self.config.top_k
+
+        # Read-only mode: search the memory-mapped snapshot
+        if self.snapshot_store:
+            self._refresh_snapshot()
+            snapshot = self.snapshot
+            if snapshot is None:
+                return [[] for _ in query_embeddings]
+            with self._stage("search"):
+                return snapshot.search(query_embeddings, top_k)
+
+        # Search in vector database, pinning the collection against swaps
+        with self._collection_slot.lease() as collection, self._stage("search"):
+            results = collection.query(
+                query_embeddings=query_embeddings.tolist(), n_results=top_k
+            )
 
         # Format results
-        formatted_results = []
-        for i in range(len(results["ids"][0])):
-            result = {
-                "id": results["ids"][0][i],
-                "document": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": (
-                    results["distances"][0][i] if "distances" in results else None
-                ),
-            }
-            formatted_results.append(result)
-
-        return formatted_results
+        batch_results = []
+        for q in range(len(query_embeddings)):
+            formatted_results = []
+            for i in range(len(results["ids"][q])):
+                result = {
+                    "id": results["ids"][q][i],
+                    "document": results["documents"][q][i],
+                    "metadata": results["metadatas"][q][i],
+                    "distance": (
+                        results["distances"][q][i] if results.get("distances") else None
+                    ),
+                }
+                formatted_results.append(result)
+            batch_results.append(formatted_results)
+
+        return batch_results
 
     def generate_response(self, query: str, context_docs: List[str]) -> str:
         """Generate response using retrieved context (simplified version)"""
         # This is a simplified version - in practice, you'd use a proper LLM
-        context = "\n\n".join(context_docs[:3])  # Use top 3 documents
+        with self._stage("generate", context_docs=len(context_docs)):
+            context = "\n\n".join(context_docs[:3])  # Use top 3 documents
 
-        response = f"""Based on the provided context, here's what I found:
+            response = f"""Based on the provided context, here's what I found:
 
 Query: {query}
 
@@ -171,6 +560,55 @@ Note: This is a simplified response. In a full implementation, this would be gen
         return response
 
 
+class IndexBuild:
+    """A new collection version filled in the background, then swapped in"""
+
+    def __init__(self, rag: SimpleRAG, collection):
+        self.rag = rag
+        self.collection = collection
+        self.chunks = 0
+
+    @property
+    def name(self) -> str:
+        return self.collection.name
+
+    def add_document_batch(
+        self, documents: List[str], metadata: List[Dict] = None, doc_id_offset=0
+    ) -> int:
+        """Chunk, embed and store a batch in the new collection"""
+        all_chunks, all_metadata, embeddings = self.rag.embed_documents(
+            documents, metadata, doc_id_offset
+        )
+        if not all_chunks:
+            return 0
+        self.collection.add(
+            embeddings=embeddings.tolist(),
+            documents=all_chunks,
+            metadatas=all_metadata,
+            ids=[f"chunk_{uuid.uuid4().hex}" for _ in all_chunks],
+        )
+        self.chunks += len(all_chunks)
+        return len(all_chunks)
+
+    def commit(self) -> str:
+        """Warm the new collection up and swap it in atomically"""
+        if self.rag._build is not self:
+            raise ValueError("This reindex is no longer active")
+        # Load the new index before it takes traffic, so the swap is smooth
+        if self.chunks:
+            dimension = self.rag.embedding_model.get_sentence_embedding_dimension()
+            self.collection.query(query_embeddings=[[0.0] * dimension], n_results=1)
+        self.rag._swap_collection(self.collection)
+        self.rag._build = None
+        return self.name
+
+    def abort(self):
+        """Discard the new collection, leaving the live one untouched"""
+        if self.rag._build is self:
+            self.rag._build = None
+            self.rag._drop_collection(self.collection)
+
+
 def demo_rag():
     """Demonstrate the RAG system with sample data"""
     print("🎯 RAG System Demo")
@@ -0,0 +1,256 @@
+"""
+Test Suite for Admission Control
+================================
+
+This module contains tests for the rate limiter, the concurrency limiter and
+the admission middleware used by the API server.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    ConcurrencyLimiter,
+    RateLimiter,
+    Rejected,
+    RouteLimits,
+    TokenBucket,
+)
+
+
+class TestRateLimiting:
+    """Test cases for token buckets"""
+
+    def test_bucket_allows_burst_then_rejects(self):
+        """Test that a bucket admits its burst and then asks to retry"""
+        bucket = TokenBucket(rate=1.0, burst=2)
+        assert bucket.try_acquire()[0]
+        assert bucket.try_acquire()[0]
+
+        admitted, retry_after = bucket.try_acquire()
+        assert not admitted
+        assert 0 < retry_after <= 1.0
+
+    def test_limits_are_per_client(self):
+        """Test that one client's usage does not affect another"""
+        limiter = RateLimiter(rate=0.001, burst=1)
+        limiter.check("key:a")
+        with pytest.raises(Rejected) as excinfo:
+            limiter.check("key:a")
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.retry_after >= 1
+
+        limiter.check("key:b")
+
+    def test_client_table_is_bounded(self):
+        """Test that old clients are evicted from the bucket table"""
+        limiter = RateLimiter(rate=1.0, burst=1, max_clients=2)
+        for client in ("a", "b", "c"):
+            limiter.check(client)
+        assert len(limiter._buckets) == 2
+
+    def test_idle_clients_expire(self):
+        """Test that buckets are dropped once they would be full again"""
+        limiter = RateLimiter(rate=1000.0, burst=1)
+        limiter.check("a")
+        time.sleep(0.01)
+        limiter.check("b")
+        assert list(limiter._buckets) == ["b"]
+
+    def test_only_configured_keys_get_own_buckets(self):
+        """Test that unknown API keys are limited by the client address"""
+        limiter = RateLimiter(rate=0.001, burst=1, api_keys=["valid"])
+
+        def scope(key):
+            return {"headers": [(b"x-api-key", key)], "client": ("10.0.0.1", 80)}
+
+        assert limiter.client_key(scope(b"valid")) == "key:valid"
+        limiter.check(limiter.client_key(scope(b"random-1")))
+        with pytest.raises(Rejected):
+            # A made-up key does not buy a fresh bucket
+            limiter.check(limiter.client_key(scope(b"random-2")))
+        limiter.check(limiter.client_key(scope(b"valid")))
+
+
+class TestConcurrencyLimiter:
+    """Test cases for concurrency limits and the wait queue"""
+
+    def test_waiter_gets_released_slot(self):
+        """Test that a released slot is handed to the oldest waiter"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter("test", RouteLimits(1, 4, 5.0))
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            assert limiter.queue_depth == 1
+
+            limiter.release()
+            await waiter
+            assert limiter.active == 1
+            limiter.release()
+            assert limiter.active == 0
+
+        asyncio.run(scenario())
+
+    def test_full_queue_rejects_immediately(self):
+        """Test that requests beyond the queue bound get a 503"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter("test", RouteLimits(1, 1, 5.0))
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+
+            with pytest.raises(Rejected) as excinfo:
+                await limiter.acquire()
+            assert excinfo.value.status_code == 503
+
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert limiter.queue_depth == 0
+
+        asyncio.run(scenario())
+
+    def test_wait_times_out(self):
+        """Test that a queued request is rejected when its deadline passes"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter("test", RouteLimits(1, 4, 5.0))
+            await limiter.acquire()
+            with pytest.raises(Rejected):
+                await limiter.acquire(timeout=0.01)
+            assert limiter.queue_depth == 0
+
+            limiter.release()
+            assert limiter.active == 0
+
+        asyncio.run(scenario())
+
+    def test_unreachable_deadline_rejects_up_front(self):
+        """Test that slow routes reject requests that cannot finish in time"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter("test", RouteLimits(1, 4, 5.0))
+            limiter.record_service_time(10.0)
+            await limiter.acquire()
+            with pytest.raises(Rejected):
+                await limiter.acquire(timeout=1.0)
+
+        asyncio.run(scenario())
+
+    def test_resize_admits_and_drains(self):
+        """Test that raising the cap admits waiters and lowering it drains"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter("test", RouteLimits(1, 4, 5.0))
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+
+            limiter.resize(RouteLimits(2, 4, 5.0))
+            await waiter
+            assert limiter.active == 2 and limiter.queue_depth == 0
+
+            limiter.resize(RouteLimits(1, 4, 5.0))
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            # The first release only brings the count down to the new cap
+            limiter.release()
+            assert not waiter.done()
+            limiter.release()
+            await waiter
+            assert limiter.active == 1
+
+        asyncio.run(scenario())
+
+    def test_controller_reconfigure(self):
+        """Test that reconfiguring keeps limiters of unchanged routes"""
+        controller = AdmissionController(
+            routes={"/a": {"max_concurrency": 1}}, rate_limit=None
+        )
+        limiter = controller.limiters["/a"]
+        controller.reconfigure(
+            {
+                "admission": {
+                    "routes": {"/a": {"max_concurrency": 3}, "/b": {}},
+                    "rate_limit": {"rate": 1.0, "burst": 1.0},
+                }
+            }
+        )
+        assert controller.limiters["/a"] is limiter
+        assert limiter.limits.max_concurrency == 3
+        assert set(controller.limiters) == {"/a", "/b"}
+
+        controller.rate_limiter.check("client")
+        controller.reconfigure(
+            {"admission": {"routes": {}, "rate_limit": {"rate": 1.0, "burst": 5}}}
+        )
+        # Existing buckets get the new burst as well
+        assert controller.rate_limiter._buckets["client"].burst == 5
+        assert controller.limiters == {}
+
+    def test_invalid_rate_limit_changes_nothing(self):
+        """Test that a zero rate is rejected instead of dividing by it"""
+        with pytest.raises(ValueError):
+            AdmissionController(rate_limit={"rate": 0, "burst": 1})
+
+        controller = AdmissionController(
+            routes={"/a": {}}, rate_limit={"rate": 1.0, "burst": 1.0}
+        )
+        with pytest.raises(ValueError):
+            controller.reconfigure(
+                {"admission": {"routes": {}, "rate_limit": {"rate": 0}}}
+            )
+        assert set(controller.limiters) == {"/a"}
+        assert controller.rate_limiter.rate == 1.0
+
+
+class TestAdmissionMiddleware:
+    """Test cases for the ASGI middleware"""
+
+    def test_rate_limited_requests_get_retry_after(self):
+        """Test that over-limit clients receive 429 with Retry-After"""
+        fastapi = pytest.importorskip("fastapi")
+        from fastapi.testclient import TestClient
+
+        app = fastapi.FastAPI()
+        controller = AdmissionController(
+            routes={"/rag/query": {"max_concurrency": 1}},
+            rate_limit={"rate": 0.001, "burst": 1},
+        )
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+
+        @app.get("/rag/query")
+        async def query():
+            return {"ok": True}
+
+        @app.get("/health")
+        async def health():
+            return {"ok": True}
+
+        client = TestClient(app)
+        headers = {"X-API-Key": "tenant-a"}
+        assert client.get("/rag/query", headers=headers).status_code == 200
+
+        response = client.get("/rag/query", headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+        # Unprotected routes are never limited
+        assert client.get("/health", headers=headers).status_code == 200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
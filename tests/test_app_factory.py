@@ -0,0 +1,128 @@
+"""
+Test Suite for the API Application Factory
+==========================================
+
+This module contains tests for building the API server with a chosen set of
+routers, and for keeping the text-only deployment free of model libraries.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import subprocess
+import sys
+import textwrap
+
+# Add parent directory to path to import automation
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from automation import api_server
+
+TEXT_ONLY_CONFIG = {
+    "tracing": {"exporter": "none"},
+    "warmup": {"enabled": False},
+    "config_reload": {"enabled": False},
+}
+
+
+class TestAppFactory:
+    """Test cases for create_app and router selection"""
+
+    def test_text_only_app(self):
+        """Test that only the text and core routes are served"""
+        app = api_server.create_app(TEXT_ONLY_CONFIG, routers=["text"])
+        with TestClient(app) as client:
+            response = client.post(
+                "/process-text", json={"text": "hello world", "max_length": 5}
+            )
+            assert response.json() == {
+                "result": "Processed: hello...",
+                "processed": True,
+            }
+
+            assert client.post("/rag/query", json={"query": "x"}).status_code == 404
+            health = client.get("/health").json()
+            assert health["routers"] == ["text"]
+            # The fields of the former docker_api health response
+            assert health["status"] == "healthy"
+            assert {"message", "version"} <= set(health)
+            assert client.get("/ready").status_code == 200
+            assert set(client.get("/").json()["endpoints"]) == {
+                "text",
+                "health",
+                "ready",
+                "metrics",
+            }
+
+    def test_rejections_carry_cors_headers(self):
+        """Test that requests shed by admission control still get CORS headers"""
+        config = {
+            **TEXT_ONLY_CONFIG,
+            "admission": {
+                "routes": {"/process-text": {}},
+                "rate_limit": {"rate": 0.001, "burst": 1},
+            },
+        }
+        app = api_server.create_app(config, routers=["text"])
+        with TestClient(app) as client:
+            request = {"json": {"text": "hi"}, "headers": {"Origin": "https://a.io"}}
+            assert client.post("/process-text", **request).status_code == 200
+            response = client.post("/process-text", **request)
+            assert response.status_code == 429
+            assert response.headers["access-control-allow-origin"]
+
+    def test_router_selection(self, monkeypatch):
+        """Test the precedence of explicit routers, environment and config"""
+        config = {"serving": {"routers": ["rag"]}}
+        assert api_server.enabled_routers(config) == ["rag"]
+        assert api_server.enabled_routers({}) == ["rag", "multimodal", "binary"]
+
+        monkeypatch.setenv("GENAI_ROUTERS", "multimodal, text")
+        # Always in canonical order
+        assert api_server.enabled_routers(config) == ["text", "multimodal"]
+        assert api_server.enabled_routers(config, ["rag"]) == ["rag"]
+
+        with pytest.raises(ValueError):
+            api_server.enabled_routers(config, ["rag", "speech"])
+
+    def test_text_only_needs_no_model_libraries(self, tmp_path):
+        """Test that the Docker entry point starts with model libraries missing"""
+        script = textwrap.dedent("""
+            import sys
+
+            class Block:
+                def find_spec(self, name, path=None, target=None):
+                    if name.split(".")[0] in (
+                        "PIL", "torch", "transformers", "sentence_transformers",
+                        "chromadb", "langchain", "clip", "numpy", "msgpack",
+                    ):
+                        raise ImportError(name)
+
+            sys.meta_path.insert(0, Block())
+            import docker_api
+            from fastapi.testclient import TestClient
+
+            with TestClient(docker_api.app) as client:
+                assert client.get("/demo").status_code == 200
+            assert "examples.rag.simple_rag" not in sys.modules
+            """)
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            # Results and traces are written to the working directory
+            cwd=str(tmp_path),
+            env={**os.environ, "GENAI_ROUTERS": "", "PYTHONPATH": ROOT},
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        assert result.returncode == 0, result.stderr
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,176 @@
+"""
+Test Suite for the Binary API
+=============================
+
+This module contains tests for the msgpack-over-HTTP routes and the packed
+float array encoding.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fastapi = pytest.importorskip("fastapi")
+msgpack = pytest.importorskip("msgpack")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from automation.binary_api import (
+    MSGPACK_CONTENT_TYPE,
+    create_binary_router,
+    pack_array,
+    unpack_array,
+)
+
+
+class InMemoryRAG:
+    """A tiny RAG stand-in with the interface the binary routes use"""
+
+    snapshot_store = None
+    index_version = "test"
+
+    def __init__(self):
+        self.documents = []
+
+    def embed_queries(self, queries):
+        return np.array([[len(q), 1.0, 0.0] for q in queries], dtype=np.float32)
+
+    def search_embeddings(self, query_embeddings, top_k=None):
+        top_k = top_k or 5
+        return [
+            [
+                {"id": f"chunk_{i}", "document": doc, "metadata": {}, "distance": i}
+                for i, doc in enumerate(self.documents[:top_k])
+            ]
+            for _ in query_embeddings
+        ]
+
+    def add_document_batch(self, documents, metadata=None):
+        self.documents.extend(documents)
+        return len(documents)
+
+
+def post(client, path, payload):
+    return client.post(
+        path,
+        content=msgpack.packb(payload, use_bin_type=True),
+        headers={"Content-Type": MSGPACK_CONTENT_TYPE},
+    )
+
+
+class TestBinaryAPI:
+    """Test cases for the msgpack routes"""
+
+    @pytest.fixture
+    def rag(self):
+        rag = InMemoryRAG()
+        rag.documents = ["first", "second", "third"]
+        return rag
+
+    @pytest.fixture
+    def client(self, rag):
+        self.ingested = 0
+
+        def on_ingest(ingested_rag):
+            assert ingested_rag is rag
+            self.ingested += 1
+
+        def get_rag(collection=None):
+            if collection == "bad name":
+                raise ValueError("Invalid collection name")
+            return rag
+
+        app = FastAPI()
+        app.include_router(create_binary_router(get_rag, lambda: None, on_ingest))
+        return TestClient(app)
+
+    def test_pack_array_round_trip(self):
+        """Test that packed arrays decode to the same float32 values"""
+        array = np.arange(6, dtype=np.float64).reshape(2, 3)
+        packed = msgpack.unpackb(msgpack.packb(pack_array(array)), raw=False)
+        decoded = unpack_array(packed)
+        assert decoded.dtype == np.float32
+        assert decoded.shape == (2, 3)
+        np.testing.assert_array_equal(decoded, array)
+
+    def test_search(self, client):
+        """Test single-query search with columnar results and embedding"""
+        response = post(
+            client,
+            "/bin/rag/search",
+            {"query": "abcd", "top_k": 2, "include_embeddings": True},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == MSGPACK_CONTENT_TYPE
+
+        content = msgpack.unpackb(response.content, raw=False)
+        assert content["ids"] == ["chunk_0", "chunk_1"]
+        assert content["documents"] == ["first", "second"]
+        np.testing.assert_array_equal(unpack_array(content["distances"]), [0, 1])
+        np.testing.assert_array_equal(
+            unpack_array(content["embeddings"]), [[4.0, 1.0, 0.0]]
+        )
+
+    def test_search_batch_fields(self, client):
+        """Test batch search with a field projection"""
+        response = post(
+            client,
+            "/bin/rag/search/batch",
+            {"queries": ["a", "bb"], "top_k": 1, "fields": ["id", "distance"]},
+        )
+        assert response.status_code == 200
+
+        content = msgpack.unpackb(response.content, raw=False)
+        assert len(content["results"]) == 2
+        assert set(content["results"][0]) == {"ids", "distances"}
+        assert "embeddings" not in content
+
+    def test_ingest(self, client, rag):
+        """Test document ingestion through the binary route"""
+        response = post(client, "/bin/rag/ingest", {"documents": ["new doc"]})
+        assert response.status_code == 200
+
+        content = msgpack.unpackb(response.content, raw=False)
+        assert content["document_count"] == 1
+        assert rag.documents[-1] == "new doc"
+        assert self.ingested == 1
+
+    def test_invalid_requests(self, client):
+        """Test content type and payload validation"""
+        response = client.post(
+            "/bin/rag/search",
+            json={"query": "x"},
+        )
+        assert response.status_code == 415
+
+        assert post(client, "/bin/rag/search", {"query": 1}).status_code == 400
+        assert (
+            post(client, "/bin/rag/search", {"query": "x", "fields": ["vector"]})
+        ).status_code == 400
+        assert (
+            post(client, "/bin/rag/search", {"query": "x", "collection": "bad name"})
+        ).status_code == 400
+        for top_k in (0, -1, "5", 2.5, True):
+            for path, payload in (
+                ("/bin/rag/search", {"query": "x"}),
+                ("/bin/rag/search/batch", {"queries": ["x"]}),
+            ):
+                response = post(client, path, {**payload, "top_k": top_k})
+                assert response.status_code == 400
+
+    def test_multimodal_unavailable(self, client):
+        """Test that CLIP routes report a missing multimodal app"""
+        response = post(client, "/bin/multimodal/embed_text", {"texts": ["a cat"]})
+        assert response.status_code == 503
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
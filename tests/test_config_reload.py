@@ -0,0 +1,177 @@
+"""
+Test Suite for Config Hot Reload
+================================
+
+This module contains tests for classifying config changes and for the
+config file watcher.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+import yaml
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.config_reload import ConfigWatcher, diff_config, flatten
+
+BASE_CONFIG = {
+    "models": {"embedding": {"name": "model-a", "device": "cpu"}},
+    "rag": {"chunk_size": 1000, "chunk_overlap": 200, "top_k": 5},
+    "serving": {"workers": 1},
+    "response_cache": {"max_entries": 1024},
+}
+
+
+def write_config(path, config, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    # Explicit mtimes, so quick successive writes are always seen
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestDiffConfig:
+    """Test cases for classifying changed settings"""
+
+    def test_flatten(self):
+        """Test that nested sections become dotted names"""
+        flat = flatten(BASE_CONFIG)
+        assert flat["rag.top_k"] == 5
+        assert flat["models.embedding.name"] == "model-a"
+
+    def test_classification(self):
+        """Test that each setting lands in the right class"""
+        new = {
+            **BASE_CONFIG,
+            "models": {"embedding": {"name": "model-b", "device": "cpu"}},
+            "rag": {"chunk_size": 500, "chunk_overlap": 200, "top_k": 8},
+            "serving": {"workers": 4},
+            "admission": {"rate_limit": {"rate": 5.0}},
+        }
+        changes = diff_config(BASE_CONFIG, new)
+        assert changes.live == [
+            "admission.rate_limit.rate",
+            "rag.chunk_size",
+            "rag.top_k",
+        ]
+        # The stored vectors belong to the old model: restart and reindex
+        assert changes.rebuild == []
+        assert changes.restart == ["models.embedding.name", "serving.workers"]
+
+    def test_multimodal_sizes_are_live(self):
+        """Test that cache and pool sizes apply without a restart"""
+        new = {
+            **BASE_CONFIG,
+            "caption_cache": {"max_entries": 10},
+            "prompt_cache": {"max_entries": 10},
+            "image_fetch": {"max_connections": 4},
+            "image_pipeline": {"io_workers": 2, "image_size": 336},
+        }
+        changes = diff_config(BASE_CONFIG, new)
+        assert changes.live == [
+            "caption_cache.max_entries",
+            "image_fetch.max_connections",
+            "image_pipeline.io_workers",
+            "prompt_cache.max_entries",
+        ]
+        assert changes.restart == ["image_pipeline.image_size"]
+
+    def test_vector_db_changes_rebuild(self):
+        """Test that a new vector database is swapped in without a restart"""
+        new = {**BASE_CONFIG, "vector_db": {"collection_name": "other"}}
+        changes = diff_config(BASE_CONFIG, new)
+        assert changes.rebuild == ["vector_db.collection_name"]
+
+    def test_no_changes(self):
+        """Test that an identical config is not a change"""
+        assert not diff_config(BASE_CONFIG, yaml.safe_load(yaml.dump(BASE_CONFIG)))
+
+
+class TestConfigWatcher:
+    """Test cases for the file watcher"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = str(tmp_path / "config.yaml")
+        write_config(path, BASE_CONFIG, 1_000_000_000)
+        return path
+
+    def test_applies_changes(self, path):
+        """Test that an edit is handed over once and then becomes current"""
+        applied = []
+
+        async def on_change(config, changes):
+            applied.append((config["rag"]["top_k"], changes))
+
+        async def scenario():
+            watcher = ConfigWatcher(path, BASE_CONFIG, on_change)
+            assert not await watcher.check()
+
+            config = {**BASE_CONFIG, "rag": {**BASE_CONFIG["rag"], "top_k": 9}}
+            config["serving"] = {"workers": 2}
+            write_config(path, config, 2_000_000_000)
+            assert await watcher.check()
+            assert not await watcher.check()
+            return watcher
+
+        watcher = asyncio.run(scenario())
+        assert len(applied) == 1
+        top_k, changes = applied[0]
+        assert top_k == 9
+        assert changes.live == ["rag.top_k"]
+        assert watcher.current["rag"]["top_k"] == 9
+        assert watcher.status()["generation"] == 1
+        assert watcher.status()["pending_restart"] == ["serving.workers"]
+
+    def test_invalid_file_keeps_config(self, path):
+        """Test that a broken edit is reported and ignored"""
+
+        async def on_change(config, changes):
+            raise AssertionError("must not be called")
+
+        async def scenario():
+            watcher = ConfigWatcher(path, BASE_CONFIG, on_change)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("rag: [unclosed")
+            os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+            assert not await watcher.check()
+            return watcher
+
+        watcher = asyncio.run(scenario())
+        assert watcher.current is BASE_CONFIG
+        assert watcher.last_error
+
+    def test_failed_apply_is_retried(self, path):
+        """Test that a change whose apply fails is not marked current"""
+        calls = []
+
+        async def on_change(config, changes):
+            calls.append(changes)
+            if len(calls) == 1:
+                raise RuntimeError("rebuild failed")
+
+        async def scenario():
+            watcher = ConfigWatcher(path, BASE_CONFIG, on_change)
+            config = {**BASE_CONFIG, "vector_db": {"collection_name": "other"}}
+            write_config(path, config, 4_000_000_000)
+            assert not await watcher.check()
+            assert watcher.current is BASE_CONFIG
+            assert "rebuild failed" in watcher.last_error
+
+            config["rag"] = {**BASE_CONFIG["rag"], "top_k": 3}
+            write_config(path, config, 5_000_000_000)
+            assert await watcher.check()
+
+        asyncio.run(scenario())
+        assert calls[1].rebuild == ["vector_db.collection_name"]
+        assert calls[1].live == ["rag.top_k"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,119 @@
+"""
+Test Suite for the CPU Inference Comparison Harness
+===================================================
+
+This module contains tests for the accuracy and latency comparison of
+optimized multimodal inference against the fp32 baseline. Fake apps stand
+in for the CLIP and BLIP models.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.multimodal.cpu_inference import (
+    InferenceConfig,
+    compare_inference,
+    embedding_agreement,
+    ranking_agreement,
+    token_f1,
+)
+
+
+class FakeApp:
+    """Deterministic embeddings and captions, optionally perturbed"""
+
+    def __init__(self, noise=0.0, captions=None, config=None):
+        self.noise = noise
+        self.captions = captions
+        self.inference_config = config or InferenceConfig()
+        self.rng = np.random.default_rng(1)
+
+    def _embed(self, seeds):
+        vectors = np.stack([np.random.default_rng(s).normal(size=8) for s in seeds])
+        vectors = vectors + self.noise * self.rng.normal(size=vectors.shape)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def encode_images(self, images):
+        return self._embed(images)
+
+    def encode_texts(self, texts, use_cache=True):
+        assert not use_cache
+        # Text i is closest to image i
+        return self._embed(range(len(texts)))
+
+    def generate_captions(self, images, use_cache=True):
+        assert not use_cache
+        return self.captions or [f"a photo of {i}" for i in images]
+
+
+class TestMetrics:
+    """Test cases for the accuracy metrics"""
+
+    def test_token_f1(self):
+        assert token_f1("a dog on a bed", "a dog on a bed") == 1.0
+        assert token_f1("a dog", "a cat") == pytest.approx(0.5)
+        assert token_f1("a dog", "") == 0.0
+        assert token_f1("", "") == 1.0
+
+    def test_embedding_agreement(self):
+        base = np.eye(3)
+        candidate = np.array([[1.0, 0, 0], [0, 2.0, 0], [0, 1.0, 1.0]])
+        agreement = embedding_agreement(base, candidate)
+        assert agreement["min_cosine"] == pytest.approx(np.sqrt(0.5))
+        assert agreement["mean_cosine"] == pytest.approx((2 + np.sqrt(0.5)) / 3)
+
+    def test_ranking_agreement(self):
+        base = np.array([[0.9, 0.1], [0.2, 0.8]])
+        assert ranking_agreement(base, base) == 1.0
+        assert ranking_agreement(base, base[:, ::-1]) == 0.0
+
+
+class TestCompareInference:
+    """Test cases for the baseline/optimized comparison"""
+
+    def test_identical_apps_agree(self):
+        """An unchanged configuration agrees fully with the baseline"""
+        images, texts = [0, 1, 2], ["zero", "one", "two"]
+        report = compare_inference(FakeApp(), FakeApp(), images, texts, repeats=2)
+
+        accuracy = report["accuracy"]
+        assert accuracy["clip_image"]["min_cosine"] == pytest.approx(1.0)
+        assert accuracy["retrieval_top1"] == 1.0
+        assert accuracy["caption_exact"] == 1.0
+        for stage in ("clip_image", "clip_text", "caption"):
+            assert report["baseline"][stage]["median_seconds"] >= 0.0
+            assert stage in report["speedup"]
+
+    def test_degraded_app_is_reported(self):
+        """Noisy embeddings and different captions lower the agreement"""
+        optimized = FakeApp(
+            noise=0.3,
+            captions=["a photo of 0", "a picture of 1", "something else"],
+            config=InferenceConfig(quantize=True, num_beams=1),
+        )
+        report = compare_inference(FakeApp(), optimized, [0, 1, 2], ["a", "b", "c"])
+
+        accuracy = report["accuracy"]
+        assert accuracy["clip_image"]["mean_cosine"] < 1.0
+        assert accuracy["caption_exact"] == pytest.approx(1 / 3)
+        assert 1 / 3 < accuracy["caption_token_f1"] < 1.0
+        assert report["optimized"]["inference"]["num_beams"] == 1
+
+    def test_config_from_dict(self):
+        config = InferenceConfig.from_config(
+            {"inference": {"quantize": True, "num_threads": 4, "unknown": 1}}
+        )
+        assert config.quantize and config.num_threads == 4
+        assert config.num_beams == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,169 @@
+"""
+Test Suite for the URL Image Fetcher
+====================================
+
+This module contains tests for the pooled, size-limited and cached image
+downloads used by MultimodalApp. A local HTTP server stands in for remote
+image hosts.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.multimodal.image_fetcher import ImageFetcher
+
+LAST_MODIFIED = "Mon, 05 Oct 2026 10:00:00 GMT"
+
+
+class ImageHost(BaseHTTPRequestHandler):
+    """Serves ``server.files`` with validators, recording each request"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.ports.add(self.client_address[1])
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(server.delay)
+        # Leave before responding: the client may reuse its slot right after
+        with server.lock:
+            server.active -= 1
+        self.respond(server)
+
+    def respond(self, server):
+        if self.path not in server.files:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, headers = server.files[self.path]
+        etag = f'"{len(body)}-{body[:4].hex()}"'
+        if self.headers.get("If-None-Match") == etag:
+            with server.lock:
+                server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "Transfer-Encoding" not in headers:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.end_headers()
+        for start in range(0, len(body), 1024):
+            chunk = body[start : start + 1024]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def host():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHost)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests, server.ports, server.not_modified = [], set(), 0
+    server.active = server.peak = 0
+    server.delay = 0.0
+    server.files = {
+        "/cat.png": (b"\x89PNG cat" * 100, {}),
+        "/fresh.png": (b"\x89PNG fresh", {"Cache-Control": "max-age=3600"}),
+        "/private.png": (b"\x89PNG private", {"Cache-Control": "no-store"}),
+        "/large.png": (b"x" * 5000, {}),
+        "/streamed.png": (b"y" * 5000, {"Transfer-Encoding": "chunked"}),
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestImageFetcher:
+    """Test cases for pooled, size-limited and cached downloads"""
+
+    def test_revalidates_cached_images(self, host, tmp_path):
+        """A cached image is revalidated and its body reused on a 304"""
+        url = host.url + "/cat.png"
+        fetcher = ImageFetcher(cache_dir=str(tmp_path))
+        body = fetcher.fetch(url)
+
+        restarted = ImageFetcher(cache_dir=str(tmp_path))
+        assert restarted.fetch(url) == body
+        assert host.not_modified == 1
+        assert restarted.stats["revalidated"] == 1
+        assert restarted.stats["bytes"] == 0
+
+    def test_fresh_images_skip_the_request(self, host, tmp_path):
+        fetcher = ImageFetcher(cache_dir=str(tmp_path))
+        for _ in range(3):
+            assert fetcher.fetch(host.url + "/fresh.png") == b"\x89PNG fresh"
+        assert host.requests == ["/fresh.png"]
+        assert fetcher.stats["cache_hits"] == 2
+
+    def test_no_store_is_not_cached(self, host, tmp_path):
+        fetcher = ImageFetcher(cache_dir=str(tmp_path))
+        fetcher.fetch(host.url + "/private.png")
+        fetcher.fetch(host.url + "/private.png")
+        assert host.not_modified == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_rejects_oversized_images(self, host):
+        """The limit holds with and without a Content-Length header"""
+        fetcher = ImageFetcher(max_bytes=4096, chunk_size=1024)
+        with pytest.raises(ValueError):
+            fetcher.fetch(host.url + "/large.png")
+        with pytest.raises(ValueError):
+            fetcher.fetch(host.url + "/streamed.png")
+        assert fetcher.stats["bytes"] == 0
+
+    def test_reuses_connections(self, host):
+        """Sequential downloads from one host share a kept-alive connection"""
+        fetcher = ImageFetcher()
+        for _ in range(5):
+            fetcher.fetch(host.url + "/cat.png")
+        assert len(host.ports) == 1
+
+    def test_fetch_many_keeps_order(self, host):
+        """Results follow the input order; failures are returned in place"""
+        host.delay = 0.02
+        fetcher = ImageFetcher(max_connections=4, per_host=2)
+        paths = ["/cat.png", "/missing.png", "/fresh.png"] * 4
+        results = fetcher.fetch_many([host.url + path for path in paths])
+
+        for path, result in zip(paths, results):
+            if path == "/missing.png":
+                assert isinstance(result, Exception)
+            else:
+                assert result == host.files[path][0]
+        # Never more requests in flight than the per-host pool allows
+        assert host.peak <= 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,155 @@
+"""
+Test Suite for the CLIP Image Index
+===================================
+
+This module contains tests for the precomputed image embedding index used by
+MultimodalApp.search_images. A fake encoder stands in for CLIP.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.multimodal.image_index import ImageIndex, TopK, top_k_indices
+
+DIM = 4
+
+
+class FakeEncoder:
+    """Embeds a file holding a number as that basis vector, recording calls"""
+
+    def __init__(self, batch_size=2):
+        self.batch_size = batch_size
+        self.embedded = []
+        self.batches = 0
+
+    def __call__(self, paths):
+        for start in range(0, len(paths), self.batch_size):
+            self.batches += 1
+            vectors, loaded = [], []
+            for path in paths[start : start + self.batch_size]:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        axis = int(f.read())
+                except (OSError, ValueError):
+                    continue
+                vectors.append(np.eye(DIM, dtype=np.float32)[axis] * 3.0)
+                loaded.append(path)
+                self.embedded.append(path)
+            yield np.array(vectors, dtype=np.float32).reshape(-1, DIM), loaded
+
+
+class TestImageIndex:
+    """Test cases for building, updating and searching the image index"""
+
+    @pytest.fixture
+    def gallery(self, tmp_path):
+        """Three images, each embedding to a different axis"""
+        paths = []
+        for axis in range(3):
+            path = tmp_path / f"image_{axis}.png"
+            path.write_text(str(axis))
+            paths.append(str(path))
+        return paths
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        return ImageIndex(str(tmp_path / "index"))
+
+    def test_build_and_search(self, index, gallery):
+        """The gallery is embedded in batches and searched by text vector"""
+        encoder = FakeEncoder()
+        counts = index.update(gallery, encoder)
+
+        assert counts["added"] == 3
+        assert encoder.batches == 2
+        assert len(index) == 3
+        assert np.allclose(np.linalg.norm(index.snapshot.embeddings, axis=1), 1.0)
+
+        query = np.array([[0.0, 1.0, 0.2, 0.0]], dtype=np.float32)
+        results = index.search(query, top_k=2)[0]
+        assert [r["path"] for r in results] == [gallery[1], gallery[2]]
+        assert results[0]["similarity"] == pytest.approx(1 / np.sqrt(1.04), abs=1e-5)
+        assert "image" not in results[0]
+
+    def test_incremental_update(self, index, gallery, tmp_path):
+        """Only new or changed images are embedded again"""
+        index.update(gallery, FakeEncoder())
+        version = index.version
+
+        encoder = FakeEncoder()
+        counts = index.update(gallery, encoder)
+        assert encoder.batches == 0
+        assert counts["unchanged"] == 3
+        assert index.version == version
+
+        # Change one image (size differs) and add another
+        with open(gallery[0], "w", encoding="utf-8") as f:
+            f.write("03")
+        added = tmp_path / "image_new.png"
+        added.write_text("0")
+        counts = index.update(gallery + [str(added)], encoder)
+
+        assert sorted(encoder.embedded) == sorted([gallery[0], str(added)])
+        assert counts["updated"] == 1 and counts["added"] == 1
+        top = index.search(np.eye(DIM)[3], top_k=1)[0][0]
+        assert top["path"] == gallery[0]
+
+        # The update is persisted and visible to a new reader
+        reopened = ImageIndex(index.store.root)
+        assert sorted(reopened.paths) == sorted(gallery + [str(added)])
+
+    def test_removed_and_unreadable_images(self, index, gallery, tmp_path):
+        """Unlisted images are pruned; missing or broken ones are skipped"""
+        index.update(gallery, FakeEncoder())
+
+        broken = tmp_path / "broken.png"
+        broken.write_text("not an image")
+        missing = str(tmp_path / "missing.png")
+        counts = index.update([gallery[0], str(broken), missing], FakeEncoder())
+
+        assert counts["removed"] == 2
+        assert counts["failed"] == 2
+        assert index.paths == [gallery[0]]
+
+        # Without pruning the listed images are added to the gallery
+        counts = index.update([gallery[1]], FakeEncoder(), prune=False)
+        assert counts["added"] == 1 and counts["removed"] == 0
+        assert sorted(index.paths) == sorted(gallery[:2])
+
+    def test_empty_index(self, index):
+        """Searching before anything is indexed returns no results"""
+        assert len(index) == 0
+        assert index.search(np.ones(DIM), top_k=3) == [[]]
+
+    def test_top_k_indices(self):
+        """Scores are ranked best first, with ties kept in input order"""
+        scores = np.array([0.1, 0.9, 0.5, 0.9, -0.2], dtype=np.float32)
+        assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+        assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0, 4]
+        assert top_k_indices(scores, 0).tolist() == []
+
+    def test_streaming_top_k(self):
+        """Batches pushed into a TopK rank like one top_k_indices call"""
+        scores = np.random.default_rng(0).random(100).astype(np.float32)
+        scores[[10, 70]] = 2.0
+        items = [f"image_{i}" for i in range(100)]
+        best = TopK(5)
+        for start in range(0, 100, 7):
+            best.push(scores[start : start + 7], items[start : start + 7])
+
+        assert len(best) == 5 and best.seen == 100
+        expected = top_k_indices(scores, 5)
+        assert [item for item, _ in best.results()] == [items[i] for i in expected]
+        assert best.results()[0] == ("image_10", 2.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
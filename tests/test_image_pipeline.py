@@ -0,0 +1,172 @@
+"""
+Test Suite for the Image Loading Pipeline
+=========================================
+
+This module contains tests for the parallel image loading and preprocessing
+pipeline that feeds batches to the CLIP image encoder.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+Image = pytest.importorskip("PIL.Image")
+
+from examples.multimodal.image_pipeline import (
+    CLIP_MEAN,
+    CLIP_STD,
+    ImagePipeline,
+    PipelineConfig,
+    make_thumbnail,
+    preprocess_image,
+)
+
+SIZE = 16
+
+
+@pytest.fixture
+def gallery(tmp_path):
+    """Five solid-color images of different shapes"""
+    paths = []
+    for i in range(5):
+        path = str(tmp_path / f"image_{i}.png")
+        Image.new("RGB", (20 + 10 * i, 30), (i * 50, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+class TestPreprocess:
+    """Test cases for the CLIP input transform"""
+
+    def test_shape_and_normalization(self):
+        """Images are cropped square, channel-first and normalized"""
+        image = Image.new("RGB", (40, 20), (255, 0, 0))
+        pixels = preprocess_image(image, SIZE)
+
+        assert pixels.shape == (3, SIZE, SIZE)
+        assert pixels.dtype == np.float32
+        expected = (np.array([1.0, 0.0, 0.0]) - CLIP_MEAN) / CLIP_STD
+        assert np.allclose(pixels[:, SIZE // 2, SIZE // 2], expected, atol=1e-5)
+
+    def test_grayscale_input(self):
+        """Non-RGB images are converted"""
+        pixels = preprocess_image(Image.new("L", (SIZE, SIZE), 128), SIZE)
+        assert pixels.shape == (3, SIZE, SIZE)
+
+    def test_thumbnail(self, tmp_path):
+        """JPEGs are shrunk to fit, keeping their aspect ratio"""
+        path = str(tmp_path / "large.jpg")
+        Image.new("L", (800, 400), 200).save(path)
+        with Image.open(path) as image:
+            thumbnail = make_thumbnail(image, 64)
+        assert thumbnail.size == (64, 32)
+        assert thumbnail.mode == "RGB"
+
+
+class TestImagePipeline:
+    """Test cases for batching, ordering and failure handling"""
+
+    def make_pipeline(self, **overrides):
+        options = {"batch_size": 2, "io_workers": 4, "decode_workers": 0}
+        options.update(overrides)
+        return ImagePipeline(PipelineConfig(image_size=SIZE, **options))
+
+    def test_batches_in_order(self, gallery):
+        """Batches keep the input order and hold preprocessed pixels"""
+        with self.make_pipeline() as pipeline:
+            batches = list(pipeline.batches(gallery))
+
+        assert [len(b.paths) for b in batches] == [2, 2, 1]
+        assert [p for b in batches for p in b.paths] == gallery
+        assert batches[0].pixels.shape == (2, 3, SIZE, SIZE)
+        assert np.allclose(
+            batches[1].pixels[0], preprocess_image(Image.open(gallery[2]), SIZE)
+        )
+
+    def test_cached_crops(self, gallery, tmp_path):
+        """A second pass reads the pixel cache and gives the same pixels"""
+        cache_dir = str(tmp_path / "pixels")
+        with self.make_pipeline(cache_dir=cache_dir) as pipeline:
+            first = list(pipeline.batches(gallery, batch_size=5))[0].pixels
+        with self.make_pipeline(cache_dir=cache_dir) as pipeline:
+            second = list(pipeline.batches(gallery, batch_size=5))[0].pixels
+            assert pipeline.cache.hits == len(gallery)
+        assert np.allclose(first, second)
+
+    def test_failed_images_are_reported(self, gallery, tmp_path):
+        """Unreadable images are skipped without failing their batch"""
+        broken = tmp_path / "broken.png"
+        broken.write_bytes(b"not an image")
+        paths = [gallery[0], str(broken), str(tmp_path / "missing.png")]
+
+        with self.make_pipeline(batch_size=3) as pipeline:
+            (batch,) = list(pipeline.batches(paths))
+
+        assert batch.paths == [gallery[0]]
+        assert len(batch.pixels) == 1
+        assert [path for path, _ in batch.failed] == paths[1:]
+
+    def test_decode_in_processes(self, gallery):
+        """Decoding in worker processes gives the same pixels"""
+        with self.make_pipeline(decode_workers=1) as pipeline:
+            batches = list(pipeline.batches(gallery, batch_size=5))
+        with self.make_pipeline() as pipeline:
+            expected = list(pipeline.batches(gallery, batch_size=5))
+
+        assert np.allclose(batches[0].pixels, expected[0].pixels)
+
+    def test_pending_work_is_counted(self, gallery):
+        """Queue depths return to zero once the loads are done"""
+        with self.make_pipeline(decode_workers=1) as pipeline:
+            batches = pipeline.batches(gallery * 4, batch_size=1)
+            next(batches)
+            assert pipeline.pending("io") > 0
+            list(batches)
+            assert (pipeline.pending("io"), pipeline.pending("decode")) == (0, 0)
+
+    def test_io_threads_outnumber_decoders(self):
+        """Threads waiting on decoders leave others free to read"""
+        with self.make_pipeline(io_workers=None, decode_workers=3) as pipeline:
+            io_pool, _ = pipeline._pools()
+            assert io_pool._max_workers == 7
+
+    def test_reconfigure_replaces_pools(self, gallery):
+        """New pool sizes apply to later loads; running ones finish"""
+        pipeline = self.make_pipeline(batch_size=1, prefetch_batches=1)
+        batches = pipeline.batches(gallery)
+        first = next(batches)
+        old_io, _ = pipeline._pools()
+
+        pipeline.reconfigure(
+            PipelineConfig(batch_size=1, io_workers=2, decode_workers=0)
+        )
+        new_io, _ = pipeline._pools()
+        assert new_io is not old_io and new_io._max_workers == 2
+        # The running load keeps its pools until it is done
+        assert [first.paths] + [b.paths for b in batches] == [[p] for p in gallery]
+        assert pipeline.config.image_size == SIZE
+        assert len(list(pipeline.batches(gallery))) == 5
+        pipeline.close()
+
+    def test_early_close(self, gallery):
+        """Abandoning the iterator stops the background loading"""
+        pipeline = self.make_pipeline(batch_size=1, prefetch_batches=1)
+        batches = pipeline.batches(gallery * 20)
+        first = next(batches)
+        batches.close()
+
+        assert first.paths == [gallery[0]]
+        # The pools are reused by the next call
+        assert len(list(pipeline.batches(gallery))) == 5
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,160 @@
+"""
+Test Suite for Index Snapshots
+==============================
+
+This module contains tests for the memory-mapped index snapshots used by the
+pre-fork serving mode.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import time
+import threading
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.rag.index_snapshot import IndexSnapshot, SnapshotStore
+
+
+class TestIndexSnapshot:
+    """Test cases for snapshot publishing and search"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Create an empty snapshot store"""
+        return SnapshotStore(str(tmp_path / "snapshots"))
+
+    @pytest.fixture
+    def records(self):
+        """Small set of records with orthogonal embeddings"""
+        return {
+            "ids": ["chunk_0", "chunk_1", "chunk_2"],
+            "embeddings": np.eye(3, dtype=np.float32),
+            "documents": ["alpha", "beta", "gamma"],
+            "metadatas": [{"doc_id": 0}, {"doc_id": 1}, {"doc_id": 2}],
+        }
+
+    def test_empty_store(self, store):
+        """Test that an empty store has no current snapshot"""
+        assert store.current_version() is None
+        assert store.open_current() is None
+
+    def test_publish_and_open(self, store, records):
+        """Test publishing a snapshot and mapping it back"""
+        version = store.publish(**records)
+
+        snapshot = store.open_current()
+        assert store.current_version() == version
+        assert snapshot.version == version
+        assert len(snapshot) == 3
+        assert isinstance(snapshot.embeddings, np.memmap)
+
+    def test_memory_and_mapped_copies(self, store, records):
+        """Test moving a snapshot between process memory and a mapping"""
+        store.publish(**records)
+        mapped = store.open_current()
+
+        resident = mapped.to_memory()
+        assert resident.in_memory
+        assert not isinstance(resident.embeddings, np.memmap)
+        assert resident.ids is mapped.ids
+        assert resident.nbytes == mapped.nbytes > 0
+
+        remapped = resident.to_mapped()
+        assert isinstance(remapped.embeddings, np.memmap)
+        assert remapped.search(np.eye(3)[:1], 1) == mapped.search(np.eye(3)[:1], 1)
+
+    def test_touch(self, store, records):
+        """Test that touching a snapshot reads the whole matrix"""
+        store.publish(**records)
+        snapshot = store.open_current()
+        assert snapshot.touch(block_rows=2) == 3 * 3 * 4 + 3 * 4
+
+    def test_search_matches_l2_order(self, store, records):
+        """Test that search returns the nearest records first"""
+        store.publish(**records)
+        snapshot = store.open_current()
+
+        queries = np.array([[0.1, 0.9, 0.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+        results = snapshot.search(queries, top_k=2)
+
+        assert [r["id"] for r in results[0]] == ["chunk_1", "chunk_0"]
+        assert results[1][0]["document"] == "gamma"
+        assert results[1][0]["distance"] == pytest.approx(0.0, abs=1e-6)
+
+    def test_top_k_larger_than_index(self, store, records):
+        """Test that top_k is capped at the snapshot size"""
+        store.publish(**records)
+        results = store.open_current().search(np.ones((1, 3)), top_k=10)
+        assert len(results[0]) == 3
+
+    def test_publish_swaps_current(self, store, records):
+        """Test that a new publish replaces the current version"""
+        first = store.publish(**records)
+        old_snapshot = store.open_current()
+
+        records["documents"] = ["one", "two", "three"]
+        second = store.publish(**records)
+
+        assert first != second
+        assert store.open_current().documents[0] == "one"
+        # Readers holding the old version are unaffected
+        assert old_snapshot.documents[0] == "alpha"
+
+    def test_prune_keeps_current(self, store, records):
+        """Test that pruning never removes the current version"""
+        for _ in range(3):
+            current = store.publish(**records)
+
+        store.prune(keep=1)
+        remaining = [name for name in os.listdir(store.root) if name.startswith("v")]
+        assert remaining == [current]
+
+    def test_prune_waits_for_min_age(self, store, records):
+        """Test that recently superseded versions survive pruning"""
+        versions = [store.publish(**records) for _ in range(3)]
+
+        store.prune(keep=1, min_age=3600)
+        remaining = sorted(n for n in os.listdir(store.root) if n.startswith("v"))
+        assert remaining == versions
+
+        store.prune(keep=1, min_age=0.0)
+        remaining = [name for name in os.listdir(store.root) if name.startswith("v")]
+        assert remaining == [versions[-1]]
+
+    def test_write_lock_is_exclusive(self, store):
+        """Test that a second writer waits for the first to release the lock"""
+        events = []
+
+        def write():
+            with store.write_lock():
+                events.append("second")
+
+        with store.write_lock():
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.2)
+            events.append("first")
+        writer.join()
+        assert events == ["first", "second"]
+
+    def test_write_rejects_mismatched_rows(self, tmp_path, records):
+        """Test that embeddings must have one row per id"""
+        with pytest.raises(ValueError):
+            IndexSnapshot.write(
+                str(tmp_path / "bad"),
+                records["ids"][:2],
+                records["embeddings"],
+                records["documents"],
+                records["metadatas"],
+            )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
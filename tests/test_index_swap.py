@@ -0,0 +1,90 @@
+"""
+Test Suite for Blue/Green Index Swaps
+=====================================
+
+This module contains tests for the reference-counted index slot used to
+swap in reindexed collections while searches are in flight.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import threading
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.rag.index_swap import IndexSlot
+
+
+class TestIndexSlot:
+    """Test cases for leases, swaps and draining"""
+
+    @pytest.fixture
+    def released(self):
+        return []
+
+    @pytest.fixture
+    def slot(self, released):
+        return IndexSlot("blue", release=released.append)
+
+    def test_idle_version_released_on_swap(self, slot, released):
+        """Test that a version nobody leases is released immediately"""
+        assert slot.swap("green") == "blue"
+        assert slot.current == "green"
+        assert released == ["blue"]
+
+    def test_in_flight_lease_drains(self, slot, released):
+        """Test that a leased version outlives the swap until returned"""
+        with slot.lease() as version:
+            slot.swap("green")
+            assert version == "blue"
+            assert released == []
+            assert slot.stats()["draining_leases"] == 1
+
+            # New leases already get the new version
+            with slot.lease() as new_version:
+                assert new_version == "green"
+        assert released == ["blue"]
+        assert slot.stats()["draining_versions"] == 0
+
+    def test_exception_returns_lease(self, slot, released):
+        """Test that a failing search still returns its lease"""
+        with pytest.raises(RuntimeError):
+            with slot.lease():
+                slot.swap("green")
+                raise RuntimeError("search failed")
+        assert released == ["blue"]
+
+    def test_concurrent_readers(self, released):
+        """Test that each version is released once, after its last reader"""
+        slot = IndexSlot(0, release=released.append)
+        stop = threading.Event()
+        seen_released = []
+
+        def reader():
+            while not stop.is_set():
+                with slot.lease() as version:
+                    # A version must never be released while leased
+                    if version in released:
+                        seen_released.append(version)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for version in range(1, 50):
+            slot.swap(version)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        assert seen_released == []
+        assert sorted(released) == list(range(49))
+        assert slot.stats()["released"] == 49
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
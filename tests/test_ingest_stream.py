@@ -0,0 +1,107 @@
+"""
+Test Suite for Streaming NDJSON Ingestion
+=========================================
+
+This module contains tests for the incremental NDJSON/gzip parser used by
+the bulk document ingestion endpoint.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import asyncio
+import gzip
+import json
+import os
+import sys
+import zlib
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.ingest_stream import NDJSONError, iter_documents
+
+
+async def _chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _collect(data: bytes, size: int = 7, **kwargs):
+    async def run():
+        return [doc async for doc in iter_documents(_chunked(data, size), **kwargs)]
+
+    return asyncio.run(run())
+
+
+class TestNDJSONParsing:
+    """Test cases for incremental NDJSON parsing"""
+
+    @pytest.fixture
+    def payload(self):
+        """Three documents as NDJSON bytes"""
+        records = [
+            {"text": "Machine learning basics", "metadata": {"topic": "ml"}},
+            {"text": "Deep learning uses neural networks"},
+            {"text": "自然语言处理", "metadata": {"lang": "zh"}},
+        ]
+        return "\n".join(json.dumps(r, ensure_ascii=False) for r in records).encode()
+
+    def test_plain_stream(self, payload):
+        """Test lines split across arbitrary chunk boundaries"""
+        documents = _collect(payload)
+        assert [text for text, _ in documents] == [
+            "Machine learning basics",
+            "Deep learning uses neural networks",
+            "自然语言处理",
+        ]
+        assert documents[0][1] == {"topic": "ml"}
+        assert documents[1][1] == {}
+
+    def test_gzip_is_detected(self, payload):
+        """Test that gzip bodies are detected from the magic bytes"""
+        assert _collect(gzip.compress(payload)) == _collect(payload)
+
+    def test_concatenated_gzip_members(self, payload):
+        """Test that concatenated gzip files are read in full"""
+        data = gzip.compress(payload + b"\n") + gzip.compress(payload)
+        assert len(_collect(data, size=5)) == 6
+
+    def test_blank_lines_are_skipped(self):
+        """Test that empty lines and a trailing newline are ignored"""
+        data = b'{"text": "a"}\n\n{"text": "b"}\n'
+        assert [text for text, _ in _collect(data)] == ["a", "b"]
+
+    def test_invalid_line_reports_line_number(self):
+        """Test that malformed JSON is reported with its line number"""
+        data = b'{"text": "a"}\n{not json}\n'
+        with pytest.raises(NDJSONError) as excinfo:
+            _collect(data)
+        assert excinfo.value.line_number == 2
+
+    def test_missing_text_is_rejected(self):
+        """Test that records need a text field"""
+        with pytest.raises(NDJSONError):
+            _collect(b'{"metadata": {}}\n')
+
+    def test_line_length_is_bounded(self):
+        """Test that a line without newline cannot grow without limit"""
+        with pytest.raises(NDJSONError):
+            _collect(b'{"text": "' + b"x" * 100, size=10, max_line_bytes=50)
+
+    def test_long_line_in_small_chunks(self):
+        """Test that a line arriving in many chunks is reassembled intact"""
+        text = "".join(chr(ord("a") + i % 26) for i in range(200_000))
+        data = json.dumps({"text": text}).encode() + b'\n{"text": "b"}'
+        assert [t for t, _ in _collect(data, size=100)] == [text, "b"]
+
+    def test_truncated_gzip_is_rejected(self, payload):
+        """Test that a gzip body cut short is an error, not a shorter upload"""
+        data = gzip.compress(payload + b"\n" + payload)
+        with pytest.raises(zlib.error):
+            _collect(data[:-6])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,139 @@
+"""
+Test Suite for API Metrics
+==========================
+
+This module contains tests for the Prometheus metrics registry and the
+request metrics middleware used by the API server.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.metrics import MetricsRegistry, MetricsMiddleware, REQUESTS_TOTAL
+
+
+class TestMetricsRegistry:
+    """Test cases for counters, gauges and histograms"""
+
+    @pytest.fixture
+    def registry(self):
+        """Create an empty registry"""
+        return MetricsRegistry()
+
+    def test_counter_render(self, registry):
+        """Test counter increments and exposition format"""
+        counter = registry.counter("test_total", "A test counter", ("route",))
+        counter.inc(route="/a")
+        counter.inc(2, route="/a")
+
+        text = registry.render()
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{route="/a"} 3' in text
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test histogram bucket counts, sum and count"""
+        histogram = registry.histogram(
+            "test_seconds", "A test histogram", ("stage",), buckets=(0.1, 1.0)
+        )
+        histogram.observe(0.05, stage="embed")
+        histogram.observe(0.5, stage="embed")
+        histogram.observe(5.0, stage="embed")
+
+        text = registry.render()
+        assert 'test_seconds_bucket{stage="embed",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{stage="embed",le="1.0"} 2' in text
+        assert 'test_seconds_bucket{stage="embed",le="+Inf"} 3' in text
+        assert 'test_seconds_count{stage="embed"} 3' in text
+        assert histogram.count(stage="embed") == 3
+
+    def test_histogram_timer(self, registry):
+        """Test timing a block with the histogram context manager"""
+        histogram = registry.histogram("timer_seconds", "A timer", ("stage",))
+        with histogram.time(stage="search"):
+            pass
+        assert histogram.count(stage="search") == 1
+
+    def test_gauge_function(self, registry):
+        """Test gauges backed by a callback"""
+        gauge = registry.gauge("depth", "A queue depth", ("queue",))
+        items = [1, 2, 3]
+        gauge.set_function(lambda: len(items), queue="pool")
+
+        assert 'depth{queue="pool"} 3' in registry.render()
+        items.pop()
+        assert gauge.value(queue="pool") == 2
+
+    def test_label_values_are_escaped(self, registry):
+        """Test escaping of quotes in label values"""
+        counter = registry.counter("escaped_total", "Escaping", ("name",))
+        counter.inc(name='a"b')
+        assert 'escaped_total{name="a\\"b"} 1' in registry.render()
+
+    def test_duplicate_registration_returns_existing(self, registry):
+        """Test that registering a metric twice returns the same instance"""
+        first = registry.counter("dup_total", "Duplicate")
+        assert registry.counter("dup_total", "Duplicate") is first
+        with pytest.raises(ValueError):
+            registry.gauge("dup_total", "Duplicate")
+
+
+class TestMetricsMiddleware:
+    """Test cases for per-route request metrics"""
+
+    def test_requests_are_labelled_by_route_template(self):
+        """Test that path parameters do not leak into labels"""
+        fastapi = pytest.importorskip("fastapi")
+        from fastapi.testclient import TestClient
+
+        app = fastapi.FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        client = TestClient(app)
+        labels = {"route": "/items/{item_id}", "method": "GET", "status": 200}
+        before = REQUESTS_TOTAL.value(**labels)
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+
+        after = REQUESTS_TOTAL.value(**labels)
+        assert after - before == 2
+        assert REQUESTS_TOTAL.value(route="unmatched", method="GET", status=404) >= 1
+
+    def test_shed_requests_are_labelled_by_route(self):
+        """Test that requests rejected by admission control keep their route"""
+        fastapi = pytest.importorskip("fastapi")
+        from fastapi.testclient import TestClient
+        from automation.admission import AdmissionController, AdmissionMiddleware
+
+        app = fastapi.FastAPI()
+        controller = AdmissionController(
+            routes={"/shed": {"max_concurrency": 1}},
+            rate_limit={"rate": 0.001, "burst": 1},
+        )
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/shed")
+        async def shed():
+            return {"ok": True}
+
+        client = TestClient(app)
+        assert client.get("/shed").status_code == 200
+        assert client.get("/shed").status_code == 429
+        assert REQUESTS_TOTAL.value(route="/shed", method="GET", status=200) == 1
+        assert REQUESTS_TOTAL.value(route="/shed", method="GET", status=429) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,195 @@
+"""
+Test Suite for the Joint Text and Image Index
+=============================================
+
+This module contains tests for the multimodal index that ranks RAG chunks
+and gallery images together. Fixed vectors stand in for CLIP embeddings.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import threading
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.multimodal.image_index import ImageIndex
+from examples.multimodal.multimodal_index import MultimodalIndex
+
+DIM = 4
+AXES = np.eye(DIM, dtype=np.float32)
+
+
+class FakeTextEncoder:
+    """Embeds "axis N ..." as basis vector N, recording every encoded text"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.stack([AXES[int(text.split()[1])] for text in texts])
+
+
+def chunks(*axes):
+    ids = [f"chunk_{axis}" for axis in axes]
+    documents = [f"axis {axis} text" for axis in axes]
+    return ids, documents, [{"doc_id": i} for i in range(len(axes))]
+
+
+@pytest.fixture
+def gallery(tmp_path):
+    """An image index whose two images lie near axes 0 and 2"""
+    paths = []
+    for name in ("near_0.png", "near_2.png"):
+        path = tmp_path / name
+        path.write_bytes(b"image")
+        paths.append(str(path))
+    vectors = np.array([[0.3, 0.95, 0, 0], [0, 0.95, 0.3, 0]], dtype=np.float32)
+
+    def embed(batch):
+        yield vectors[[paths.index(p) for p in batch]], list(batch)
+
+    index = ImageIndex(str(tmp_path / "images"))
+    index.update(paths, embed)
+    return index
+
+
+class TestMultimodalIndex:
+    """Test cases for building, calibrating and searching the joint index"""
+
+    @pytest.fixture
+    def index(self, tmp_path, gallery):
+        index = MultimodalIndex(str(tmp_path / "joint"))
+        index.update_images(gallery)
+        index.update_texts(*chunks(0, 3), FakeTextEncoder(), model="clip")
+        return index
+
+    def test_one_ranked_list(self, index):
+        """Texts and images are scored in one pass and tagged by modality"""
+        assert index.counts() == {"text": 2, "image": 2}
+        (results,) = index.search(AXES[0], top_k=4)
+
+        assert [r["modality"] for r in results] == ["text", "image", "image", "text"]
+        assert results[0]["document"] == "axis 0 text"
+        assert results[1]["document"].endswith("near_0.png")
+        assert results[0]["similarity"] == pytest.approx(1.0)
+
+        (images,) = index.search(AXES[0], top_k=4, modalities=["image"])
+        assert [r["modality"] for r in images] == ["image", "image"]
+        with pytest.raises(ValueError):
+            index.search(AXES[0], modalities=["audio"])
+
+    def test_calibration_ranks_modalities_fairly(self, index, tmp_path):
+        """Z-scores let a strong image match outrank a weak text match
+
+        Text-to-text similarities run much higher than text-to-image ones,
+        so raw similarities favor text.
+        """
+        query = np.array([0.9, 0.3, 0.0, 0.0], dtype=np.float32)
+        (raw,) = index.search(query, top_k=1)
+        assert raw[0]["modality"] == "text"
+
+        index.set_calibration(
+            {"text": {"mean": 0.8, "std": 0.1}, "image": {"mean": 0.25, "std": 0.1}}
+        )
+        (calibrated,) = index.search(query, top_k=1)
+        assert calibrated[0]["modality"] == "image"
+        assert calibrated[0]["score"] > 3.0
+        version = index.version
+
+        # The calibration is persisted and is part of the version
+        reopened = MultimodalIndex(str(tmp_path / "joint"))
+        assert reopened.calibration["image"] == {"mean": 0.25, "std": 0.1}
+        assert reopened.version == version
+        estimated = reopened.calibrate(AXES[:2])
+        assert estimated["text"]["std"] > 0
+        assert reopened.version != version
+
+    def test_text_updates_are_incremental(self, index, gallery):
+        """Unchanged chunks keep their vectors; image rows are untouched"""
+        encode = FakeTextEncoder()
+        counts = index.update_texts(*chunks(0, 1), encode, model="clip")
+        assert counts == {"texts": 2, "encoded": 1}
+        assert encode.encoded == ["axis 1 text"]
+        assert index.counts() == {"text": 2, "image": 2}
+
+        # Unchanged rows publish no new version
+        version = index.version
+        index.update_images(gallery)
+        index.update_texts(*chunks(0, 1), encode, model="clip")
+        assert index.version == version
+
+        # Another text encoder re-encodes everything
+        index.update_texts(*chunks(0, 1), encode, model="other")
+        assert encode.encoded[1:] == ["axis 0 text", "axis 1 text"]
+
+    def test_other_processes_pick_up_new_versions(self, index, tmp_path):
+        """Readers poll CURRENT and the calibration, and swap both in"""
+        reader = MultimodalIndex(str(tmp_path / "joint"), check_interval=0.0)
+        assert reader.counts() == {"text": 2, "image": 2}
+
+        index.update_texts(*chunks(0, 1, 2), FakeTextEncoder(), model="clip")
+        index.set_calibration({"text": {"mean": 0.5, "std": 0.2}})
+        assert reader.counts() == {"text": 3, "image": 2}
+        assert reader.calibration["text"] == {"mean": 0.5, "std": 0.2}
+        assert reader.version == index.version
+
+        # Between checks the reader keeps its version
+        slow = MultimodalIndex(str(tmp_path / "joint"), check_interval=3600)
+        index.update_texts(*chunks(3), FakeTextEncoder(), model="clip")
+        assert slow.counts()["text"] == 3
+
+    def test_searches_during_swaps(self, index, tmp_path):
+        """Rows and modalities are swapped together under concurrent searches"""
+        reader = MultimodalIndex(str(tmp_path / "joint"), check_interval=0.0)
+        errors = []
+
+        def search():
+            for _ in range(200):
+                try:
+                    reader.search(AXES[0], top_k=3, modalities=["text"])
+                except Exception as e:  # pragma: no cover - reported below
+                    errors.append(e)
+
+        thread = threading.Thread(target=search)
+        thread.start()
+        for axes in [(0,), (0, 1, 2), (1,), (0, 3)] * 3:
+            index.update_texts(*chunks(*axes), FakeTextEncoder(), model="clip")
+        thread.join()
+        assert errors == []
+
+    def test_updates_keep_rows_published_meanwhile(self, index, tmp_path):
+        """A worker that has not seen another's update still keeps its rows"""
+        stale = MultimodalIndex(str(tmp_path / "joint"), check_interval=3600)
+        index.update_texts(*chunks(0, 1, 2), FakeTextEncoder(), model="clip")
+        assert stale.counts()["text"] == 2
+
+        stale.update_images(ImageIndex(str(tmp_path / "empty")))
+        assert stale.counts() == {"text": 3, "image": 0}
+        assert MultimodalIndex(str(tmp_path / "joint")).counts() == stale.counts()
+
+    def test_superseded_versions_are_retained(self, index, tmp_path):
+        """Versions other readers may still open are not pruned right away"""
+        for axes in [(0,), (1,), (2,)]:
+            index.update_texts(*chunks(*axes), FakeTextEncoder(), model="clip")
+        versions = [v for v in os.listdir(tmp_path / "joint") if v.startswith("v")]
+        assert len(versions) > 2
+
+        index.store.prune(keep=2)
+        versions = [v for v in os.listdir(tmp_path / "joint") if v.startswith("v")]
+        assert len(versions) == 2
+
+    def test_empty_index(self, tmp_path):
+        index = MultimodalIndex(str(tmp_path))
+        assert len(index) == 0
+        assert index.search(AXES[:2]) == [[], []]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,148 @@
+"""
+Test Suite for the Preprocessed Gallery Image Cache
+===================================================
+
+This module contains tests for the memory-mapped cache of center-cropped
+images used by the image loading pipeline.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import multiprocessing
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.multimodal.pixel_cache import PixelCache
+
+SIZE = 8
+PUTS = 40
+
+
+def crop(value):
+    return np.full((SIZE, SIZE, 3), value, dtype=np.uint8)
+
+
+def fill_cache(directory, worker):
+    """Put crops from one process, reading back the others' along the way"""
+    cache = PixelCache(directory, SIZE)
+    for i in range(PUTS):
+        cache.put(f"{worker}-{i}", crop(worker * PUTS + i))
+        cache.get(f"{(worker + 1) % 3}-{i}")
+
+
+class TestPixelCache:
+    """Test cases for storing, reloading and invalidating crops"""
+
+    @pytest.fixture
+    def image(self, tmp_path):
+        path = tmp_path / "image.jpg"
+        path.write_bytes(b"original")
+        return str(path)
+
+    def test_round_trip_and_reload(self, image, tmp_path):
+        """Crops survive a restart and are read back unchanged"""
+        cache = PixelCache(str(tmp_path / "cache"), SIZE)
+        key = cache.key(image)
+        assert cache.get(key) is None
+        cache.put(key, crop(7))
+        cache.put("other", crop(9))
+        assert np.array_equal(cache.get(key), crop(7))
+
+        restarted = PixelCache(str(tmp_path / "cache"), SIZE)
+        assert len(restarted) == 2
+        assert np.array_equal(restarted.get(key), crop(7))
+        assert np.array_equal(restarted.get("other"), crop(9))
+        assert (restarted.hits, restarted.misses) == (2, 0)
+
+    def test_changed_files_and_urls_are_not_reused(self, image, tmp_path):
+        cache = PixelCache(str(tmp_path / "cache"), SIZE)
+        key = cache.key(image)
+        cache.put(key, crop(1))
+
+        with open(image, "wb") as f:
+            f.write(b"edited file")
+        assert cache.key(image) != key
+        assert cache.get(cache.key(image)) is None
+        assert cache.key("https://example.com/image.jpg") is None
+        assert cache.key(str(tmp_path / "missing.jpg")) is None
+
+    def test_partial_records_are_overwritten(self, tmp_path):
+        """A record cut short by a crash is never read, and is overwritten"""
+        cache = PixelCache(str(tmp_path), SIZE)
+        cache.put("first", crop(1))
+        with open(cache.data_path, "ab") as f:
+            f.write(crop(2).tobytes()[:10])
+
+        restarted = PixelCache(str(tmp_path), SIZE)
+        restarted.put("third", crop(3))
+        assert np.array_equal(restarted.get("third"), crop(3))
+        assert np.array_equal(restarted.get("first"), crop(1))
+        assert os.path.getsize(cache.data_path) == 2 * restarted.record_bytes
+
+    def test_stale_index_is_discarded(self, tmp_path):
+        """An index left next to another data file is not trusted"""
+        cache = PixelCache(str(tmp_path), SIZE)
+        cache.put("first", crop(1))
+        # As if a compaction crashed between replacing the two files
+        os.replace(cache.data_path, cache.data_path + ".old")
+        with open(cache.data_path, "wb") as f:
+            f.write(crop(5).tobytes())
+
+        restarted = PixelCache(str(tmp_path), SIZE)
+        assert restarted.get("first") is None
+        restarted.put("second", crop(2))
+        assert np.array_equal(restarted.get("second"), crop(2))
+        assert len(restarted) == 1
+
+    def test_compaction_keeps_the_newest_crops(self, tmp_path):
+        """Superseded and excess crops are dropped once the files grow"""
+        cache = PixelCache(str(tmp_path), SIZE, max_entries=4)
+        reader = PixelCache(str(tmp_path), SIZE, max_entries=4)
+        for value in range(10):
+            cache.put(f"/image_{value}.jpg|1|1", crop(value))
+        assert cache.compactions >= 1
+        assert len(cache) <= 8
+
+        # Another process picks up the compacted files
+        assert np.array_equal(reader.get("/image_9.jpg|1|1"), crop(9))
+        assert reader.get("/image_0.jpg|1|1") is None
+
+        # An edited image replaces its previous crop
+        cache.put("/image_9.jpg|2|1", crop(99))
+        assert np.array_equal(reader.get("/image_9.jpg|2|1"), crop(99))
+        assert len(reader) == len(cache)
+
+    def test_processes_share_one_cache(self, tmp_path):
+        """Concurrent writers in separate processes never clobber records"""
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=fill_cache, args=(str(tmp_path), worker))
+            for worker in range(3)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+            assert process.exitcode == 0
+
+        cache = PixelCache(str(tmp_path), SIZE)
+        assert len(cache) == 3 * PUTS
+        for worker in range(3):
+            for i in range(PUTS):
+                assert np.array_equal(
+                    cache.get(f"{worker}-{i}"), crop(worker * PUTS + i)
+                )
+
+    def test_rejects_wrong_shape(self, tmp_path):
+        with pytest.raises(ValueError):
+            PixelCache(str(tmp_path), SIZE).put("key", np.zeros((4, 4, 3)))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+"""
+Test Suite for the CLIP Prompt Embedding Store
+==============================================
+
+This module contains tests for the prompt embedding store and the
+vectorized zero-shot classification used by MultimodalApp. A fake text
+encoder stands in for CLIP.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import zlib
+import numpy as np
+
+# Add parent directory to path to import examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from examples.multimodal.prompt_store import PromptSet, PromptStore, zero_shot
+
+
+class FakeTextEncoder:
+    """Deterministic normalized embeddings, recording every encoded text"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        vectors = np.stack(
+            [
+                np.random.default_rng(zlib.crc32(t.encode())).normal(size=16)
+                for t in texts
+            ]
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestPromptStore:
+    """Test cases for registered prompt sets and the ad-hoc LRU"""
+
+    def test_adhoc_texts_are_encoded_once(self):
+        """Repeated queries are served from the LRU"""
+        store, encode = PromptStore(max_entries=2), FakeTextEncoder()
+        first = store.embed(["a cat", "a dog", "a cat"], encode)
+        again = store.embed(["a dog", "a cat"], encode)
+
+        assert encode.encoded == ["a cat", "a dog"]
+        assert np.allclose(first[0], first[2])
+        assert np.allclose(again, first[[1, 0]])
+        assert store.hits == 2
+
+        # "a dog" is now the least recently used entry
+        store.embed(["a bird"], encode)
+        store.embed(["a cat", "a dog"], encode)
+        assert encode.encoded[-1] == "a dog"
+
+    def test_resize_evicts_oldest(self):
+        """Shrinking the LRU drops the least recently used texts"""
+        store, encode = PromptStore(max_entries=4), FakeTextEncoder()
+        store.embed(["a", "b", "c"], encode)
+        store.resize(1)
+
+        assert len(store) == 1
+        store.embed(["c"], encode)
+        assert encode.encoded == ["a", "b", "c"]
+
+    def test_registered_sets_are_persisted(self, tmp_path):
+        """A registered set is encoded once and reloaded from disk"""
+        prompts = [f"a photo of a {label}" for label in ("cat", "dog", "car")]
+        encode = FakeTextEncoder()
+        store = PromptStore(directory=str(tmp_path), batch_size=2)
+        prompt_set = store.register("animals", prompts, encode, model="clip-a")
+        assert encode.encoded == prompts
+
+        reloaded_encode = FakeTextEncoder()
+        restarted = PromptStore(directory=str(tmp_path))
+        reloaded = restarted.register(
+            "animals", prompts, reloaded_encode, model="clip-a"
+        )
+        assert reloaded_encode.encoded == []
+        assert np.allclose(reloaded.embeddings, prompt_set.embeddings)
+
+        # Registered prompts are served by embed() without encoding
+        restarted.embed([prompts[1]], reloaded_encode)
+        assert reloaded_encode.encoded == []
+
+        # Another text encoder never reuses the persisted embeddings
+        restarted.register("animals", prompts, reloaded_encode, model="clip-b")
+        assert reloaded_encode.encoded == prompts
+
+    def test_labels_must_match_prompts(self):
+        with pytest.raises(ValueError):
+            PromptSet("bad", ["a", "b"], np.zeros((2, 4)), labels=["a"])
+
+
+class TestZeroShot:
+    """Test cases for vectorized zero-shot classification"""
+
+    def test_ranks_prompts_per_image(self):
+        """Each image gets its own ranking and a softmax over all prompts"""
+        embeddings = np.eye(3, dtype=np.float32)
+        prompt_set = PromptSet(
+            "axes",
+            ["x prompt", "y prompt", "z prompt"],
+            embeddings,
+            labels=["x", "y", "z"],
+        )
+        images = np.array([[0.9, 0.1, 0.0], [0.0, 0.2, 0.8]], dtype=np.float32)
+
+        results = zero_shot(images, prompt_set, top_k=2)
+
+        assert [r["label"] for r in results[0]] == ["x", "y"]
+        assert [r["label"] for r in results[1]] == ["z", "y"]
+        assert results[0][0]["similarity"] == pytest.approx(0.9)
+        assert results[0][0]["probability"] > 0.99
+        full = zero_shot(images[0], prompt_set, top_k=3)[0]
+        assert sum(r["probability"] for r in full) == pytest.approx(1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -13,6 +13,7 @@ import tempfile
 import shutil
 import os
 import sys
+import numpy as np
 
 # Add parent directory to path to import examples
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -94,6 +95,17 @@ class TestRAGSystem:
         collection_count = rag_system.collection.count()
         assert collection_count > 0
 
+    def test_add_documents_stream(self, rag_system, sample_documents):
+        """Test adding documents from a generator in small batches"""
+        stream = ((doc, {"index": i}) for i, doc in enumerate(sample_documents))
+
+        totals = rag_system.add_documents_stream(stream, batch_size=2)
+
+        assert totals["documents"] == len(sample_documents)
+        assert totals["batches"] == 2
+        # Chunk ids stay unique across batches
+        assert rag_system.collection.count() == totals["chunks"]
+
     def test_search(self, rag_system, sample_documents):
         """Test searching for relevant documents"""
         # Add documents first
@@ -112,6 +124,31 @@ class TestRAGSystem:
             assert "metadata" in result
             assert isinstance(result["document"], str)
 
+    def test_search_batch(self, rag_system, sample_documents):
+        """Test that a batch finds the nearest chunks of every query"""
+        rag_system.add_documents(sample_documents)
+        stored = rag_system.collection.get(include=["embeddings"])
+        vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+
+        queries = ["What is machine learning?", "How do neural networks work?"]
+        batch_results = rag_system.search_batch(queries, top_k=2)
+
+        # Brute force over the stored embeddings, without the vector index
+        # (Chroma's default space is squared L2)
+        query_vectors = rag_system.embedding_model.encode(queries)
+        assert len(batch_results) == len(queries)
+        for query_vector, results in zip(query_vectors, batch_results):
+            distances = ((vectors - query_vector) ** 2).sum(axis=1)
+            nearest = np.argsort(distances)[:2]
+            assert [r["id"] for r in results] == [stored["ids"][i] for i in nearest]
+            assert [r["distance"] for r in results] == pytest.approx(
+                distances[nearest].tolist(), rel=1e-3, abs=1e-4
+            )
+
+    def test_search_batch_empty(self, rag_system):
+        """Test that an empty batch returns no results"""
+        assert rag_system.search_batch([]) == []
+
     def test_search_empty_collection(self, rag_system):
         """Test searching in an empty collection"""
         results = rag_system.search("test query")
@@ -0,0 +1,116 @@
+"""
+Test Suite for the Response Cache
+=================================
+
+This module contains tests for the two-tier response cache and its ETag
+helpers used by the API server.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.response_cache import ResponseCache
+
+
+class TestResponseCache:
+    """Test cases for keys, ETags, eviction and invalidation"""
+
+    @pytest.fixture
+    def payload(self):
+        """A typical query payload"""
+        return {"query": "What is machine learning?", "top_k": 5}
+
+    def test_key_is_canonical(self, payload):
+        """Test that key order in the body does not change the key"""
+        reordered = {"top_k": 5, "query": "What is machine learning?"}
+        assert ResponseCache.make_key("/rag/query", payload, "v1") == (
+            ResponseCache.make_key("/rag/query", reordered, "v1")
+        )
+
+    def test_key_depends_on_route_and_version(self, payload):
+        """Test that route and index version are part of the key"""
+        key = ResponseCache.make_key("/rag/query", payload, "v1")
+        assert key != ResponseCache.make_key("/rag/query/batch", payload, "v1")
+        assert key != ResponseCache.make_key("/rag/query", payload, "v2")
+
+    def test_etag_matching(self):
+        """Test If-None-Match parsing"""
+        etag = ResponseCache.etag("v1-abc")
+        assert ResponseCache.matches('"v1-abc"', etag)
+        assert ResponseCache.matches('"other", W/"v1-abc"', etag)
+        assert ResponseCache.matches("*", etag)
+        assert not ResponseCache.matches('"v2-abc"', etag)
+        assert not ResponseCache.matches(None, etag)
+
+    def test_lru_eviction_and_hit_ratio(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ResponseCache(max_entries=2)
+        cache.put("v1-a", b"a")
+        cache.put("v1-b", b"b")
+        assert cache.get("v1-a") == b"a"
+        cache.put("v1-c", b"c")
+
+        assert cache.get("v1-b") is None
+        assert cache.get("v1-a") == b"a"
+        assert cache.hits == 2
+        assert cache.misses == 1
+
+    def test_byte_budget(self):
+        """Test that the memory tier respects its byte budget"""
+        cache = ResponseCache(max_entries=10, max_bytes=10)
+        cache.put("v1-a", b"x" * 6)
+        cache.put("v1-b", b"y" * 6)
+        assert len(cache) == 1
+        assert cache.get("v1-b") == b"y" * 6
+
+    def test_resize_evicts_oldest(self):
+        """Test that shrinking the cache keeps the most recent entries"""
+        cache = ResponseCache(max_entries=3)
+        for name in "abc":
+            cache.put(f"v1-{name}", name.encode())
+        cache.resize(max_entries=1, max_bytes=1024)
+        assert len(cache) == 1
+        assert cache.get("v1-c") == b"c"
+
+    def test_disk_tier_survives_memory_eviction(self, tmp_path):
+        """Test that evicted entries are served from disk"""
+        cache = ResponseCache(max_entries=1, disk_dir=str(tmp_path))
+        cache.put("v1-a", b"a")
+        cache.put("v1-b", b"b")
+        assert cache.get("v1-a") == b"a"
+
+        # A fresh cache over the same directory sees the entries too
+        assert ResponseCache(disk_dir=str(tmp_path)).get("v1-b") == b"b"
+
+    def test_invalidate_keeps_current_version(self, tmp_path):
+        """Test that invalidation drops entries of other index versions"""
+        cache = ResponseCache(disk_dir=str(tmp_path))
+        cache.put("v1-a", b"old")
+        cache.put("v2-a", b"new")
+
+        cache.invalidate("v2")
+        assert cache.get("v1-a") is None
+        assert cache.get("v2-a") == b"new"
+        assert os.listdir(tmp_path) == ["v2"]
+
+    def test_invalidate_is_scoped_to_a_namespace(self, tmp_path):
+        """Test that invalidating one index keeps the entries of the others"""
+        cache = ResponseCache(disk_dir=str(tmp_path))
+        for version in ["rag.c0.1", "rag.c0.2", "t.acme.v1", "mm.v1"]:
+            cache.put(ResponseCache.make_key("/q", {}, version), version.encode())
+
+        cache.invalidate("rag.c0.2", "rag")
+        assert sorted(os.listdir(tmp_path)) == ["mm.v1", "rag.c0.2", "t.acme.v1"]
+        assert len(cache) == 3
+        assert cache.get_memory(ResponseCache.make_key("/q", {}, "t.acme.v1"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
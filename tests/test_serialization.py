@@ -0,0 +1,122 @@
+"""
+Test Suite for Serialization and Compression
+============================================
+
+This module contains tests for the JSON encoder, the ``fields=`` projection
+and the response compression middleware.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fastapi = pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from automation.serialization import (
+    CompressionMiddleware,
+    FastJSONResponse,
+    dumps,
+    parse_fields,
+    project_results,
+)
+
+
+class TestSerialization:
+    """Test cases for encoding and projection"""
+
+    def test_dumps_round_trip(self):
+        """Test that the encoder produces standard JSON"""
+        content = {"query": "机器学习", "results": [{"id": "a", "distance": 0.25}]}
+        assert json.loads(dumps(content)) == content
+
+    def test_parse_fields(self):
+        """Test parsing and validation of the projection parameter"""
+        assert parse_fields(None) is None
+        assert parse_fields("id, distance") == ["id", "distance"]
+        with pytest.raises(ValueError):
+            parse_fields("id,embedding")
+
+    def test_project_results(self):
+        """Test that projection keeps only the requested keys"""
+        results = [{"id": "a", "document": "text", "metadata": {}, "distance": 0.1}]
+        assert project_results(results, ["id", "distance"]) == [
+            {"id": "a", "distance": 0.1}
+        ]
+        assert project_results(results, None) is results
+
+
+class TestCompressionMiddleware:
+    """Test cases for response compression"""
+
+    @pytest.fixture
+    def client(self):
+        """An app returning a small and a large JSON body"""
+        app = fastapi.FastAPI(default_response_class=FastJSONResponse)
+        app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+        @app.get("/small")
+        async def small():
+            return {"ok": True}
+
+        @app.get("/large")
+        async def large():
+            return fastapi.responses.Response(
+                content=dumps({"results": ["chunk text"] * 100}),
+                media_type="application/json",
+                headers={"ETag": '"v1-abc"'},
+            )
+
+        return TestClient(app)
+
+    def test_large_body_is_gzipped(self, client):
+        """Test gzip negotiation above the size threshold"""
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"] == 'W/"v1-abc"'
+        assert response.json() == {"results": ["chunk text"] * 100}
+
+    def test_small_body_is_not_compressed(self, client):
+        """Test that bodies below the threshold are sent as is"""
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_identity_when_not_accepted(self, client):
+        """Test that clients without Accept-Encoding get plain bodies"""
+        response = client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] == '"v1-abc"'
+
+    def test_vary_on_every_compressible_response(self, client):
+        """Test that caches key on Accept-Encoding, compressed or not"""
+        for path, accept in [("/large", "gzip"), ("/large", ""), ("/small", "br")]:
+            response = client.get(path, headers={"Accept-Encoding": accept})
+            assert response.headers["vary"] == "Accept-Encoding"
+
+    def test_quality_values_are_honoured(self):
+        """Test that encodings with q=0 are never chosen"""
+        app = fastapi.FastAPI()
+        app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+        @app.get("/text")
+        async def text():
+            return fastapi.responses.PlainTextResponse("x" * 1000)
+
+        client = TestClient(app)
+        response = client.get("/text", headers={"Accept-Encoding": "br;q=0, gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == "x" * 1000
+
+        response = client.get("/text", headers={"Accept-Encoding": "gzip;q=0"})
+        assert "content-encoding" not in response.headers
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
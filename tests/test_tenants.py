@@ -0,0 +1,199 @@
+"""
+Test Suite for Multi-Tenant Collections
+=======================================
+
+This module contains tests for tenant routing, lazy loading and the LRU
+memory budget of tenant indexes.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import os
+import sys
+import zlib
+import threading
+import multiprocessing
+import numpy as np
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.tenants import TenantIndexManager, validate_tenant_name
+
+
+class HashEmbedder:
+    """Deterministic stand-in for the shared SimpleRAG embedding model"""
+
+    class config:
+        top_k = 3
+
+    def _embed(self, texts):
+        vectors = []
+        for text in texts:
+            rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+            vectors.append(rng.standard_normal(16))
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), 16)
+
+    def embed_queries(self, queries):
+        return self._embed(queries)
+
+    def embed_documents(self, documents, metadata=None, doc_id_offset=0):
+        metadatas = [
+            {**(metadata[i] if metadata else {}), "doc_id": doc_id_offset + i}
+            for i in range(len(documents))
+        ]
+        return list(documents), metadatas, self._embed(documents)
+
+
+BATCHES = 10
+
+
+def ingest(root, worker):
+    """Append documents to one tenant from a separate process"""
+    acme = TenantIndexManager(root, HashEmbedder()).index("acme")
+    for i in range(BATCHES):
+        acme.add_document_batch([f"worker {worker} doc {i}"])
+
+
+class TestTenants:
+    """Test cases for the tenant index manager"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        return TenantIndexManager(str(tmp_path / "tenants"), HashEmbedder())
+
+    def test_validate_tenant_name(self):
+        """Test that only directory-safe names are accepted"""
+        assert validate_tenant_name("acme_corp-1") == "acme_corp-1"
+        for name in ["", "../etc", "a/b", ".hidden", "x" * 65]:
+            with pytest.raises(ValueError):
+                validate_tenant_name(name)
+
+    def test_ingest_and_search(self, manager):
+        """Test that tenants are isolated from each other"""
+        acme = manager.index("acme")
+        assert acme.search("anything") == []
+        assert acme.index_version == "t.acme.empty"
+
+        assert acme.add_document_batch(["apples", "pears"]) == 2
+        manager.index("globex").add_document_batch(["rockets"])
+
+        results = acme.search("apples", top_k=1)
+        assert results[0]["document"] == "apples"
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-3)
+        assert {r["document"] for r in acme.search("rockets")} == {"apples", "pears"}
+        assert manager.tenants() == ["acme", "globex"]
+
+    def test_document_ids_continue(self, manager):
+        """Test that later batches append with increasing document ids"""
+        acme = manager.index("acme")
+        acme.add_document_batch(["one", "two"])
+        version = acme.index_version
+        acme.add_document_batch(["three"])
+
+        assert acme.index_version != version
+        doc_ids = sorted(r["metadata"]["doc_id"] for r in acme.search("one", 10))
+        assert doc_ids == [0, 1, 2]
+
+    def test_memory_budget_demotes_lru(self, manager):
+        """Test that least recently used tenants are demoted to mappings"""
+        for name in ["a", "b"]:
+            manager.index(name).add_document_batch([f"{name}{i}" for i in range(20)])
+        size = manager.acquire("a").nbytes
+
+        manager.memory_budget_bytes = size + size // 2
+        manager.acquire("a")
+        manager.acquire("b")
+        manager._rebalance()
+        stats = manager.stats()
+        assert stats["resident_tenants"] == ["b"]
+        assert stats["resident_bytes"] <= manager.memory_budget_bytes
+
+        # A demoted tenant is still searchable and is promoted on access
+        assert manager.index("a").search("a3", 1)[0]["document"] == "a3"
+        assert manager.stats()["resident_tenants"] == ["a"]
+        assert manager.demotions >= 2
+
+    def test_oversized_tenant_stays_mapped(self, manager):
+        """Test that a tenant larger than the budget is served from the mapping"""
+        manager.memory_budget_bytes = 1
+        acme = manager.index("acme")
+        acme.add_document_batch(["big", "index"])
+
+        assert acme.search("big", 1)[0]["document"] == "big"
+        assert isinstance(manager.acquire("acme").embeddings, np.memmap)
+        assert manager.resident_bytes == 0
+
+    def test_max_open_closes_oldest(self, manager):
+        """Test that at most max_open tenants stay open"""
+        manager.max_open = 2
+        for name in ["a", "b", "c"]:
+            manager.index(name).add_document_batch([name])
+
+        assert manager.stats()["open_tenants"] == 2
+        assert set(manager._load_locks) <= {"b", "c"}
+        assert manager.index("a").search("a", 1)[0]["document"] == "a"
+
+        # Names without a tenant leave nothing behind
+        assert manager.index("missing").search("a") == []
+        assert "missing" not in manager._load_locks
+
+    def test_picks_up_other_writers(self, tmp_path):
+        """Test that a version published by another process is noticed"""
+        root = str(tmp_path / "tenants")
+        reader = TenantIndexManager(root, HashEmbedder(), check_interval=0.0)
+        writer = TenantIndexManager(root, HashEmbedder())
+
+        writer.index("acme").add_document_batch(["first"])
+        assert len(reader.index("acme").search("first")) == 1
+        writer.index("acme").add_document_batch(["second"])
+        assert len(reader.index("acme").search("first")) == 2
+
+    def test_concurrent_acquires_load_once(self, tmp_path):
+        """Test that threads racing for a cold tenant share one load"""
+        root = str(tmp_path / "tenants")
+        TenantIndexManager(root, HashEmbedder()).index("acme").add_document_batch(
+            [f"doc {i}" for i in range(50)]
+        )
+        reader = TenantIndexManager(root, HashEmbedder())
+        barrier = threading.Barrier(8)
+        snapshots = []
+
+        def acquire():
+            barrier.wait()
+            snapshots.append(reader.acquire("acme"))
+
+        threads = [threading.Thread(target=acquire) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert reader.loads == 1
+        assert len({id(snapshot) for snapshot in snapshots}) == 1
+        assert reader.resident_bytes == snapshots[0].nbytes
+
+    def test_processes_append_to_one_tenant(self, tmp_path):
+        """Test that concurrent ingests in separate processes keep every chunk"""
+        root = str(tmp_path / "tenants")
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=ingest, args=(root, worker)) for worker in range(3)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+            assert process.exitcode == 0
+
+        snapshot = TenantIndexManager(root, HashEmbedder()).acquire("acme")
+        assert len(snapshot) == 3 * BATCHES
+        assert sorted(m["doc_id"] for m in snapshot.metadatas) == list(
+            range(3 * BATCHES)
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
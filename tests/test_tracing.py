@@ -0,0 +1,184 @@
+"""
+Test Suite for Request Tracing
+==============================
+
+This module contains tests for span nesting and propagation, sampling, the
+span exporters and the tracing middleware.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import json
+import os
+import sys
+import queue
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation import tracing
+from automation.tracing import (
+    JSONLogExporter,
+    NOOP_SPAN,
+    Tracer,
+    otlp_payload,
+    parse_traceparent,
+)
+
+
+class ListExporter:
+    """Collects exported spans in memory"""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exporter():
+    """Install a fully sampled tracer exporting to a list"""
+    exporter = ListExporter()
+    previous = tracing.get_tracer()
+    tracing.set_tracer(Tracer(exporter, sample_rate=1.0))
+    yield exporter
+    tracing.set_tracer(previous)
+
+
+class TestTracing:
+    """Test cases for spans and sampling"""
+
+    def test_nested_spans(self, exporter):
+        """Test that child spans share the trace and point at their parent"""
+        with tracing.span("request") as root:
+            with tracing.span("rag.embed", queries=2) as child:
+                pass
+        tracing.get_tracer().flush()
+
+        names = {span.name: span for span in exporter.spans}
+        assert set(names) == {"request", "rag.embed"}
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+        assert names["rag.embed"].attributes == {"queries": 2}
+        assert root.parent_id is None
+
+    def test_unsampled_trace_records_nothing(self):
+        """Test that unsampled traces only produce no-op spans"""
+        exporter = ListExporter()
+        tracer = Tracer(exporter, sample_rate=0.0)
+        with tracer.start_span("request") as root:
+            with tracer.start_span("child") as child:
+                child.set_attribute("ignored", True)
+        tracer.flush()
+
+        assert root is NOOP_SPAN and child is NOOP_SPAN
+        assert exporter.spans == []
+
+    def test_remote_parent(self):
+        """Test that a traceparent header decides sampling and the trace id"""
+        trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+        assert parse_traceparent(f"00-{trace_id}-{parent_id}-01") == (
+            trace_id,
+            parent_id,
+            True,
+        )
+        assert parse_traceparent("garbage") is None
+
+        exporter = ListExporter()
+        tracer = Tracer(exporter, sample_rate=0.0)
+        with tracer.start_span("request", traceparent=f"00-{trace_id}-{parent_id}-01"):
+            pass
+        with tracer.start_span("request", traceparent=f"00-{trace_id}-{parent_id}-00"):
+            pass
+        tracer.flush()
+
+        assert len(exporter.spans) == 1
+        assert exporter.spans[0].trace_id == trace_id
+        assert exporter.spans[0].parent_id == parent_id
+
+    def test_exception_marks_span(self, exporter):
+        """Test that an exception escaping a span is recorded"""
+        with pytest.raises(RuntimeError):
+            with tracing.span("rag.generate"):
+                raise RuntimeError("boom")
+        tracing.get_tracer().flush()
+
+        assert exporter.spans[0].to_dict()["status"] == "error"
+        assert "boom" in exporter.spans[0].error
+
+    def test_json_log_exporter(self, tmp_path):
+        """Test that spans are written as JSON lines"""
+        path = str(tmp_path / "traces.jsonl")
+        tracer = Tracer(JSONLogExporter(path), sample_rate=1.0)
+        with tracer.start_span("request"):
+            with tracer.start_span("rag.search"):
+                pass
+        tracer.flush()
+
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [r["name"] for r in records] == ["rag.search", "request"]
+        assert records[0]["parent_id"] == records[1]["span_id"]
+
+    def test_otlp_payload(self, exporter):
+        """Test the OTLP/HTTP JSON encoding of spans"""
+        with tracing.span("multimodal.caption", width=384, ratio=0.5):
+            pass
+        tracing.get_tracer().flush()
+
+        payload = otlp_payload(exporter.spans, "test-service")
+        resource_spans = payload["resourceSpans"][0]
+        span = resource_spans["scopeSpans"][0]["spans"][0]
+        assert span["name"] == "multimodal.caption"
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+        assert {"key": "width", "value": {"intValue": "384"}} in span["attributes"]
+        assert span["status"] == {"code": 1}
+
+    def test_queue_full_drops_spans(self):
+        """Test that a full export queue drops spans instead of blocking"""
+        tracer = Tracer(ListExporter(), sample_rate=1.0, max_queue=1)
+        # A full queue with no export thread draining it
+        tracer.processor._pid = os.getpid()
+        tracer.processor._queue = queue.Queue(1)
+        tracer.processor._queue.put_nowait(None)
+        with tracer.start_span("request"):
+            pass
+        assert tracer.processor.dropped == 1
+
+
+class TestTracingMiddleware:
+    """Test cases for request spans in the API"""
+
+    def test_request_span_propagates_to_threadpool(self, exporter):
+        """Test that spans opened in worker threads join the request trace"""
+        pytest.importorskip("fastapi")
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from starlette.concurrency import run_in_threadpool
+
+        app = FastAPI()
+        app.add_middleware(tracing.TracingMiddleware)
+
+        def work():
+            with tracing.span("rag.search"):
+                return "done"
+
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: int):
+            return {"result": await run_in_threadpool(work)}
+
+        response = TestClient(app).get("/items/7")
+        tracing.get_tracer().flush()
+
+        spans = {span.name: span for span in exporter.spans}
+        request_span = spans["GET /items/{item_id}"]
+        assert spans["rag.search"].parent_id == request_span.span_id
+        assert request_span.attributes["http.status_code"] == 200
+        assert response.headers["traceparent"] == request_span.traceparent
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
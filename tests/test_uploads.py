@@ -0,0 +1,154 @@
+"""
+Test Suite for Bounded Uploads
+==============================
+
+This module contains tests for bounded image decoding and the request body
+size limit used by the image analysis endpoint.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import asyncio
+import io
+import os
+import sys
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from automation.uploads import (
+    BodySizeLimitMiddleware,
+    UploadTooLarge,
+    decode_image_bounded,
+)
+
+
+def _encode(image: Image.Image, fmt: str) -> io.BytesIO:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    buffer.seek(0)
+    return buffer
+
+
+class TestBoundedDecoding:
+    """Test cases for decode_image_bounded"""
+
+    def test_large_jpeg_is_decoded_near_target(self):
+        """Test that JPEGs are scaled down while decoding"""
+        source = _encode(Image.new("RGB", (4000, 3000), "red"), "JPEG")
+        image, original_size, original_mode = decode_image_bounded(
+            source, target_side=384
+        )
+
+        assert original_size == (4000, 3000)
+        assert original_mode == "RGB"
+        assert image.mode == "RGB"
+        # Never below the target, and far below the original
+        assert min(image.size) >= 384
+        assert min(image.size) < 2 * 384
+
+    def test_png_is_reduced(self):
+        """Test that formats without draft support are box-reduced"""
+        source = _encode(Image.new("L", (2000, 1000)), "PNG")
+        image, original_size, original_mode = decode_image_bounded(
+            source, target_side=224
+        )
+
+        assert original_mode == "L"
+        assert image.mode == "RGB"
+        assert 224 <= min(image.size) < 2 * 224
+
+    def test_small_image_is_untouched(self):
+        """Test that images below the target keep their resolution"""
+        source = _encode(Image.new("RGB", (100, 80)), "PNG")
+        image, original_size, _ = decode_image_bounded(source, target_side=384)
+        assert image.size == original_size == (100, 80)
+
+    def test_pixel_limit(self):
+        """Test that the pixel limit is enforced from the header"""
+        source = _encode(Image.new("RGB", (1000, 1000)), "PNG")
+        with pytest.raises(UploadTooLarge):
+            decode_image_bounded(source, max_pixels=999_999)
+
+    def test_truncated_image_raises_oserror(self):
+        """Test that a cut-off upload fails with OSError (a 400 in the API)"""
+        data = _encode(Image.new("RGB", (600, 400), "red"), "JPEG").getvalue()
+        with pytest.raises(OSError):
+            decode_image_bounded(io.BytesIO(data[: len(data) // 2]))
+
+
+class TestBodySizeLimit:
+    """Test cases for the request body size middleware"""
+
+    @pytest.fixture
+    def client(self):
+        """An app with a 1 KB limit on /upload"""
+        fastapi = pytest.importorskip("fastapi")
+        from fastapi.testclient import TestClient
+
+        app = fastapi.FastAPI()
+        app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": 1024})
+
+        @app.post("/upload")
+        async def upload(request: fastapi.Request):
+            return {"size": len(await request.body())}
+
+        @app.post("/other")
+        async def other(request: fastapi.Request):
+            return {"size": len(await request.body())}
+
+        return TestClient(app)
+
+    def test_small_body_passes(self, client):
+        """Test that bodies under the limit reach the endpoint"""
+        response = client.post("/upload", content=b"x" * 100)
+        assert response.status_code == 200
+        assert response.json() == {"size": 100}
+
+    def test_large_body_is_rejected(self, client):
+        """Test that bodies over the limit get a 413"""
+        response = client.post("/upload", content=b"x" * 2048)
+        assert response.status_code == 413
+
+    def test_streamed_body_is_rejected(self, client):
+        """Test that chunked bodies without Content-Length are counted"""
+
+        def chunks():
+            for _ in range(4):
+                yield b"x" * 512
+
+        response = client.post("/upload", content=chunks())
+        assert response.status_code == 413
+
+    def test_other_routes_are_unlimited(self, client):
+        """Test that the limit only applies to configured routes"""
+        assert client.post("/other", content=b"x" * 2048).status_code == 200
+
+    def test_malformed_content_length(self):
+        """Test that an unparsable Content-Length is a 400, not a 500"""
+        sent = []
+
+        async def app(scope, receive, send):
+            raise AssertionError("must not be called")
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = BodySizeLimitMiddleware(app, limits={"/upload": 1024})
+        for value in (b"abc", b"-5", b""):
+            sent.clear()
+            scope = {
+                "type": "http",
+                "path": "/upload",
+                "headers": [(b"content-length", value)],
+            }
+            asyncio.run(middleware(scope, None, send))
+            assert sent[0]["status"] == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
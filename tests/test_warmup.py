@@ -0,0 +1,169 @@
+"""
+Test Suite for Startup Warmup
+=============================
+
+This module contains tests for the warmup runner, its readiness states and
+the recorded warmup timings.
+
+Author: GenerativeAI-Starter-Kit
+License: MIT
+"""
+
+import pytest
+import json
+import os
+import sys
+import asyncio
+import numpy as np
+
+# Add parent directory to path to import automation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation import metrics
+from automation.warmup import WarmupConfig, WarmupRunner, synthetic_text
+
+
+class RecordingRAG:
+    """Records the calls the warmup makes"""
+
+    def __init__(self, fail_embed=False):
+        self.calls = []
+        # True, or the number of calls that fail before the model "loads"
+        self.fail_embed = fail_embed
+        self.stage_observer = metrics.observe_stage
+
+    def touch_index(self):
+        self.calls.append("touch")
+        return 1024
+
+    def embed_queries(self, queries):
+        if self.fail_embed:
+            if self.fail_embed is not True:
+                self.fail_embed -= 1
+            raise RuntimeError("model not loaded")
+        self.stage_observer("embed", 0.01)
+        self.calls.append(("embed", len(queries)))
+        return np.zeros((len(queries), 4), dtype=np.float32)
+
+    def search_embeddings(self, embeddings, top_k=None):
+        self.calls.append(("search", len(embeddings)))
+        return [[] for _ in embeddings]
+
+    def search(self, query, top_k=None):
+        self.calls.append(("canary", query))
+        return [{"document": "context"}]
+
+    def generate_response(self, query, context_docs):
+        self.calls.append(("generate", tuple(context_docs)))
+        return "answer"
+
+
+class RecordingMultimodal:
+    """Records the image sizes the warmup uses"""
+
+    def __init__(self):
+        self.sizes = []
+        self.stage_observer = None
+
+    def generate_caption(self, image, use_cache=True):
+        assert not use_cache
+        self.sizes.append(image.size)
+        return "noise"
+
+    def calculate_similarity(self, image, text):
+        return 0.0
+
+
+class TestWarmup:
+    """Test cases for the warmup runner"""
+
+    @pytest.fixture
+    def config(self, tmp_path):
+        return WarmupConfig(
+            iterations=2,
+            query_words=[4, 32],
+            batch_sizes=[1, 3],
+            image_sizes=[[64, 48]],
+            canary_queries=["what is rag?"],
+            results_path=str(tmp_path / "warmup.jsonl"),
+        )
+
+    def test_runs_all_steps(self, config):
+        """Test that every configured shape is exercised and timed"""
+        rag, multimodal = RecordingRAG(), RecordingMultimodal()
+        runner = WarmupRunner(config)
+        assert runner.state == "pending"
+        embeds = metrics.STAGE_LATENCY.count(stage="embed")
+
+        steps = runner.run(rag, multimodal)
+
+        assert runner.ready
+        names = [step.name for step in steps]
+        assert names[0] == "touch_index"
+        assert "embed[32w,x3]" in names and "search[x3]" in names
+        assert "caption[64x48]" in names and "clip[64x48]" in names
+        assert ("canary", "what is rag?") in rag.calls
+        assert ("generate", ("context",)) in rag.calls
+        assert multimodal.sizes[0] == (64, 48)
+        # Warmup calls are not recorded; calls made elsewhere still are
+        assert metrics.STAGE_LATENCY.count(stage="embed") == embeds
+        rag.embed_queries(["a request"])
+        assert metrics.STAGE_LATENCY.count(stage="embed") == embeds + 1
+
+        embed_step = next(step for step in steps if step.name == "embed[4w,x1]")
+        assert embed_step.steady_seconds is not None
+
+    def test_results_are_recorded(self, config):
+        """Test that each warmup appends one JSON line"""
+        WarmupRunner(config).run(RecordingRAG())
+        WarmupRunner(config).run(RecordingRAG())
+
+        with open(config.results_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 2
+        assert records[0]["state"] == "ready"
+        assert records[0]["steps"][0]["name"] == "touch_index"
+
+    def test_failure_keeps_server_unready(self, config):
+        """Test that a failing step marks the warmup failed"""
+        runner = WarmupRunner(config)
+        runner.run(RecordingRAG(fail_embed=True))
+        assert runner.state == "failed"
+        assert any("model not loaded" in (s.error or "") for s in runner.steps)
+
+        config.fail_on_error = False
+        runner = WarmupRunner(config)
+        runner.run(RecordingRAG(fail_embed=True))
+        assert runner.ready
+
+    def test_failed_warmup_is_retried(self, config):
+        """Test that a failed warmup is retried until it succeeds"""
+        config.retry_seconds = 0.01
+        runner = WarmupRunner(config)
+        rag = RecordingRAG(fail_embed=1)
+
+        asyncio.run(runner.run_until_ready(rag))
+        assert runner.ready
+        with open(config.results_path, encoding="utf-8") as f:
+            states = [json.loads(line)["state"] for line in f]
+        assert states == ["failed", "ready"]
+
+    def test_disabled(self, config):
+        """Test that a disabled warmup is ready immediately"""
+        config.enabled = False
+        runner = WarmupRunner(config)
+        assert runner.run(RecordingRAG()) == []
+        assert runner.ready
+
+    def test_from_config(self):
+        """Test reading the warmup section and ignoring unknown keys"""
+        config = WarmupConfig.from_config(
+            {"warmup": {"iterations": 5, "canary_queries": ["q"], "unknown": 1}}
+        )
+        assert config.iterations == 5
+        assert config.canary_queries == ["q"]
+        assert synthetic_text(3) != synthetic_text(3, offset=1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])